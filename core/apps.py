@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(using, **kwargs):
+    # Table rebuilds during migrate drop SQLite triggers; put them back
+    from django.db import connections
+    from .search import install_fts_index
+    install_fts_index(connections[using])
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import install_query_timer
+        post_migrate.connect(ensure_search_index, sender=self)
+        connection_created.connect(install_query_timer)
@@ -0,0 +1,65 @@
+"""
+Async versions of the data-heavy member and admin views, for ASGI deployments.
+
+Each page's independent reads run at the same time on worker threads, each
+with its own database connection, so the page waits for its slowest query
+instead of the sum of all of them. Templates are rendered on the request's
+sync thread as in the sync views (the session and messages are sync-only).
+
+``core/urls.py`` routes to these views when ``ASYNC_VIEWS`` is on, which
+``mlm_company/asgi.py`` turns on by default for database servers (SQLite
+serializes the concurrent reads). Under WSGI the plain views in
+``core.views`` serve the same URLs.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.shortcuts import render
+
+from . import views
+from .stats import get_admin_stats
+
+
+def _read(func, *args):
+    # Worker threads don't see request_started/finished, so recycle their
+    # connections here (kept open between reads with CONN_MAX_AGE)
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def fan_out(*calls):
+    """Run ``(func, *args)`` reads concurrently, returning their results in order"""
+    return await asyncio.gather(*(
+        sync_to_async(_read, thread_sensitive=False)(func, *args)
+        for func, *args in calls
+    ))
+
+
+@login_required(login_url='login')
+async def dashboard(request):
+    """User Dashboard (history tables read concurrently)"""
+    user = await request.auser()
+    request.user = user  # the template's request.user would load it again
+
+    _, *pages = await fan_out(
+        (views._load_member_stats, user),
+        *((views._dashboard_section, user, section) for section in views.DASHBOARD_SECTIONS),
+    )
+    context = views._dashboard_context(user, dict(zip(views.DASHBOARD_SECTIONS, pages)))
+    return await sync_to_async(render)(request, 'user/dashboard.html', context)
+
+
+@views.staff_required
+async def admin_dashboard(request):
+    """Admin Dashboard (statistics and recent activity read concurrently)"""
+    stats, *recent = await fan_out(
+        (get_admin_stats,),
+        *((views._admin_recent, name) for name in views.ADMIN_RECENT_LISTS),
+    )
+    context = {**stats, **dict(zip(views.ADMIN_RECENT_LISTS, recent))}
+    return await sync_to_async(render)(request, 'admin/admin_dashboard.html', context)
@@ -0,0 +1,111 @@
+"""
+Authentication backend and session user cache.
+
+Members log in with their email, matched case-insensitively through the
+indexed ``email_normalized`` column. The user ``AuthenticationMiddleware``
+loads for every request is read with only the profile columns pages use and
+cached for SESSION_USER_CACHE_TIMEOUT seconds. Balances and counters change
+with every ledger entry, so they are left out and read fresh where they are
+shown; the password hash is left out too, and the entry carries the session
+hash Django checks instead.
+
+Saving a member (or its thumbnails) bumps that member's generation number
+once the transaction commits. The generation is part of the cache key and is
+read before the row, so a request that read the row just before a change
+stores it under a key no later request asks for.
+"""
+import copy
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CustomUser
+
+# Columns read for the request user; the rest load on first access
+SESSION_USER_FIELDS = (
+    'id', 'password', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'mobile', 'sponsor_id', 'sponsor_name',
+    'referral_id', 'is_active_member', 'profile_photo', 'profile_photo_thumbnails',
+    'created_at', 'updated_at',  # saved by profile updates (auto_now)
+)
+
+
+def _generation_key(user_id):
+    return f'core:session_user_gen:{user_id}'
+
+
+def _generation(user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Never restart from a number an evicted generation may already have used
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _key(user_id):
+    return f'core:session_user:{user_id}:{_generation(user_id)}'
+
+
+def _bump(user_id):
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        cache.set(_generation_key(user_id), time.time_ns(), None)
+
+
+def invalidate_users(user_ids):
+    """Drop the cached session users for ``user_ids`` once the transaction commits"""
+    user_ids = set(user_ids)
+    if user_ids and settings.SESSION_USER_CACHE_TIMEOUT:
+        transaction.on_commit(lambda: [_bump(pk) for pk in user_ids])
+
+
+def _cache_entry(user):
+    """``(user without its password, session hash)``; the password loads from the database if needed"""
+    cached = copy.copy(user)
+    del cached.password
+    return cached, user.get_session_auth_hash()
+
+
+class EmailBackend(ModelBackend):
+    """Log members in by email (any case); usernames still work for accounts without one"""
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        login = email or username or kwargs.get(CustomUser.USERNAME_FIELD)
+        if not login or password is None:
+            return None
+        matches = list(
+            CustomUser._default_manager.filter(
+                Q(email_normalized=login.strip().lower()) | Q(username=login)
+            ).order_by('pk')[:2]
+        )
+        # An email match wins over another account whose username happens to look like it
+        matches.sort(key=lambda user: user.email_normalized != login.strip().lower())
+        if not matches:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            CustomUser().set_password(password)
+            return None
+        user = matches[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        timeout = settings.SESSION_USER_CACHE_TIMEOUT
+        key = _key(user_id) if timeout else None
+        entry = cache.get(key) if key else None
+        if entry is None:
+            user = CustomUser._default_manager.only(*SESSION_USER_FIELDS).filter(pk=user_id).first()
+            if user is None:
+                return None
+            if key:
+                cache.set(key, _cache_entry(user), timeout)
+        else:
+            user, user.cached_session_auth_hash = entry
+        return user if self.user_can_authenticate(user) else None
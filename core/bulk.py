@@ -0,0 +1,80 @@
+"""
+Bulk member writes.
+
+Used by the import and data generation commands to add members thousands at a
+time. Users and referrals are written with ``bulk_create``, and genealogy rows
+and sponsor counters are updated once per batch, instead of paying for
+``join``'s per-member queries on every row. Team counters (downline size and
+volume) are left to the caller's ``counters.rebuild_team_counters`` after its
+last batch.
+"""
+from decimal import Decimal
+
+from . import counters, genealogy
+from .models import CustomUser, Purchase, Referral
+
+BATCH_SIZE = 1000
+
+
+def _assign_pks(members):
+    """Fill in pks after a bulk insert on backends that can't return them (MySQL)"""
+    pks = dict(
+        CustomUser.objects.filter(username__in=[member.username for member in members])
+        .values_list('username', 'pk')
+    )
+    for member in members:
+        member.pk = pks[member.username]
+
+
+def add_referrals(referrals, batch_size=BATCH_SIZE, link=True):
+    """Write unsaved ``Referral`` rows and refresh their sponsors' counters.
+
+    With ``link`` the new members are also indexed in the genealogy; callers
+    attaching members that already have a downline index them with
+    ``genealogy.graft_subtree`` instead. Returns the number written.
+    """
+    if not referrals:
+        return 0
+    Referral.objects.bulk_create(referrals, batch_size=batch_size)
+    edges = [(referral.sponsor_id, referral.referred_user_id) for referral in referrals]
+    if link:
+        genealogy.link_members(edges, batch_size=batch_size)
+    counters.rebuild_counters(CustomUser.objects.filter(pk__in={sponsor_id for sponsor_id, _ in edges}), team=False)
+    return len(referrals)
+
+
+def insert_members(members, sponsors, commissions=None, batch_size=BATCH_SIZE):
+    """Insert unsaved ``members`` and link each one to its sponsor.
+
+    Members must already carry their ``referral_id`` and password hash.
+    ``sponsors[i]`` is ``None`` for a member without a sponsor, the pk of an
+    existing member, or another (earlier or later) member of this batch.
+    ``commissions[i]`` is stored on the ``Referral`` row (default 0, no
+    wallet credit). Returns the number of referrals written.
+    """
+    if not members:
+        return 0
+    CustomUser.objects.bulk_create(members, batch_size=batch_size)
+    if members[0].pk is None:
+        _assign_pks(members)
+
+    commissions = commissions or [Decimal('0.00')] * len(members)
+    referrals = [
+        Referral(
+            sponsor_id=sponsor if isinstance(sponsor, int) else sponsor.pk,
+            referred_user_id=member.pk,
+            commission_earned=commission,
+        )
+        for member, sponsor, commission in zip(members, sponsors, commissions)
+        if sponsor is not None
+    ]
+    return add_referrals(referrals, batch_size=batch_size)
+
+
+def add_purchases(purchases, batch_size=BATCH_SIZE):
+    """Write unsaved ``Purchase`` rows and refresh their buyers' counters"""
+    if not purchases:
+        return 0
+    Purchase.objects.bulk_create(purchases, batch_size=batch_size)
+    counters.rebuild_counters(CustomUser.objects.filter(pk__in={purchase.user_id for purchase in purchases}), team=False)
+    return len(purchases)
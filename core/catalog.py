@@ -0,0 +1,120 @@
+"""
+Product catalog and orders.
+
+Purchases are keyed by product id and priced from the catalog, never from
+what the client posts. The catalog (``{product_id: (name, price)}``) is
+cached under a version number that saving or deleting a ``Product`` bumps
+once the change commits (see ``core.signals``), so while the cache is warm a
+purchase runs no catalog queries at all. With the per-process LocMemCache
+other workers (and management commands) can't see the version, so the
+catalog is also reloaded after MAX_AGE seconds, and an order naming a
+product the cached catalog doesn't know rereads it before giving up.
+
+An order of one or many items is a single transaction: one bulk INSERT of
+its ``Purchase`` rows, one counter UPDATE for the buyer and, when purchase
+commission levels are configured, one ledger batch for the upline.
+"""
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import commissions
+from .counters import record_purchases
+from .models import Product, Purchase
+from .rates import current_rates
+
+VERSION_KEY = 'core:catalog:version'
+MAX_AGE = 60  # seconds
+MAX_ORDER_ITEMS = 50
+MAX_QUANTITY = 100
+
+
+class OrderError(ValueError):
+    """Raised for orders naming unknown products or invalid quantities"""
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def get_catalog(refresh=False):
+    """``{product_id: (name, price)}`` for every product, cached per version for up to MAX_AGE seconds"""
+    key = f'core:catalog:{get_catalog_version()}'
+    catalog = None if refresh else cache.get(key)
+    if catalog is None:
+        catalog = {pk: (name, price) for pk, name, price in Product.objects.values_list('pk', 'name', 'price')}
+        cache.set(key, catalog, MAX_AGE)
+    return catalog
+
+
+def find_product(catalog, name):
+    """Product id for a name, for clients that still post ``product_name``"""
+    for pk, (product_name, _) in catalog.items():
+        if product_name == name:
+            return pk
+    raise OrderError(f"Unknown product {name!r}")
+
+
+def parse_quantity(value):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise OrderError("Quantity must be a whole number") from None
+    if not 1 <= quantity <= MAX_QUANTITY:
+        raise OrderError(f"Quantity must be between 1 and {MAX_QUANTITY}")
+    return quantity
+
+
+def parse_items(items):
+    """Validate ``(product_id, quantity)`` pairs, merging repeated products"""
+    order = {}
+    for product_id, quantity in items:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise OrderError("Invalid product id") from None
+        order[product_id] = order.get(product_id, 0) + parse_quantity(quantity)
+    if not order:
+        raise OrderError("The cart is empty")
+    if len(order) > MAX_ORDER_ITEMS:
+        raise OrderError(f"An order can hold at most {MAX_ORDER_ITEMS} products")
+    for product_id, quantity in order.items():
+        if quantity > MAX_QUANTITY:
+            raise OrderError(f"Quantity must be between 1 and {MAX_QUANTITY}")
+    return list(order.items())
+
+
+@transaction.atomic
+def place_order(user, items):
+    """Record one purchase per ``(product_id, quantity)`` item. Returns ``(purchases, total)``."""
+    items = parse_items(items)
+    catalog = get_catalog()
+    if any(product_id not in catalog for product_id, _ in items):
+        # Possibly added in another worker since this one cached the catalog
+        catalog = get_catalog(refresh=True)
+    purchases = []
+    total = Decimal('0.00')
+    for product_id, quantity in items:
+        if product_id not in catalog:
+            raise OrderError(f"Unknown product {product_id}")
+        amount = catalog[product_id][1] * quantity
+        purchases.append(Purchase(user=user, product_id=product_id, quantity=quantity, total_amount=amount))
+        total += amount
+    # bulk_create skips Purchase.save(), so the counters are bumped once for the whole order
+    Purchase.objects.bulk_create(purchases)
+    record_purchases(user.pk, len(purchases), total)
+    commissions.credit_purchase(user.pk, total, current_rates(), f"Upline purchase: {user.referral_id}")
+    return purchases, total
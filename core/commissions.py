@@ -0,0 +1,58 @@
+"""
+Upline commissions.
+
+A signup or purchase pays each upline member the commission configured for
+their level (``CommissionLevel``, read from the ``core.rates`` snapshot).
+The upline comes from the genealogy closure in one query and every level's
+credit is posted as one ledger batch - one bulk insert and one set-based
+balance update - so posting costs the same for a member 3 or 60 levels deep.
+"""
+from decimal import Decimal
+
+from . import ledger
+from .models import ReferralClosure
+
+CENT = Decimal('0.01')
+
+
+def level_commissions(levels, upline, value):
+    """``(ancestor_id, depth, amount)`` for each upline member whose level pays.
+
+    ``levels`` is ``{level: (amount, percentage)}``, ``upline`` is
+    ``(ancestor_id, depth)`` tuples and ``value`` is what percentages apply to.
+    """
+    credits = []
+    for ancestor_id, depth in upline:
+        if depth in levels:
+            amount, percentage = levels[depth]
+            commission = (amount + value * percentage / 100).quantize(CENT)
+            if commission > 0:
+                credits.append((ancestor_id, depth, commission))
+    return credits
+
+
+def upline_of_member(member_id, max_depth):
+    """A member's ancestors up to ``max_depth`` levels above them, nearest first"""
+    return list(
+        ReferralClosure.objects.filter(descendant_id=member_id, depth__lte=max_depth)
+        .order_by('depth')
+        .values_list('ancestor_id', 'depth')
+    )
+
+
+def post_credits(credits, description):
+    """Post ``level_commissions`` results as one ledger batch"""
+    if credits:
+        ledger.post_many(
+            [(ancestor_id, amount) for ancestor_id, _, amount in credits], 'upline_commission', description,
+        )
+
+
+def credit_purchase(user_id, total, rates, description):
+    """Pay the buyer's upline its purchase commissions on an order worth ``total``"""
+    if not rates.purchase_levels:
+        return []
+    upline = upline_of_member(user_id, max(rates.purchase_levels))
+    credits = level_commissions(rates.purchase_levels, upline, total)
+    post_credits(credits, description)
+    return credits
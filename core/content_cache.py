@@ -0,0 +1,57 @@
+"""
+Versioned cache for admin-edited public content.
+
+Cached home page output is keyed on a content version stored in the cache.
+Saving or deleting a ``HomePageSection``, ``PlanItem``, ``ProductItem`` or
+the ``Product`` a card sells (its price is shown from the catalog) bumps the
+version once the change commits (see ``core.signals``), so edits show up on
+the next request and old entries simply age out. With the per-process
+LocMemCache other workers can't see the version, so entries also expire
+after MAX_AGE seconds; use a shared cache backend in production so edits
+show up everywhere at once.
+
+The content is read from the primary: a lagging replica read right after a
+bump would be cached under the new version.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import HomePageSection, PlanItem, ProductItem
+
+VERSION_KEY = 'core:home:version'
+MAX_AGE = 60  # seconds
+
+
+def get_content_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Never restart from a number an evicted version may already have used
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def page_key(name, version):
+    return f'core:page:{name}:{version}'
+
+
+def get_home_content(version):
+    """Sections, plan items and product items for the home page, cached per version"""
+    key = f'core:home:content:{version}'
+    content = cache.get(key)
+    if content is None:
+        content = {
+            'sections': {s.section_type: s for s in HomePageSection.objects.filter(is_active=True)},
+            'plan_items': list(PlanItem.objects.filter(is_active=True)),
+            'product_items': list(ProductItem.objects.filter(is_active=True).select_related('product')),
+        }
+        cache.set(key, content, MAX_AGE)
+    return content
@@ -0,0 +1,164 @@
+"""
+Denormalized per-member counters.
+
+``CustomUser.referral_count``, ``purchase_count``, ``total_spent`` and
+``total_referral_earnings`` are bumped with in-database ``F()`` increments as
+``Referral``/``Purchase`` rows are written, so reading a member's stats is a
+single row read.
+
+``downline_count`` and ``team_volume`` cover the whole downline. Updating
+them as events happen would write every upline row up to the root, so every
+signup and purchase in the network would queue on the root's row lock.
+Instead an event writes one ``TeamChange`` row, and ``roll_up_team_changes``
+(the ``roll_up_team_counters`` command, run periodically) adds the queued
+changes to the upline in batches; the team counters run behind by up to one
+roll-up interval.
+
+Bulk writers that bypass ``Model.save()`` must call the ``record_*`` helpers
+themselves; ``rebuild_counters`` recomputes everything, and commands that
+write the network in batches call ``rebuild_team_counters`` once at the end.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Func, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CustomUser, Purchase, Referral, ReferralClosure, TeamChange
+
+ZERO = Value(Decimal('0.00'))
+ROLL_UP_BATCH_SIZE = 1000
+
+
+def record_purchases(user_id, count, amount):
+    """Add ``count`` purchases worth ``amount`` to a member's counters"""
+    CustomUser.objects.filter(pk=user_id).update(
+        purchase_count=F('purchase_count') + count,
+        total_spent=F('total_spent') + amount,
+    )
+    record_team(user_id, volume=amount)
+
+
+def record_team(member_id, members=0, volume=0):
+    """Queue ``members`` new members and ``volume`` of purchases for ``member_id``'s upline.
+
+    One INSERT however deep the member sits; nothing in the upline is locked.
+    """
+    TeamChange.objects.create(member_id=member_id, members=members, volume=volume)
+
+
+def roll_up_team_changes(batch_size=ROLL_UP_BATCH_SIZE):
+    """Add queued ``TeamChange`` rows to their upline's counters and delete them.
+
+    Each batch is one transaction: read the changes, read their uplines from
+    the genealogy closure, one bulk UPDATE of the ancestors' counters and one
+    DELETE. Only the changes read are deleted, so changes committed meanwhile
+    wait for the next batch. Returns the number of changes applied.
+    """
+    applied = 0
+    while True:
+        with transaction.atomic():
+            changes = list(
+                TeamChange.objects.select_for_update()
+                .order_by('pk')
+                .values_list('pk', 'member_id', 'members', 'volume')[:batch_size]
+            )
+            if not changes:
+                return applied
+            by_member = defaultdict(lambda: [0, Decimal('0.00')])
+            for _, member_id, members, volume in changes:
+                by_member[member_id][0] += members
+                by_member[member_id][1] += volume
+            by_ancestor = defaultdict(lambda: [0, Decimal('0.00')])
+            upline = ReferralClosure.objects.filter(descendant_id__in=by_member).values_list('ancestor_id', 'descendant_id')
+            for ancestor_id, member_id in upline.iterator(chunk_size=batch_size):
+                by_ancestor[ancestor_id][0] += by_member[member_id][0]
+                by_ancestor[ancestor_id][1] += by_member[member_id][1]
+            CustomUser.objects.bulk_update(
+                [
+                    CustomUser(
+                        pk=ancestor_id,
+                        downline_count=F('downline_count') + members,
+                        team_volume=F('team_volume') + volume,
+                    )
+                    for ancestor_id, (members, volume) in by_ancestor.items()
+                ],
+                ['downline_count', 'team_volume'],
+                batch_size=batch_size,
+            )
+            TeamChange.objects.filter(pk__in=[pk for pk, *_ in changes]).delete()
+        applied += len(changes)
+
+
+def referral_changes(count, commission):
+    """``update()`` arguments adding ``count`` referrals earning ``commission``"""
+    return {
+        'referral_count': F('referral_count') + count,
+        'total_referral_earnings': F('total_referral_earnings') + commission,
+    }
+
+
+def record_referrals(sponsor_id, count, commission):
+    """Add ``count`` referrals earning ``commission`` to a sponsor's counters"""
+    CustomUser.objects.filter(pk=sponsor_id).update(**referral_changes(count, commission))
+
+
+def _aggregate(queryset, field, expression):
+    return Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(value=expression)
+        .values('value')
+    )
+
+
+def _downline_sum(queryset, member_field, field):
+    # Rows of the downline, filtered on closure descendant ids rather than
+    # joined through CustomUser, which MySQL won't read while updating it
+    rows = queryset.filter(**{
+        f'{member_field}__in': ReferralClosure.objects.filter(ancestor_id=OuterRef(OuterRef('pk'))).values('descendant_id')
+    })
+    return Subquery(rows.order_by().values(value=Func(field, function='SUM'))[:1])
+
+
+def _team_counters():
+    # Changes still queued are already in the source tables; leave them out so
+    # the next roll-up doesn't add them twice
+    return {
+        'downline_count': (
+            Coalesce(_aggregate(ReferralClosure.objects, 'ancestor', Count('pk')), 0)
+            - Coalesce(_downline_sum(TeamChange.objects, 'member_id', 'members'), 0)
+        ),
+        'team_volume': (
+            Coalesce(_downline_sum(Purchase.objects, 'user_id', 'total_amount'), ZERO)
+            - Coalesce(_downline_sum(TeamChange.objects, 'member_id', 'volume'), ZERO)
+        ),
+    }
+
+
+def rebuild_team_counters(users=None):
+    """Recompute ``downline_count`` and ``team_volume`` from the genealogy closure.
+
+    One UPDATE, so the source rows and the queued changes it subtracts are
+    read at the same point in time.
+    """
+    users = CustomUser.objects.all() if users is None else users
+    return users.update(**_team_counters())
+
+
+def rebuild_counters(users=None, team=True):
+    """Recompute counters from the source tables in one set-based UPDATE.
+
+    Bulk writers pass ``team=False``: a batch's sponsors can have large
+    downlines, and their team counters are rebuilt once after the last batch.
+    """
+    users = CustomUser.objects.all() if users is None else users
+    return users.update(
+        referral_count=Coalesce(_aggregate(Referral.objects, 'sponsor', Count('pk')), 0),
+        total_referral_earnings=Coalesce(_aggregate(Referral.objects, 'sponsor', Sum('commission_earned')), ZERO),
+        purchase_count=Coalesce(_aggregate(Purchase.objects, 'user', Count('pk')), 0),
+        total_spent=Coalesce(_aggregate(Purchase.objects, 'user', Sum('total_amount')), ZERO),
+        **(_team_counters() if team else {}),
+    )
@@ -0,0 +1,141 @@
+"""
+Team tree, one subtree at a time.
+
+The team page starts at the member and expands nodes on demand: a request
+returns one node and up to ``depth`` levels below it, at most ``limit``
+children per node, each expanded node with a cursor for the rest of its
+children. A node's downline size and team volume are the denormalized
+counters on its row, current as of the last team counter roll-up
+(``core.counters``), so a member with a hundred thousand descendants costs
+the same as one with ten: one query finds the node and checks it sits in the
+viewer's downline, then one query per level reads the children, newest first
+along ``core_referral_sponsor_date_idx``.
+"""
+from collections import defaultdict
+
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from .models import CustomUser, Referral, ReferralClosure
+from .pagination import encode_cursor, keyset_page
+
+DEFAULT_DEPTH = 1
+MAX_DEPTH = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Nodes in one response; deeper levels expand fewer parents once it runs out
+MAX_NODES = 200
+
+NODE_FIELDS = (
+    'id', 'referral_id', 'first_name', 'last_name', 'is_active_member',
+    'referral_count', 'downline_count', 'team_volume', 'created_at',
+)
+CHILD_ORDERING = ('-referral_date', '-pk')
+
+
+def bounded(value, default, maximum):
+    """Parse a client-supplied limit, clamped to ``1..maximum``"""
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+def find_node(viewer, referral_id=None):
+    """The viewer, or the member ``referral_id`` in their downline; ``None`` otherwise.
+
+    The member's ``level`` below the viewer is read from the genealogy index in
+    the same query, which also rules out members outside the viewer's team.
+    """
+    members = CustomUser.objects.only(*NODE_FIELDS)
+    if not referral_id or referral_id == viewer.referral_id:
+        member = members.filter(pk=viewer.pk).first()
+        if member is not None:
+            member.level = 0
+        return member
+    link = ReferralClosure.objects.filter(ancestor_id=viewer.pk, descendant_id=OuterRef('pk'))
+    return (
+        members.annotate(level=Subquery(link.values('depth')[:1]))
+        .filter(referral_id=referral_id, level__isnull=False)
+        .first()
+    )
+
+
+def _referrals():
+    return Referral.objects.select_related('referred_user').only(
+        'id', 'sponsor', 'referral_date', *(f'referred_user__{name}' for name in NODE_FIELDS)
+    )
+
+
+def _cursor(referral):
+    return encode_cursor([getattr(referral, name.lstrip('-')) for name in CHILD_ORDERING])
+
+
+def _first_pages(parent_ids, limit):
+    """First page of children for each of ``parent_ids`` in one query: ``{parent_id: (rows, next_cursor)}``"""
+    rank = Window(
+        RowNumber(),
+        partition_by=F('sponsor_id'),
+        order_by=[F('referral_date').desc(), F('pk').desc()],
+    )
+    ranked = (
+        _referrals().filter(sponsor_id__in=parent_ids)
+        .annotate(rank=rank)
+        .filter(rank__lte=limit + 1)
+        .order_by('sponsor_id', 'rank')
+    )
+    rows = defaultdict(list)
+    for referral in ranked:
+        rows[referral.sponsor_id].append(referral)
+    pages = {}
+    for parent_id, children in rows.items():
+        if len(children) > limit:
+            children = children[:limit]
+            pages[parent_id] = (children, _cursor(children[-1]))
+        else:
+            pages[parent_id] = (children, None)
+    return pages
+
+
+def _node(member, level):
+    return {
+        'id': member.referral_id,
+        'name': member.get_full_name(),
+        'level': level,
+        'joined': member.created_at.date().isoformat(),
+        'active': member.is_active_member,
+        'direct': member.referral_count,
+        'downline': member.downline_count,
+        'team_volume': str(member.team_volume),
+    }
+
+
+def _expand(node, referrals, next_cursor):
+    """Attach a page of children to ``node``; returns ``(member, child_node)`` pairs"""
+    children = [(referral.referred_user, _node(referral.referred_user, node['level'] + 1)) for referral in referrals]
+    node['children'] = [child for _, child in children]
+    node['next_cursor'] = next_cursor
+    return children
+
+
+def subtree(member, depth=DEFAULT_DEPTH, limit=DEFAULT_LIMIT, cursor=None):
+    """``member`` (from ``find_node``) as a node with ``depth`` levels of children below it.
+
+    ``cursor`` pages ``member``'s own children; deeper levels always start at
+    their first page. Nodes left unexpanded have no ``children`` key; their
+    ``direct`` count says whether there is anything to load.
+    """
+    root = _node(member, member.level)
+    rows, next_cursor = keyset_page(_referrals().filter(sponsor_id=member.pk), CHILD_ORDERING, cursor, limit)
+    frontier = _expand(root, rows, next_cursor)
+    budget = MAX_NODES - len(frontier)
+    for _ in range(depth - 1):
+        parents = [(child, node) for child, node in frontier if child.referral_count][:budget // limit]
+        if not parents:
+            break
+        pages = _first_pages([child.pk for child, _ in parents], limit)
+        frontier = []
+        for child, node in parents:
+            frontier += _expand(node, *pages.get(child.pk, ([], None)))
+        budget -= len(frontier)
+    return root
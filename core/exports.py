@@ -0,0 +1,189 @@
+"""
+Streaming CSV and JSONL exports.
+
+Rows are read in keyset-paged chunks (see core.pagination) and written to the
+response as they are produced, so an export of any size holds one chunk in
+memory, sends its first bytes straight away and never keeps a long-running
+cursor open on the database.
+"""
+import csv
+import json
+import re
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import CustomUser, Purchase, Referral, Withdrawal
+from .pagination import keyset_page
+
+CHUNK_SIZE = 2000
+LINES_PER_WRITE = 500
+FORMATS = ('csv', 'jsonl')
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# ...but a signed number or phone number ("+91 98765 43210", "-250.00") is data, not a formula
+PLAIN_NUMBER = re.compile(r'[+-][\d\s().-]*\d[\d\s().-]*')
+
+
+class Dataset:
+    """An exportable table: ``(header, lookup)`` columns plus its filterable fields"""
+
+    def __init__(self, model, columns, date_field, statuses=None):
+        self.model = model
+        self.header = [header for header, _ in columns]
+        self.lookups = [lookup for _, lookup in columns]
+        self.date_field = date_field
+        self.statuses = statuses or {}
+
+
+DATASETS = {
+    'members': Dataset(
+        CustomUser,
+        [
+            ('id', 'id'), ('email', 'email'), ('first_name', 'first_name'), ('last_name', 'last_name'),
+            ('mobile', 'mobile'), ('referral_id', 'referral_id'), ('sponsor_id', 'sponsor_id'),
+            ('sponsor_name', 'sponsor_name'), ('account_balance', 'account_balance'),
+            ('total_referral_earnings', 'total_referral_earnings'), ('referral_count', 'referral_count'),
+            ('purchase_count', 'purchase_count'), ('total_spent', 'total_spent'),
+            ('is_active_member', 'is_active_member'), ('created_at', 'created_at'),
+        ],
+        'created_at',
+        {'active': Q(is_active_member=True), 'inactive': Q(is_active_member=False)},
+    ),
+    'purchases': Dataset(
+        Purchase,
+        [
+            ('id', 'id'), ('user_id', 'user_id'), ('user_email', 'user__email'),
+            ('product_id', 'product_id'), ('product_name', 'product__name'), ('quantity', 'quantity'),
+            ('total_amount', 'total_amount'), ('purchase_date', 'purchase_date'),
+        ],
+        'purchase_date',
+    ),
+    'referrals': Dataset(
+        Referral,
+        [
+            ('id', 'id'), ('sponsor_id', 'sponsor_id'), ('sponsor_email', 'sponsor__email'),
+            ('referred_user_id', 'referred_user_id'), ('referred_user_email', 'referred_user__email'),
+            ('commission_earned', 'commission_earned'), ('referral_date', 'referral_date'),
+        ],
+        'referral_date',
+    ),
+    'withdrawals': Dataset(
+        Withdrawal,
+        [
+            ('id', 'id'), ('user_id', 'user_id'), ('user_email', 'user__email'), ('amount', 'amount'),
+            ('admin_charge', 'admin_charge'), ('net_amount', 'net_amount'), ('status', 'status'),
+            ('requested_date', 'requested_date'), ('processed_date', 'processed_date'), ('notes', 'notes'),
+        ],
+        'requested_date',
+        {status: Q(status=status) for status, _ in Withdrawal.STATUS_CHOICES},
+    ),
+}
+
+
+def day_start(raw):
+    """Midnight (current time zone) at the start of a ``YYYY-MM-DD`` date"""
+    day = parse_date(raw)
+    if day is None:
+        raise ValueError(raw)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(name, date_from=None, date_to=None, status=None):
+    """``(dataset, queryset)`` for an export; raises ValueError for unknown names or filters"""
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        raise ValueError(f"Unknown export {name!r}")
+    queryset = dataset.model.objects.all()
+    try:
+        if date_from:
+            queryset = queryset.filter(**{f'{dataset.date_field}__gte': day_start(date_from)})
+        if date_to:
+            queryset = queryset.filter(**{f'{dataset.date_field}__lt': day_start(date_to) + timedelta(days=1)})
+    except ValueError:
+        raise ValueError("Dates must look like YYYY-MM-DD") from None
+    if status:
+        if not dataset.statuses:
+            raise ValueError(f"{name.capitalize()} have no status to filter by")
+        if status not in dataset.statuses:
+            raise ValueError(f"Status for {name} must be one of: {', '.join(dataset.statuses)}")
+        queryset = queryset.filter(dataset.statuses[status])
+    return dataset, queryset
+
+
+def iter_keyset(queryset, ordering=('pk',), chunk_size=CHUNK_SIZE):
+    """Every row of ``queryset``, fetched ``chunk_size`` at a time"""
+    cursor = None
+    while True:
+        rows, cursor = keyset_page(queryset, ordering, cursor, chunk_size)
+        yield from rows
+        if cursor is None:
+            return
+
+
+def iter_values(queryset, lookups, chunk_size=CHUNK_SIZE):
+    """Tuples of ``lookups`` (the first must be ``id``) for every row, by ascending pk.
+
+    Like ``iter_keyset`` but without building model instances.
+    """
+    queryset = queryset.order_by('pk').values_list(*lookups)
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(pk__gt=last))[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1][0]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PLAIN_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def iter_lines(header, rows, format='csv'):
+    """Encode ``rows`` as CSV (with a header line) or JSON Lines, a few hundred lines per string"""
+    if format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        encode = lambda row: writer.writerow([_cell(value) for value in row])
+    else:
+        encode = lambda row: json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder) + '\n'
+    lines = []
+    for row in rows:
+        lines.append(encode(row))
+        if len(lines) >= LINES_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def stream_response(filename, header, rows, format='csv'):
+    """Stream ``rows`` as a CSV or JSONL download"""
+    content_type = 'text/csv; charset=utf-8' if format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    response = StreamingHttpResponse(iter_lines(header, rows, format), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def csv_response(filename, header, rows):
+    return stream_response(filename, header, rows, 'csv')
+
+
+def export_filename(name, format):
+    return f"{name}-{timezone.localdate():%Y%m%d}.{format}"
@@ -0,0 +1,183 @@
+"""
+Referral genealogy index.
+
+Every sponsor -> member edge in ``Referral`` is expanded into ``ReferralClosure``
+rows, one per ancestor of the new member, so that downline, per-level counts and
+upline chains are single indexed queries instead of one query per level.
+"""
+from collections import defaultdict
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from .counters import record_team
+from .models import CustomUser, Referral, ReferralClosure
+
+BATCH_SIZE = 5000
+
+
+def insert_rows(rows, batch_size=BATCH_SIZE):
+    """Write ``(ancestor_id, descendant_id, depth)`` tuples. Returns rows written.
+
+    Index rows are plain integer triples, so bulk writers send them straight
+    to ``executemany`` instead of building a model instance per row.
+    """
+    connection = connections[router.db_for_write(ReferralClosure)]
+    table = connection.ops.quote_name(ReferralClosure._meta.db_table)
+    sql = f'INSERT INTO {table} (ancestor_id, descendant_id, depth) VALUES (%s, %s, %s)'
+    rows = iter(rows)
+    written = 0
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+            written += len(batch)
+    return written
+
+
+def upline_of(sponsor_id):
+    """Upline of a new member of ``sponsor_id`` as ``(ancestor_id, depth)`` tuples, nearest first"""
+    return [(sponsor_id, 1)] + [
+        (ancestor_id, depth + 1)
+        for ancestor_id, depth in ReferralClosure.objects.filter(descendant_id=sponsor_id)
+        .order_by('depth')
+        .values_list('ancestor_id', 'depth')
+    ]
+
+
+def link_member(member, sponsor, upline=None):
+    """Index a newly referred member under its sponsor.
+
+    Returns the member's upline as a list of ``(ancestor_id, depth)`` tuples,
+    nearest first, so callers (e.g. commission logic) don't have to re-read it.
+    Pass ``upline`` (from ``upline_of``) when it was read ahead of time.
+    The upline's ``downline_count`` goes up at the next team counter roll-up.
+    """
+    if upline is None:
+        upline = upline_of(sponsor.pk)
+    ReferralClosure.objects.bulk_create([
+        ReferralClosure(ancestor_id=ancestor_id, descendant_id=member.pk, depth=depth)
+        for ancestor_id, depth in upline
+    ])
+    record_team(member.pk, members=1)
+    return upline
+
+
+def link_members(edges, batch_size=BATCH_SIZE):
+    """Bulk version of ``link_member`` for new ``(sponsor_id, member_id)`` edges.
+
+    Sponsors may themselves be members of the same batch. Uplines of sponsors
+    that are already indexed are read in one query. Returns rows written.
+    """
+    sponsor_of = {member_id: sponsor_id for sponsor_id, member_id in edges}
+    known = {sponsor_id for sponsor_id in sponsor_of.values() if sponsor_id not in sponsor_of}
+    uplines = {sponsor_id: () for sponsor_id in known}
+    existing = (
+        ReferralClosure.objects.filter(descendant_id__in=known)
+        .order_by('descendant_id', 'depth')
+        .values_list('descendant_id', 'ancestor_id')
+    )
+    for descendant_id, ancestor_id in existing.iterator(chunk_size=batch_size):
+        uplines[descendant_id] += (ancestor_id,)
+
+    def rows():
+        for member_id in sponsor_of:
+            # Walk up to the nearest member whose upline is known, then fill in on the way back
+            chain = []
+            node = member_id
+            while node not in uplines:
+                if node in chain:
+                    raise ValueError(f"Referral cycle through member {node}")
+                chain.append(node)
+                node = sponsor_of[node]
+            for node in reversed(chain):
+                upline = (sponsor_of[node],) + uplines[sponsor_of[node]]
+                uplines[node] = upline
+                for depth, ancestor_id in enumerate(upline, start=1):
+                    yield ancestor_id, node, depth
+
+    return insert_rows(rows(), batch_size)
+
+
+def graft_subtree(sponsor_id, member_id, batch_size=BATCH_SIZE):
+    """Index an edge to a member that already has an indexed downline.
+
+    Every ancestor of the sponsor (and the sponsor) becomes an ancestor of the
+    member and each of its descendants. Returns rows written.
+    """
+    upline = [(sponsor_id, 1)] + [
+        (ancestor_id, depth + 1)
+        for ancestor_id, depth in ReferralClosure.objects.filter(descendant_id=sponsor_id).values_list('ancestor_id', 'depth')
+    ]
+    subtree = [(member_id, 0)] + list(
+        ReferralClosure.objects.filter(ancestor_id=member_id).values_list('descendant_id', 'depth')
+    )
+    return insert_rows(
+        (
+            (ancestor_id, descendant_id, up + down)
+            for ancestor_id, up in upline
+            for descendant_id, down in subtree
+        ),
+        batch_size,
+    )
+
+
+def get_upline(member, max_depth=None):
+    """Sponsors above ``member``, nearest first"""
+    # Conditions on the link must go in one filter() call to share a single join
+    lookups = {'descendant_links__descendant': member}
+    if max_depth:
+        lookups['descendant_links__depth__lte'] = max_depth
+    return CustomUser.objects.filter(**lookups).order_by('descendant_links__depth')
+
+
+def get_downline(member, max_depth=None):
+    """Every member below ``member``, level by level"""
+    lookups = {'ancestor_links__ancestor': member}
+    if max_depth:
+        lookups['ancestor_links__depth__lte'] = max_depth
+    return CustomUser.objects.filter(**lookups).order_by('ancestor_links__depth', 'id')
+
+
+def get_level_counts(member, max_depth=None):
+    """Return ``{level: member_count}`` for the whole downline"""
+    qs = ReferralClosure.objects.filter(ancestor=member)
+    if max_depth:
+        qs = qs.filter(depth__lte=max_depth)
+    rows = qs.values('depth').annotate(total=Count('descendant_id')).order_by('depth')
+    return {row['depth']: row['total'] for row in rows}
+
+
+def get_downline_size(member):
+    return ReferralClosure.objects.filter(ancestor=member).count()
+
+
+def iter_closure_rows(edges):
+    """Expand ``(sponsor_id, member_id)`` edges into ``(ancestor_id, descendant_id, depth)`` rows.
+
+    Walks the forest top-down so each member's upline is built from its
+    sponsor's, without recursion (trees can be very deep).
+    """
+    children = defaultdict(list)
+    has_sponsor = set()
+    for sponsor_id, member_id in edges:
+        children[sponsor_id].append(member_id)
+        has_sponsor.add(member_id)
+
+    roots = [node for node in children if node not in has_sponsor]
+    stack = [(root, ()) for root in roots]
+    while stack:
+        node, upline = stack.pop()
+        child_upline = (node,) + upline
+        for child in children.get(node, ()):
+            for depth, ancestor_id in enumerate(child_upline, start=1):
+                yield ancestor_id, child, depth
+            stack.append((child, child_upline))
+
+
+def rebuild_closure(batch_size=BATCH_SIZE):
+    """Recreate the whole index from ``Referral`` rows. Returns rows written."""
+    edges = Referral.objects.values_list('sponsor_id', 'referred_user_id').iterator(chunk_size=batch_size)
+    with transaction.atomic():
+        ReferralClosure.objects.all().delete()
+        return insert_rows(iter_closure_rows(edges), batch_size)
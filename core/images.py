@@ -0,0 +1,146 @@
+"""
+Thumbnail pipeline for uploaded images.
+
+Profile photos and home page product images are stored as uploaded, then
+resized off the request path: once the saving transaction commits, a small
+thread pool renders each fixed size as a metadata-free WebP next to the
+original and records the result on the row (``{'source': name, size: path}``).
+Templates read ``photo_urls.<size>`` / ``image_urls.<size>``, which fall back
+to the original until the thumbnails are ready. ``rebuild_thumbnails`` fills
+in rows saved before the pipeline existed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height), about twice the largest size each is displayed at
+PROFILE_SIZES = {'avatar': (64, 64), 'profile': (240, 240)}
+PRODUCT_SIZES = {'card': (600, 500)}
+WEBP_QUALITY = 80
+THUMBNAIL_DIR = 'thumbnails'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_WORKERS', 2), thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def thumbnail_name(source, size):
+    """Storage path of one thumbnail, derived from the original's path"""
+    return f'{THUMBNAIL_DIR}/{source}-{size}.webp'
+
+
+def render(image, box):
+    """Crop ``image`` to fill ``box`` and encode it as WebP without EXIF/ICC metadata"""
+    if image.mode not in ('RGB', 'RGBA'):
+        transparent = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+    thumbnail = ImageOps.fit(image, box, method=Image.Resampling.LANCZOS)
+    output = BytesIO()
+    # Only pixel data is written: Pillow adds EXIF/ICC to WebP only when passed in
+    thumbnail.save(output, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def make_thumbnails(field_file, sizes):
+    """Write every size for ``field_file``; returns ``{size: storage name}``"""
+    storage = field_file.storage
+    with field_file.open('rb') as handle, Image.open(handle) as image:
+        # Apply the camera's rotation before the orientation tag is dropped
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    written = {}
+    for size, box in sizes.items():
+        name = thumbnail_name(field_file.name, size)
+        storage.delete(name)
+        written[size] = storage.save(name, ContentFile(render(image, box)))
+    return written
+
+
+def delete_thumbnails(storage, thumbnails):
+    for size, name in thumbnails.items():
+        if size not in ('source', 'error'):
+            storage.delete(name)
+
+
+def thumbnail_urls(field_file, thumbnails, sizes):
+    """``{size: url}`` for templates, using the original until a size is ready"""
+    if not field_file:
+        return {}
+    ready = thumbnails if thumbnails.get('source') == field_file.name else {}
+    return {
+        size: field_file.storage.url(ready[size]) if size in ready else field_file.url
+        for size in sizes
+    }
+
+
+def needs_thumbnails(field_file, thumbnails):
+    """True when the recorded thumbnails don't belong to the current file"""
+    return (field_file.name or None) != thumbnails.get('source')
+
+
+def process(model, pk, field_name, sizes, done=None):
+    """Bring one row's thumbnails up to date with its image field.
+
+    ``done`` is called after new thumbnails are recorded (e.g. to refresh caches).
+    """
+    thumbnails_field = f'{field_name}_thumbnails'
+    row = model.objects.filter(pk=pk).only(field_name, thumbnails_field).first()
+    if row is None:
+        return
+    field_file = getattr(row, field_name)
+    previous = getattr(row, thumbnails_field)
+    if not needs_thumbnails(field_file, previous):
+        return
+
+    result = {}
+    if field_file:
+        result['source'] = field_file.name
+        try:
+            result.update(make_thumbnails(field_file, sizes))
+        except Exception as exc:
+            # Unreadable or non-image uploads keep serving the original
+            logger.warning('Thumbnails failed for %s %s (%s): %s', model.__name__, pk, field_file.name, exc)
+            result['error'] = str(exc)[:200]
+    if previous.get('source') != result.get('source'):
+        delete_thumbnails(field_file.storage, previous)
+
+    # Only record them if the image didn't change again while we worked
+    if field_file:
+        current = Q(**{field_name: field_file.name})
+    else:
+        current = Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''})
+    if model.objects.filter(current, pk=pk).update(**{thumbnails_field: result}) and done:
+        done()
+
+
+def _process_in_worker(*args):
+    close_old_connections()
+    try:
+        process(*args)
+    except Exception:
+        logger.exception('Thumbnail job failed for %s %s', args[0].__name__, args[1])
+    finally:
+        close_old_connections()
+
+
+def schedule(model, pk, field_name, sizes, done=None):
+    """Process the row on the thumbnail pool once the current transaction commits"""
+    transaction.on_commit(lambda: _get_executor().submit(_process_in_worker, model, pk, field_name, sizes, done))
@@ -0,0 +1,161 @@
+"""
+Wallet ledger.
+
+Every balance change is an immutable ``WalletTransaction`` row plus a single
+in-database increment of ``CustomUser.account_balance``; balances are never
+read, modified and saved back, so concurrent credits to the same member
+cannot overwrite each other. ``WalletSnapshot`` rows checkpoint balances so
+history reads only sum ledger entries written after the latest snapshot.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import CustomUser, WalletSnapshot, WalletTransaction
+
+BATCH_SIZE = 5000
+
+
+class InsufficientBalance(Exception):
+    """Raised when a debit would take a member's balance below zero"""
+
+
+@transaction.atomic
+def post(user_id, amount, transaction_type, description='', **changes):
+    """Record one ledger entry and apply it to the member's balance.
+
+    ``amount`` is signed: positive credits, negative debits. Debits only
+    succeed if the balance covers them at the time of the update. Any
+    ``changes`` (e.g. counter increments) go into the same UPDATE.
+    """
+    members = CustomUser.objects.filter(pk=user_id)
+    if amount < 0:
+        members = members.filter(account_balance__gte=-amount)
+    if not members.update(account_balance=F('account_balance') + amount, **changes):
+        raise InsufficientBalance(f"Insufficient balance for a debit of ₹{-amount}")
+    return WalletTransaction.objects.create(
+        user_id=user_id,
+        amount=amount,
+        transaction_type=transaction_type,
+        description=description,
+    )
+
+
+def credit(user_id, amount, transaction_type, description='', **changes):
+    return post(user_id, amount, transaction_type, description, **changes)
+
+
+def debit(user_id, amount, transaction_type, description=''):
+    return post(user_id, -amount, transaction_type, description)
+
+
+def _lock_members(user_ids, batch_size):
+    """Lock members' rows ahead of a bulk insert of their entries (see take_snapshots)"""
+    if not connections[router.db_for_write(CustomUser)].features.has_select_for_update:
+        return  # SQLite: one writer at a time, so entries always commit in id order
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        list(
+            CustomUser.objects.select_for_update()
+            .filter(pk__in=user_ids[start:start + batch_size])
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+
+@transaction.atomic
+def post_many(entries, transaction_type, description='', batch_size=BATCH_SIZE):
+    """Credit many members at once: one bulk insert and one set-based UPDATE.
+
+    ``entries`` is an iterable of ``(user_id, amount)``; a member may appear
+    more than once. The members' rows are locked before their entries are
+    inserted. Returns the batch id stamped on the ledger rows.
+    """
+    batch = uuid.uuid4().hex
+    entries = list(entries)
+    _lock_members({user_id for user_id, _ in entries}, batch_size)
+    WalletTransaction.objects.bulk_create(
+        [
+            WalletTransaction(
+                user_id=user_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                batch=batch,
+                description=description,
+            )
+            for user_id, amount in entries
+        ],
+        batch_size=batch_size,
+    )
+    batch_entries = WalletTransaction.objects.filter(batch=batch)
+    total = (
+        batch_entries.filter(user=OuterRef('pk'))
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    CustomUser.objects.filter(pk__in=batch_entries.values('user_id')).update(
+        account_balance=F('account_balance') + Subquery(total)
+    )
+    return batch
+
+
+def balance_as_of(user, transaction_id=None):
+    """Member's balance including ledger entries up to ``transaction_id`` (default: all)"""
+    snapshots = WalletSnapshot.objects.filter(user=user)
+    entries = WalletTransaction.objects.filter(user=user)
+    if transaction_id is not None:
+        snapshots = snapshots.filter(last_transaction_id__lte=transaction_id)
+        entries = entries.filter(id__lte=transaction_id)
+    snapshot = snapshots.order_by('-last_transaction_id').first()
+    balance = Decimal('0.00')
+    if snapshot:
+        balance = snapshot.balance
+        entries = entries.filter(id__gt=snapshot.last_transaction_id)
+    return balance + (entries.aggregate(total=Sum('amount'))['total'] or 0)
+
+
+def take_snapshots(batch_size=BATCH_SIZE):
+    """Checkpoint the balance of every member with ledger entries after their latest snapshot.
+
+    Each batch of members is locked first. Ledger writers lock a member's row
+    before adding its entries (``post`` and ``post_many``), so under the lock
+    every entry of the member is committed and any later one gets a higher
+    id: the locked ``account_balance`` is exactly the sum of the entries up to
+    the member's highest id. Returns the number of snapshots written.
+    """
+    last_position = (
+        WalletSnapshot.objects.filter(user=OuterRef(OuterRef('pk')))
+        .order_by('-last_transaction_id')
+        .values('last_transaction_id')[:1]
+    )
+    pending = CustomUser.objects.filter(Exists(
+        WalletTransaction.objects.filter(user=OuterRef('pk'), id__gt=Coalesce(Subquery(last_position), 0))
+    ))
+    position = (
+        WalletTransaction.objects.filter(user=OuterRef('pk'))
+        .order_by('-id')
+        .values('id')[:1]
+    )
+    written = 0
+    last_pk = 0
+    while batch := list(pending.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]):
+        last_pk = batch[-1]
+        with transaction.atomic():
+            members = (
+                CustomUser.objects.select_for_update()
+                .filter(pk__in=batch)
+                .order_by('pk')
+                .annotate(position=Subquery(position))
+                .values_list('pk', 'account_balance', 'position')
+            )
+            snapshots = WalletSnapshot.objects.bulk_create([
+                WalletSnapshot(user_id=user_id, balance=balance, last_transaction_id=last_id)
+                for user_id, balance, last_id in members
+            ])
+        written += len(snapshots)
+    return written
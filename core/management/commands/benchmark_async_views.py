@@ -0,0 +1,155 @@
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from core import async_views, views
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync dashboard views (one request per thread, as under WSGI) with '
+        'their async versions (one event loop, as under ASGI) under concurrent load. '
+        'Runs on a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=2000, help='Members in the generated network')
+        parser.add_argument('--shape', default='skewed', choices=['binary', 'random', 'skewed'])
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and mode')
+        parser.add_argument('--db-latency', type=float, default=1.0,
+                            help='Simulated network round trip added to every query, in ms, as with '
+                                 'a database server (0 = raw SQLite, where there is nothing to overlap)')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        delay = options['db_latency'] / 1000
+
+        def add_latency(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(add_latency)
+
+        try:
+            call_command(
+                'generate_network', size=options['size'], shape=options['shape'],
+                seed=options['seed'], prefix='member', stdout=StringIO(),
+            )
+            member = CustomUser.objects.order_by('-referral_count', 'pk').first()
+            staff = CustomUser.objects.create_superuser(
+                username='bench-admin@example.com', email='bench-admin@example.com',
+                password='Bench@12345', first_name='Bench', last_name='Admin',
+            )
+            if delay:
+                connection_created.connect(install)
+                install(None, connection)
+            results = []
+            for name, user in (('dashboard', member), ('admin_dashboard', staff)):
+                path = reverse(name)
+                for mode, view in (('sync', getattr(views, name)), ('async', getattr(async_views, name))):
+                    results.append({'view': name, 'mode': mode, **self.run(view, path, user, mode, options)})
+        finally:
+            connection_created.disconnect(install)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'size': options['size'],
+            'concurrency': options['concurrency'],
+            'db_latency_ms': options['db_latency'],
+            'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write(
+                f"{options['size']} members, {options['concurrency']} concurrent requests, "
+                f"{options['db_latency']} ms per query"
+            )
+            self.print_table(results)
+
+    def make_request(self, path, user):
+        request = RequestFactory().get(path)
+        request.user = user
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        return request
+
+    def run(self, view, path, user, mode, options):
+        """Send ``--requests`` requests, ``--concurrency`` at a time"""
+        total, concurrency = options['requests'], options['concurrency']
+
+        def send_sync(_):
+            request = self.make_request(path, user)
+            started = time.perf_counter()
+            response = view(request)
+            return time.perf_counter() - started, response.status_code
+
+        async def send_async(limit):
+            # Like ASGIHandler: each request gets its own thread for sync code
+            async with limit, ThreadSensitiveContext():
+                request = self.make_request(path, user)
+                started = time.perf_counter()
+                response = await view(request)
+                return time.perf_counter() - started, response.status_code
+
+        async def run_async(count):
+            limit = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(send_async(limit) for _ in range(count)))
+
+        if mode == 'sync':
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(send_sync, range(concurrency)))  # warm up connections and caches
+                started = time.perf_counter()
+                samples = list(pool.map(send_sync, range(total)))
+        else:
+            asyncio.run(run_async(concurrency))
+            started = time.perf_counter()
+            samples = asyncio.run(run_async(total))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for latency, _ in samples)
+        return {
+            'errors': sum(1 for _, status in samples if status != 200),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+            'requests_per_second': round(total / elapsed, 1),
+        }
+
+    def print_table(self, results):
+        self.stdout.write(self.style.SUCCESS('=== Sync vs async views ==='))
+        self.stdout.write(f"{'view':<18} {'mode':<6} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>8} {'errors':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['view']:<18} {row['mode']:<6} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+                f"{row['requests_per_second']:>8} {row['errors']:>7}"
+            )
+        by_view = {}
+        for row in results:
+            by_view.setdefault(row['view'], {})[row['mode']] = row
+        for view, modes in by_view.items():
+            speedup = modes['sync']['p50_ms'] / modes['async']['p50_ms']
+            self.stdout.write(f"{view}: async median latency {speedup:.2f}x faster than sync")
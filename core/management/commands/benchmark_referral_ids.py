@@ -0,0 +1,117 @@
+import json
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from core.models import CustomUser, IdSequence
+from core.referral_ids import SEQUENCE_NAME, SPACE, create_with_referral_id, encode, reset_allocator
+
+class Command(BaseCommand):
+    help = (
+        'Compare per-signup cost of random+probe referral IDs with the sequence allocator as the '
+        'ID space fills up: real member inserts, timed and with their queries counted. The '
+        'allocator runs with its sequence at each fill level of the real space; random IDs are '
+        'probed against --members existing members drawn from a space scaled down to the same '
+        'fill, which gives the same odds per probe. Runs on a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=500, help='Signups measured per fill level and method')
+        parser.add_argument('--members', type=int, default=5000, help='Existing members for the random+probe side')
+        parser.add_argument('--fill', default='0,0.5,0.9,0.99', help='Comma-separated fractions of the ID space in use')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            rng = random.Random(options['seed'])
+            results = [
+                {
+                    'fill': fill,
+                    **self.measure('legacy', self.legacy_signups(fill, options['members'], options['samples'], rng)),
+                    **self.measure('allocator', self.allocator_signups(fill, options['samples'])),
+                }
+                for fill in (float(value) for value in options['fill'].split(','))
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"=== Referral ID cost per signup ({options['samples']} signups) ==="))
+        self.stdout.write(f"{'fill':>6} | {'random+probe queries (mean/p99)':>32} | {'ms':>6} | {'allocator queries (mean/max)':>29} | {'ms':>6}")
+        for row in results:
+            self.stdout.write(
+                f"{row['fill']:>6.0%} | "
+                f"{row['legacy_queries_mean']:>23} / {row['legacy_queries_p99']:<6} | {row['legacy_ms_mean']:>6} | "
+                f"{row['allocator_queries_mean']:>20} / {row['allocator_queries_max']:<6} | {row['allocator_ms_mean']:>6}"
+            )
+
+    def member(self, referral_id=None):
+        self.created = getattr(self, 'created', 0) + 1
+        name = f'bench-{self.created}'
+        return CustomUser(username=name, email=f'{name}@example.com', password='!', referral_id=referral_id)
+
+    def legacy_signups(self, fill, members, samples, rng):
+        """The pre-allocator signup: insert, draw random IDs until a probe finds one free, save again.
+
+        Each signup's ID is released again after it is measured, so the fill stays put.
+        """
+        CustomUser.objects.all().delete()
+        space = int(members / fill) if fill else SPACE
+        if fill:
+            CustomUser.objects.bulk_create(
+                [self.member(encode(number)) for number in rng.sample(range(space), members)], batch_size=1000,
+            )
+
+        def signup():
+            member = self.member()
+            member.save(force_insert=True)
+            while True:
+                referral_id = encode(rng.randrange(space))
+                if not CustomUser.objects.filter(referral_id=referral_id).exists():
+                    break
+            member.referral_id = referral_id
+            member.save(update_fields=['referral_id'])
+            return lambda: CustomUser.objects.filter(pk=member.pk).update(referral_id=None)
+
+        return (signup for _ in range(samples))
+
+    def allocator_signups(self, fill, samples):
+        """``create_with_referral_id`` with the sequence ``fill`` of the way through the space"""
+        CustomUser.objects.all().delete()
+        IdSequence.objects.update_or_create(name=SEQUENCE_NAME, defaults={'next_value': int(fill * (SPACE - samples))})
+        reset_allocator()
+
+        def create(referral_id):
+            self.member(referral_id).save(force_insert=True)
+
+        return (lambda: create_with_referral_id(create) for _ in range(samples))
+
+    def measure(self, name, signups):
+        """Time and count the queries of each signup; a signup may return a cleanup to run afterwards"""
+        queries, times = [], []
+        for signup in signups:
+            reset_queries()  # the query log is capped; keep each capture's indexes valid
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                release = signup()
+                times.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            if release:
+                release()
+        queries.sort()
+        return {
+            f'{name}_queries_mean': round(statistics.mean(queries), 3),
+            f'{name}_queries_p99': queries[max(int(len(queries) * 0.99) - 1, 0)],
+            f'{name}_queries_max': queries[-1],
+            f'{name}_ms_mean': round(statistics.mean(times), 3),
+        }
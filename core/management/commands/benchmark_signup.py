@@ -0,0 +1,130 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure signup throughput: concurrent POSTs to the join page with real password '
+        'hashing, reported as signups per second and per core, plus the queries one signup '
+        'costs. Runs on a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=500, help='Members in the generated network')
+        parser.add_argument('--shape', default='skewed', choices=['binary', 'random', 'skewed'])
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--signups', type=int, default=40)
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                            help='Signups in flight at once')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        # A file rather than shared-cache memory, so concurrent writers wait for the lock like in production
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.gettempdir(), 'benchmark_signup.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            call_command(
+                'generate_network', size=options['size'], shape=options['shape'],
+                seed=options['seed'], prefix='member', stdout=StringIO(),
+            )
+            sponsors = list(CustomUser.objects.values_list('referral_id', flat=True))
+            rng = random.Random(options['seed'])
+            forms = [self.form(number, rng.choice(sponsors)) for number in range(options['signups'] + 2)]
+
+            self.signup(forms.pop())  # warm up: reserves a block of referral IDs, fills caches
+            queries = self.count_queries(forms.pop())
+            result = self.run(forms, options['concurrency'])
+        finally:
+            close_old_connections()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        cores = os.cpu_count() or 1
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'size': options['size'],
+            'concurrency': options['concurrency'],
+            'hash_workers': settings.PASSWORD_HASH_WORKERS,
+            'cores': cores,
+            'queries_per_signup': queries,
+            **result,
+            'signups_per_second_per_core': round(result['signups_per_second'] / cores, 2),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+        if result['errors']:
+            raise CommandError(f"{result['errors']} signups failed")
+
+    def form(self, number, sponsor_id):
+        return {
+            'sponsor_id': sponsor_id, 'sponsor_name': 'Sponsor', 'full_name': f'Bench Signup {number}',
+            'mobile': f'7{number:09d}', 'email': f'bench-signup-{number}@example.com',
+            'password': 'Bench@12345', 'confirm_password': 'Bench@12345',
+        }
+
+    def signup(self, form):
+        """POST one signup; returns ``(seconds, ok)``"""
+        started = time.perf_counter()
+        response = Client(raise_request_exception=False).post(reverse('signup'), form)
+        return time.perf_counter() - started, response.status_code == 302
+
+    def count_queries(self, form):
+        with CaptureQueriesContext(connection) as queries:
+            _, ok = self.signup(form)
+        if not ok:
+            raise CommandError("Signup failed; check the join view")
+        return len(queries)
+
+    def run(self, forms, concurrency):
+        def send(form):
+            try:
+                return self.signup(form)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            started = time.perf_counter()
+            samples = list(pool.map(send, forms))
+            elapsed = time.perf_counter() - started
+
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        return {
+            'signups': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'p50_ms': round(statistics.median(latencies), 1),
+            'p95_ms': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 1),
+            'signups_per_second': round(len(samples) / elapsed, 2),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(self.style.SUCCESS('=== Signup throughput ==='))
+        self.stdout.write(
+            f"{report['signups']} signups, {report['concurrency']} concurrent, "
+            f"{report['hash_workers']} hash workers, {report['cores']} cores"
+        )
+        self.stdout.write(f"queries per signup:   {report['queries_per_signup']}")
+        self.stdout.write(f"latency p50 / p95:    {report['p50_ms']} / {report['p95_ms']} ms")
+        self.stdout.write(f"signups per second:   {report['signups_per_second']}")
+        self.stdout.write(f"  per core:           {report['signups_per_second_per_core']}")
+        self.stdout.write(f"errors:               {report['errors']}")
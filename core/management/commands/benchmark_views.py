@@ -0,0 +1,309 @@
+import json
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.utils import CursorDebugWrapper
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from core.models import CustomUser, Product, Withdrawal
+from core.referral_ids import reset_allocator
+from core.urls import urlpatterns
+
+
+class RowCountingCursor(CursorDebugWrapper):
+    """Debug cursor that also counts the rows fetched from the database"""
+    counter = None  # shared {'rows': n} dict, set per capture
+
+    def _count(self, rows):
+        self.counter['rows'] += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.counter['rows'] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        return self._count(self.cursor.fetchmany(size) if size else self.cursor.fetchmany())
+
+    def fetchall(self):
+        return self._count(self.cursor.fetchall())
+
+    def __iter__(self):
+        for row in self.cursor:
+            self.counter['rows'] += 1
+            yield row
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every URL in core/urls.py against generated networks of growing size: '
+        'SQL queries, rows fetched, wall time and peak memory. Fails when a view\'s query '
+        'count grows with the data or exceeds the baseline. Runs on a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='200,2000', help='Comma-separated network sizes')
+        parser.add_argument('--shape', default='skewed', choices=['binary', 'random', 'skewed'])
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per view (median is reported)')
+        parser.add_argument('--baseline', help='Fail on query counts above this earlier result file')
+        parser.add_argument('--time-tolerance', type=float, default=0.5,
+                            help='Warn when wall time exceeds the baseline by this fraction')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--save-baseline', help='Also write results to this file for later --baseline runs')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def cases(self, fixture):
+        """``(label, url, method, data, who)`` for every route; ``data`` may be a callable of the run number"""
+        member = fixture['member']
+        return [
+            ('home (anonymous)', reverse('home'), 'get', None, 'anonymous'),
+            ('home (member)', reverse('home'), 'get', None, 'member'),
+            ('products', reverse('products'), 'get', None, 'anonymous'),
+            ('plan', reverse('plan'), 'get', None, 'anonymous'),
+            ('contact', reverse('contact'), 'get', None, 'anonymous'),
+            ('signup', reverse('signup'), 'get', None, 'anonymous'),
+            ('join', reverse('join'), 'post', lambda run: {
+                'sponsor_id': member.referral_id,
+                'sponsor_name': member.get_full_name(),
+                'full_name': 'Bench Join',
+                'mobile': f'8{fixture["size"]:04d}{run:05d}',
+                'email': f'bench-join-{run}@example.com',
+                'password': 'Bench@12345',
+                'confirm_password': 'Bench@12345',
+            }, 'anonymous'),
+            ('login', reverse('login'), 'post', {'email': fixture['staff'].email, 'password': 'Bench@12345'}, 'anonymous'),
+            ('logout', reverse('logout'), 'post', None, 'member'),
+            ('dashboard', reverse('dashboard'), 'get', None, 'member'),
+            ('dashboard_section', reverse('dashboard_section', args=['referrals']), 'get', None, 'member'),
+            ('team', reverse('team'), 'get', None, 'member'),
+            ('team_tree', reverse('team_tree') + '?depth=2', 'get', None, 'member'),
+            ('wallet', reverse('wallet'), 'get', None, 'member'),
+            ('update_profile', reverse('update_profile'), 'post', {
+                'first_name': member.first_name, 'last_name': member.last_name,
+                'mobile': member.mobile or '', 'email': member.email,
+            }, 'member'),
+            ('request_withdrawal', reverse('request_withdrawal'), 'post', {'amount': '1'}, 'member'),
+            ('purchase_product', reverse('purchase_product'), 'post', {
+                'product_id': fixture['product_ids'][0], 'quantity': '1',
+            }, 'member'),
+            ('checkout', reverse('checkout'), 'json', {
+                'items': [{'product_id': product_id, 'quantity': 2} for product_id in fixture['product_ids']],
+            }, 'member'),
+            ('admin_login', reverse('admin_login'), 'get', None, 'anonymous'),
+            ('admin_dashboard', reverse('admin_dashboard'), 'get', None, 'staff'),
+            ('admin_users', reverse('admin_users'), 'get', None, 'staff'),
+            ('admin_users (search)', reverse('admin_users') + '?q=member1', 'get', None, 'staff'),
+            ('admin_withdrawal_action', reverse('admin_withdrawal_action', args=[fixture['withdrawal_id']]),
+             'post', {'action': 'approve'}, 'staff'),
+            ('admin_withdrawals', reverse('admin_withdrawals') + '?status=pending', 'get', None, 'staff'),
+            ('admin_withdrawals_bulk', reverse('admin_withdrawals_bulk'), 'post', {
+                'action': 'reject', 'scope': 'selected', 'ids': [fixture['withdrawal_id']],
+            }, 'staff'),
+            ('admin_withdrawals_export', reverse('admin_withdrawals_export'), 'get', None, 'staff'),
+            ('admin_export (withdrawals)', reverse('admin_export', args=['withdrawals']) + '?status=pending&format=jsonl',
+             'get', None, 'staff'),
+            ('metrics', reverse('metrics'), 'get', None, 'staff'),
+        ]
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        results = []
+        try:
+            for size in sizes:
+                results.extend(self.run_size(size, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures, warnings = self.find_regressions(results, options)
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'sizes': sizes,
+            'shape': options['shape'],
+            'results': results,
+            'failures': failures,
+            'warnings': warnings,
+        }
+        for path in filter(None, [options['output'], options['save_baseline']]):
+            with open(path, 'w') as handle:
+                json.dump(report, handle, indent=2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_table(results)
+            for warning in warnings:
+                self.stdout.write(self.style.WARNING(f'⚠️ {warning}'))
+        if failures:
+            for failure in failures:
+                self.stderr.write(f'❌ {failure}')
+            raise CommandError(f'{len(failures)} query regression(s)')
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS('✅ No query count regressions'))
+
+    def run_size(self, size, options):
+        call_command('flush', interactive=False, verbosity=0)
+        # The flush rewound the ID sequence under this process's cached block
+        reset_allocator()
+        call_command(
+            'generate_network', size=size, shape=options['shape'], seed=options['seed'],
+            prefix='member', stdout=StringIO(),
+        )
+        fixture = self.fixture(size)
+        self.check_coverage(fixture)
+        return [
+            {'view': label, 'size': size, **self.measure(url, method, data, who, fixture, options)}
+            for label, url, method, data, who in self.cases(fixture)
+        ]
+
+    def fixture(self, size):
+        # The busiest sponsor has the largest dashboard, team and history tables
+        member = CustomUser.objects.order_by('-referral_count', 'pk').first()
+        staff = CustomUser.objects.create_superuser(
+            username='bench-admin@example.com', email='bench-admin@example.com',
+            password='Bench@12345', first_name='Bench', last_name='Admin',
+        )
+        withdrawal = Withdrawal.objects.filter(status='pending').order_by('pk').first()
+        if withdrawal is None:
+            withdrawal = Withdrawal.objects.create(user=member, amount=1)
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        return {
+            'size': size, 'member': member, 'staff': staff, 'withdrawal_id': withdrawal.pk,
+            'product_ids': product_ids,
+        }
+
+    def check_coverage(self, fixture):
+        covered = {label.split(' ')[0] for label, *_ in self.cases(fixture)}
+        missing = [pattern.name for pattern in urlpatterns if pattern.name and pattern.name not in covered]
+        if missing:
+            raise CommandError(f"No benchmark case for: {', '.join(missing)}")
+
+    def prepare(self, url, method, data, who, fixture, run, clear_cache=True):
+        """Return a callable that sends the request from a fresh (logged in) client"""
+        if clear_cache:
+            cache.clear()
+        client = Client(raise_request_exception=False)
+        if who != 'anonymous':
+            client.force_login(fixture[who])
+        payload = data(run) if callable(data) else data
+
+        def send():
+            if method == 'json':
+                response = client.post(url, payload, content_type='application/json')
+            else:
+                response = getattr(client, method)(url, payload)
+            if response.streaming:
+                b''.join(response.streaming_content)  # streamed rows are only queried as they are read
+            return response
+
+        return send
+
+    def capture(self, send):
+        """Send once, returning ``(response, queries, rows fetched)``"""
+        counter = {'rows': 0}
+
+        def make_cursor(cursor):
+            wrapper = RowCountingCursor(cursor, connection)
+            wrapper.counter = counter
+            return wrapper
+
+        connection.make_debug_cursor = make_cursor
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = send()
+        finally:
+            del connection.make_debug_cursor
+        return response, len(queries), counter['rows']
+
+    def measure(self, url, method, data, who, fixture, options):
+        runs = iter(range(1_000_000))
+        request = lambda **kwargs: self.prepare(url, method, data, who, fixture, next(runs), **kwargs)
+
+        # Cold: empty cache. Warm: caches as the previous request left them.
+        response, queries, rows = self.capture(request())
+        _, warm_queries, _ = self.capture(request(clear_cache=False))
+        result = {'status': response.status_code, 'queries': queries, 'warm_queries': warm_queries, 'rows': rows}
+
+        timings = []
+        for _ in range(options['repeat']):
+            send = request()
+            started = time.perf_counter()
+            send()
+            timings.append((time.perf_counter() - started) * 1000)
+        result['wall_ms'] = round(statistics.median(timings), 2)
+
+        send = request()
+        tracemalloc.start()
+        try:
+            send()
+            result['peak_kib'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        return result
+
+    def find_regressions(self, results, options):
+        """Return ``(failures, warnings)``"""
+        failures = []
+        warnings = []
+        by_view = {}
+        for row in results:
+            by_view.setdefault(row['view'], []).append(row)
+        for view, rows in by_view.items():
+            smallest, largest = rows[0], rows[-1]
+            for key in ('queries', 'warm_queries'):
+                if largest[key] > smallest[key]:
+                    failures.append(
+                        f"{view}: {key} grows with data size "
+                        f"({smallest[key]} at {smallest['size']} -> {largest[key]} at {largest['size']})"
+                    )
+            if largest['rows'] > smallest['rows']:
+                warnings.append(
+                    f"{view}: rows fetched grow with data size "
+                    f"({smallest['rows']} at {smallest['size']} -> {largest['rows']} at {largest['size']})"
+                )
+            if largest['status'] >= 500:
+                warnings.append(f"{view}: HTTP {largest['status']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = {(row['view'], row['size']): row for row in json.load(handle)['results']}
+            for row in results:
+                previous = baseline.get((row['view'], row['size']))
+                if not previous:
+                    continue
+                for key in ('queries', 'warm_queries'):
+                    if row[key] > previous[key]:
+                        failures.append(
+                            f"{row['view']} at {row['size']}: {row[key]} {key}, baseline {previous[key]}"
+                        )
+                if row['wall_ms'] > previous['wall_ms'] * (1 + options['time_tolerance']):
+                    warnings.append(
+                        f"{row['view']} at {row['size']}: {row['wall_ms']} ms, baseline {previous['wall_ms']} ms"
+                    )
+        return failures, warnings
+
+    def print_table(self, results):
+        self.stdout.write(self.style.SUCCESS('=== View benchmark ==='))
+        self.stdout.write(
+            f"{'view':<26} {'size':>7} {'status':>6} {'queries':>8} {'warm':>5} "
+            f"{'rows':>6} {'wall ms':>9} {'peak KiB':>9}"
+        )
+        for row in sorted(results, key=lambda row: (row['view'], row['size'])):
+            self.stdout.write(
+                f"{row['view']:<26} {row['size']:>7} {row['status']:>6} {row['queries']:>8} "
+                f"{row['warm_queries']:>5} {row['rows']:>6} {row['wall_ms']:>9} {row['peak_kib']:>9}"
+            )
@@ -0,0 +1,241 @@
+import random
+import time
+from array import array
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from core import bulk, counters, ledger, search
+from core.catalog import bump_catalog_version
+from core.models import CustomUser, Product, Purchase, Withdrawal
+from core.rates import current_rates
+from core.referral_ids import referral_id_for, reserve_sequence
+
+DEFAULT_PRODUCTS = [
+    ('Starter Pack', Decimal('499.00')),
+    ('Wellness Kit', Decimal('1299.00')),
+    ('Premium Bundle', Decimal('2999.00')),
+    ('Home Care Set', Decimal('799.00')),
+    ('Business Kit', Decimal('4999.00')),
+]
+WITHDRAWAL_STATUSES = ['pending', 'approved', 'completed', 'rejected']
+WITHDRAWAL_WEIGHTS = [3, 2, 4, 1]
+
+
+def build_tree(size, shape, rng, roots=1, max_depth=0):
+    """Return ``(parent, depth)`` arrays for a ``size``-member forest.
+
+    Members are numbered so sponsors always come before their referrals.
+    ``binary`` fills a balanced binary tree level by level, ``random``
+    attaches each member under a uniformly chosen earlier member, and
+    ``skewed`` uses preferential attachment: members who already recruited
+    a lot are more likely to recruit the next one, giving a few
+    super-sponsors with huge first levels.
+    """
+    parent = array('q', [-1]) * size
+    depth = array('l', [0]) * size
+    targets = array('q', range(min(roots, size)))
+    for i in range(roots, size):
+        if shape == 'binary':
+            p = (i - roots) // 2
+        elif shape == 'skewed':
+            p = targets[rng.randrange(len(targets))]
+        else:
+            p = rng.randrange(i)
+        while max_depth and depth[p] >= max_depth:
+            p = parent[p]
+        parent[i] = p
+        depth[i] = depth[p] + 1
+        if shape == 'skewed':
+            targets.append(p)
+            targets.append(i)
+    return parent, depth
+
+
+def geometric(rng, mean):
+    """Random count with the given mean (0 is the most common value)"""
+    count = 0
+    stop = mean / (mean + 1)
+    while rng.random() < stop:
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a seeded synthetic referral network with purchase and withdrawal '
+        'history, for load and scale testing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=1000, help='Members to create (up to 10M)')
+        parser.add_argument('--shape', choices=['binary', 'random', 'skewed'], default='random',
+                            help='Branching: balanced binary, uniform random or skewed super-sponsor tree')
+        parser.add_argument('--max-depth', type=int, default=0, help='Deepest level below a root (0 = unlimited)')
+        parser.add_argument('--roots', type=int, default=1, help='Members without a sponsor')
+        parser.add_argument('--purchases', type=float, default=1.0, help='Mean purchases per member')
+        parser.add_argument('--withdrawals', type=float, default=0.1,
+                            help='Share of earning members with a withdrawal request')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='member', help='Username prefix, <prefix><n>@example.com')
+        parser.add_argument('--password', default='Member@123', help='Password shared by all generated members')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Members per transaction')
+
+    def handle(self, *args, **options):
+        size = options['size']
+        if not 0 < size <= 10_000_000:
+            raise CommandError('--size must be between 1 and 10,000,000')
+        prefix = options['prefix']
+        if CustomUser.objects.filter(username=f'{prefix}0@example.com').exists():
+            raise CommandError(f'Members with prefix "{prefix}" already exist, pick another --prefix')
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        parent, depth = build_tree(size, options['shape'], rng, options['roots'], options['max_depth'])
+        self.stdout.write(
+            f"Tree: {size} members, depth {max(depth)} ({time.perf_counter() - started:.1f}s)"
+        )
+
+        commission = current_rates().direct_referral_amount
+        products = list(Product.objects.values_list('pk', 'price'))
+        if not products:
+            Product.objects.bulk_create([Product(name=name, price=price) for name, price in DEFAULT_PRODUCTS])
+            bump_catalog_version()
+            products = list(Product.objects.values_list('pk', 'price'))
+        # One hash for everyone: hashing millions of passwords would dominate the run
+        password = make_password(options['password'])
+
+        pks = array('q', [0]) * size
+        sequence = array('q', [0]) * size
+        recruits = array('l', [0]) * size
+        chunk_size = options['chunk_size']
+        purchases_written = 0
+        # Keeping the member search index in sync row by row costs more than rebuilding it once
+        connection = connections[router.db_for_write(CustomUser)]
+        search.drop_fts_index(connection)
+        try:
+            for start in range(0, size, chunk_size):
+                end = min(start + chunk_size, size)
+                with transaction.atomic():
+                    purchases_written += self.write_members(
+                        start, end, parent, pks, sequence, recruits, prefix, password,
+                        commission, products, options['purchases'], rng, chunk_size,
+                    )
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {end} members ({end / elapsed:.0f}/s)")
+        finally:
+            search.install_fts_index(connection)
+        # Same for team counters: one rebuild instead of an upline update per batch
+        counters.rebuild_team_counters()
+
+        withdrawals = self.write_withdrawals(pks, recruits, commission, options['withdrawals'], rng, chunk_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {size} members, {purchases_written} purchases and {withdrawals} withdrawals "
+            f"in {elapsed:.1f}s ({size / elapsed:.0f} members/s)"
+        ))
+
+    def write_members(self, start, end, parent, pks, sequence, recruits, prefix, password,
+                      commission, products, mean_purchases, rng, batch_size):
+        numbers = list(reserve_sequence(end - start))
+        referral_ids = [referral_id_for(number) for number in numbers]
+        taken = set(CustomUser.objects.filter(referral_id__in=referral_ids).values_list('referral_id', flat=True))
+        for k, referral_id in enumerate(referral_ids):
+            # Skip IDs already issued at random before the sequence allocator existed
+            while referral_id in taken:
+                numbers[k] = reserve_sequence(1)[0]
+                referral_id = referral_ids[k] = referral_id_for(numbers[k])
+
+        members = []
+        sponsors = []
+        for i, number, referral_id in zip(range(start, end), numbers, referral_ids):
+            sequence[i] = number
+            p = parent[i]
+            if p < 0:
+                sponsor_ref = None
+            else:
+                sponsor_ref = referral_ids[p - start] if p >= start else referral_id_for(sequence[p])
+            members.append(CustomUser(
+                username=f'{prefix}{i}@example.com',
+                email=f'{prefix}{i}@example.com',
+                password=password,
+                first_name='Member',
+                last_name=str(i),
+                referral_id=referral_id,
+                sponsor_id=sponsor_ref,
+                sponsor_name=f'Member {p}' if p >= 0 else None,
+                is_active_member=True,
+            ))
+            if p < 0:
+                sponsors.append(None)
+            else:
+                sponsors.append(members[p - start] if p >= start else pks[p])
+                recruits[p] += 1
+        bulk.insert_members(members, sponsors, [commission] * len(members), batch_size=batch_size)
+        for i, member in zip(range(start, end), members):
+            pks[i] = member.pk
+
+        credits = [
+            (sponsor if isinstance(sponsor, int) else sponsor.pk, commission)
+            for sponsor in sponsors
+            if sponsor is not None
+        ]
+        if credits:
+            ledger.post_many(credits, 'referral_commission', 'Direct referral', batch_size=batch_size)
+
+        purchases = []
+        for member in members:
+            for _ in range(geometric(rng, mean_purchases)):
+                product_id, price = products[rng.randrange(len(products))]
+                quantity = rng.randint(1, 3)
+                purchases.append(Purchase(
+                    user_id=member.pk, product_id=product_id, quantity=quantity, total_amount=price * quantity,
+                ))
+        return bulk.add_purchases(purchases, batch_size=batch_size)
+
+    def write_withdrawals(self, pks, recruits, commission, share, rng, batch_size):
+        """Withdrawal requests against the commissions each member has earned"""
+        if not share:
+            return 0
+        now = timezone.now()
+        written = 0
+        batch = []
+        for i, pk in enumerate(pks):
+            if not recruits[i] or rng.random() >= share:
+                continue
+            earned = commission * recruits[i]
+            amount = (earned * Decimal(rng.randint(10, 90)) / 100).quantize(Decimal('1'))
+            status = rng.choices(WITHDRAWAL_STATUSES, WITHDRAWAL_WEIGHTS)[0]
+            admin_charge = amount * Decimal('0.10')
+            batch.append(Withdrawal(
+                user_id=pk,
+                amount=amount,
+                admin_charge=admin_charge,
+                net_amount=amount - admin_charge,
+                status=status,
+                processed_date=None if status == 'pending' else now,
+            ))
+            if len(batch) >= batch_size:
+                written += self.save_withdrawals(batch, batch_size)
+                batch = []
+        if batch:
+            written += self.save_withdrawals(batch, batch_size)
+        return written
+
+    @transaction.atomic
+    def save_withdrawals(self, withdrawals, batch_size):
+        Withdrawal.objects.bulk_create(withdrawals, batch_size=batch_size)
+        ledger.post_many(
+            ((withdrawal.user_id, -withdrawal.amount) for withdrawal in withdrawals),
+            'withdrawal', 'Withdrawal', batch_size=batch_size,
+        )
+        refunds = [
+            (withdrawal.user_id, withdrawal.amount)
+            for withdrawal in withdrawals
+            if withdrawal.status == 'rejected'
+        ]
+        if refunds:
+            ledger.post_many(refunds, 'withdrawal_refund', 'Withdrawal rejected', batch_size=batch_size)
+        return len(withdrawals)
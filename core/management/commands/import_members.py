@@ -0,0 +1,342 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from core import bulk, counters, genealogy, ledger
+from core.models import CustomUser, Referral
+from core.referral_ids import reserve_referral_ids
+
+FIELDS = (
+    'email, full_name (or first_name/last_name), mobile, password or password_hash, '
+    'referral_id, sponsor_id (sponsor\'s referral ID), sponsor_name, commission, account_balance'
+)
+
+
+def read_rows(path, input_format):
+    """Yield input rows as dicts, streaming the file"""
+    handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+    with handle:
+        if input_format == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for number, line in enumerate(handle, start=1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        raise CommandError(f"Line {number}: {exc}")
+
+
+def text(row, key):
+    value = row.get(key)
+    return str(value).strip() if value not in (None, '') else ''
+
+
+def amount(row, key):
+    try:
+        return Decimal(text(row, key) or '0')
+    except InvalidOperation:
+        raise ValueError(f"invalid {key}")
+
+
+class Command(BaseCommand):
+    help = (
+        'Import members from a CSV or JSONL file, linking each to its sponsor. '
+        f'Columns: {FIELDS}. Resumable: re-run with the same file to continue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file ("-" for stdin, not resumable)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=bulk.BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Password hashing processes (0 hashes in this process)')
+        parser.add_argument('--checkpoint', help='Progress file, defaults to <path>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        self.checkpoint = None if path == '-' else options['checkpoint'] or f'{path}.checkpoint'
+        self.chunk_size = options['chunk_size']
+
+        # The checkpoint holds only the last row written; members still waiting
+        # for a sponsor are appended to a side file as each chunk commits
+        self.pending_file = self.checkpoint and f'{self.checkpoint}.pending'
+        state = {'rows': 0}
+        self.pending = []
+        if self.checkpoint and os.path.exists(self.checkpoint) and not options['restart']:
+            with open(self.checkpoint) as handle:
+                state = json.load(handle)
+            self.pending = self.load_pending()
+            self.stdout.write(f"Resuming after row {state['rows']}")
+        elif self.pending_file and os.path.exists(self.pending_file):
+            os.remove(self.pending_file)
+        self.state = state
+        self.totals = {'created': 0, 'skipped': 0, 'rejected': 0, 'referrals': 0}
+
+        self.workers = options['workers']
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+        self.started = time.perf_counter()
+        self.processed = 0
+        try:
+            chunk = []
+            previous = None
+            for number, row in enumerate(read_rows(path, input_format), start=1):
+                if number <= state['rows']:
+                    continue
+                chunk.append((number, row))
+                if len(chunk) >= self.chunk_size:
+                    # Hash this chunk's passwords in the pool while the previous one is written
+                    job = self.prepare(chunk, pool)
+                    if previous:
+                        self.write(previous)
+                    previous, chunk = job, []
+            if chunk:
+                job = self.prepare(chunk, pool)
+                if previous:
+                    self.write(previous)
+                previous = job
+            if previous:
+                self.write(previous)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        linked = self.link_pending()
+        counters.rebuild_team_counters()
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {self.totals['created']} members ({self.totals['referrals'] + linked} referrals), "
+            f"skipped {self.totals['skipped']} existing, rejected {self.totals['rejected']} "
+            f"in {elapsed:.1f}s ({self.processed / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+        if self.pending:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {len(self.pending)} sponsors not found, members left without a sponsor"
+            ))
+        for leftover in (self.checkpoint, self.pending_file):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+
+    def reject(self, number, reason):
+        self.totals['rejected'] += 1
+        self.stderr.write(f"Row {number}: {reason}")
+
+    def prepare(self, chunk, pool):
+        """Parse a chunk and start hashing its plaintext passwords"""
+        parsed = []
+        for number, row in chunk:
+            try:
+                email = CustomUser.objects.normalize_email(text(row, 'email'))
+                if not email:
+                    raise ValueError('email is required')
+                first_name = text(row, 'first_name') or text(row, 'full_name')
+                parsed.append({
+                    'number': number,
+                    'email': email,
+                    # Emails are unique regardless of case (see core.backends)
+                    'email_key': email.lower(),
+                    'first_name': first_name,
+                    'last_name': text(row, 'last_name'),
+                    'mobile': text(row, 'mobile') or None,
+                    'password': text(row, 'password'),
+                    'password_hash': text(row, 'password_hash'),
+                    'referral_id': text(row, 'referral_id'),
+                    'sponsor_id': text(row, 'sponsor_id'),
+                    'sponsor_name': text(row, 'sponsor_name'),
+                    'commission': amount(row, 'commission'),
+                    'account_balance': amount(row, 'account_balance'),
+                })
+            except (ValueError, AttributeError) as exc:
+                self.reject(number, exc)
+
+        passwords = [row['password'] for row in parsed if row['password'] and not row['password_hash']]
+        if pool and passwords:
+            chunksize = max(1, len(passwords) // (self.workers * 4))
+            hashes = pool.map(make_password, passwords, chunksize=chunksize)
+        else:
+            hashes = map(make_password, passwords)
+        return {'size': len(chunk), 'last': chunk[-1][0], 'rows': parsed, 'hashes': hashes}
+
+    def write(self, job):
+        rows = job['rows']
+        hashes = iter(job['hashes'])
+        for row in rows:
+            if row['password'] and not row['password_hash']:
+                row['password_hash'] = next(hashes)
+
+        # Rows already in the database were imported by an earlier (interrupted) run
+        # or registered with the same email in another case
+        existing = {}
+        for username, email_key, pk, linked in CustomUser.objects.filter(
+            Q(username__in=[row['email'] for row in rows]) | Q(email_normalized__in=[row['email_key'] for row in rows])
+        ).values_list('username', 'email_normalized', 'pk', 'referred_by'):
+            existing[username.lower()] = existing[email_key] = (pk, linked)
+        mobiles = set(CustomUser.objects.filter(
+            mobile__in=[row['mobile'] for row in rows if row['mobile']]
+        ).values_list('mobile', flat=True))
+
+        missing_ids = sum(1 for row in rows if not row['referral_id'])
+        allocated = iter(reserve_referral_ids(missing_ids)) if missing_ids else iter(())
+        for row in rows:
+            if not row['referral_id']:
+                row['referral_id'] = next(allocated)
+                row['allocated'] = True
+        taken = set(CustomUser.objects.filter(
+            referral_id__in=[row['referral_id'] for row in rows]
+        ).values_list('referral_id', flat=True))
+
+        members, sponsors, commissions, balances = [], [], [], []
+        by_referral_id = {}
+        seen_emails, seen_mobiles = set(), set()
+        resume_pending = []
+        for row in rows:
+            if row['email_key'] in existing:
+                pk, linked = existing[row['email_key']]
+                if row['sponsor_id'] and not linked:
+                    resume_pending.append([pk, row['sponsor_id'], str(row['commission'])])
+                self.totals['skipped'] += 1
+                continue
+            if row['email_key'] in seen_emails:
+                self.reject(row['number'], f"duplicate email {row['email']}")
+                continue
+            if row['mobile'] and (row['mobile'] in mobiles or row['mobile'] in seen_mobiles):
+                self.reject(row['number'], f"mobile {row['mobile']} already registered")
+                continue
+            while row.get('allocated') and (row['referral_id'] in taken or row['referral_id'] in by_referral_id):
+                # Allocated ID collides with a legacy random one
+                row['referral_id'] = reserve_referral_ids(1)[0]
+            if row['referral_id'] in taken or row['referral_id'] in by_referral_id:
+                self.reject(row['number'], f"referral ID {row['referral_id']} already in use")
+                continue
+            seen_emails.add(row['email_key'])
+            if row['mobile']:
+                seen_mobiles.add(row['mobile'])
+
+            member = CustomUser(
+                username=row['email'],
+                email=row['email'],
+                password=row['password_hash'] or make_password(None),
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                mobile=row['mobile'],
+                referral_id=row['referral_id'],
+                sponsor_id=row['sponsor_id'] or None,
+                sponsor_name=row['sponsor_name'] or None,
+                is_active_member=True,
+            )
+            by_referral_id[row['referral_id']] = member
+            members.append((member, row))
+
+        # Sponsors are earlier members of this chunk or found with one IN query
+        sponsor_refs = {row['sponsor_id'] for _, row in members if row['sponsor_id']}
+        sponsor_pks = dict(CustomUser.objects.filter(
+            referral_id__in=sponsor_refs - by_referral_id.keys()
+        ).values_list('referral_id', 'pk'))
+        pending = []
+        for member, row in members:
+            sponsor = by_referral_id.get(row['sponsor_id']) or sponsor_pks.get(row['sponsor_id'])
+            if row['sponsor_id'] and sponsor is None:
+                # Sponsor may appear later in the file
+                pending.append((member, row))
+            sponsors.append(sponsor)
+            commissions.append(row['commission'])
+            if row['account_balance']:
+                balances.append((member, row['account_balance']))
+
+        with transaction.atomic():
+            self.totals['referrals'] += bulk.insert_members(
+                [member for member, _ in members], sponsors, commissions, batch_size=self.chunk_size
+            )
+            if balances:
+                ledger.post_many(
+                    ((member.pk, balance) for member, balance in balances),
+                    'opening_balance', 'Imported balance', batch_size=self.chunk_size,
+                )
+        self.totals['created'] += len(members)
+
+        pending = resume_pending + [
+            [member.pk, row['sponsor_id'], str(row['commission'])] for member, row in pending
+        ]
+        self.pending += pending
+        self.save_pending(pending)
+        self.state['rows'] = job['last']
+        self.save_checkpoint()
+
+        self.processed += job['size']
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f"  row {job['last']}: {self.totals['created']} created, {self.totals['skipped']} skipped, "
+            f"{self.totals['rejected']} rejected ({self.processed / elapsed:.0f} rows/s)"
+        )
+
+    def save_checkpoint(self):
+        if not self.checkpoint:
+            return
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(self.state, handle)
+        os.replace(temporary, self.checkpoint)
+
+    def save_pending(self, pending):
+        """Append one chunk's unlinked members to the pending file (before its checkpoint)"""
+        if not self.pending_file or not pending:
+            return
+        with open(self.pending_file, 'a') as handle:
+            handle.writelines(json.dumps(entry) + '\n' for entry in pending)
+
+    def load_pending(self):
+        """Unlinked members from earlier runs; a chunk re-read after a crash may repeat some"""
+        if not os.path.exists(self.pending_file):
+            return []
+        with open(self.pending_file) as handle:
+            entries = [json.loads(line) for line in handle if line.strip()]
+        return list({member_pk: [member_pk, sponsor_ref, commission]
+                     for member_pk, sponsor_ref, commission in entries}.values())
+
+    def link_pending(self):
+        """Attach members whose sponsor appeared later in the file. Returns referrals written."""
+        pending = self.pending
+        if not pending:
+            return 0
+        linked = 0
+        unresolved = []
+        for start in range(0, len(pending), self.chunk_size):
+            batch = pending[start:start + self.chunk_size]
+            sponsor_pks = dict(CustomUser.objects.filter(
+                referral_id__in={sponsor_ref for _, sponsor_ref, _ in batch}
+            ).values_list('referral_id', 'pk'))
+            already_linked = set(Referral.objects.filter(
+                referred_user_id__in=[member_pk for member_pk, _, _ in batch]
+            ).values_list('referred_user_id', flat=True))
+            referrals = []
+            for member_pk, sponsor_ref, commission in batch:
+                if member_pk in already_linked:
+                    continue
+                if sponsor_ref not in sponsor_pks:
+                    unresolved.append([member_pk, sponsor_ref, commission])
+                    continue
+                referrals.append(Referral(
+                    sponsor_id=sponsor_pks[sponsor_ref],
+                    referred_user_id=member_pk,
+                    commission_earned=Decimal(commission),
+                ))
+            with transaction.atomic():
+                # These members may already have a downline of their own
+                bulk.add_referrals(referrals, batch_size=self.chunk_size, link=False)
+                for referral in referrals:
+                    genealogy.graft_subtree(referral.sponsor_id, referral.referred_user_id)
+            linked += len(referrals)
+        self.pending = unresolved
+        return linked
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.counters import rebuild_team_counters
+from core.genealogy import BATCH_SIZE, rebuild_closure
+
+class Command(BaseCommand):
+    help = 'Rebuild the referral genealogy (closure) index from Referral records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_closure(batch_size=options['batch_size'])
+        rebuild_team_counters()
+        self.stdout.write(self.style.SUCCESS(f'✅ Genealogy index rebuilt: {written} rows'))
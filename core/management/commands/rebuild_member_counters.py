@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.counters import rebuild_counters
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized member counters (referrals, purchases, earnings, downline size and volume)'
+
+    def handle(self, *args, **options):
+        updated = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'✅ Counters rebuilt for {updated} members'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core import images
+from core.models import CustomUser, ProductItem
+
+TARGETS = {
+    'profiles': (CustomUser, 'profile_photo', images.PROFILE_SIZES),
+    'products': (ProductItem, 'image', images.PRODUCT_SIZES),
+}
+
+
+class Command(BaseCommand):
+    help = 'Create missing thumbnails for profile photos and product images (see core.images)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=sorted(TARGETS), help='Limit to profile photos or product images')
+        parser.add_argument('--force', action='store_true', help='Re-render thumbnails that are already up to date')
+
+    def handle(self, *args, **options):
+        for name, (model, field_name, sizes) in TARGETS.items():
+            if options['only'] and options['only'] != name:
+                continue
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            if options['force']:
+                rows.update(**{f'{field_name}_thumbnails': {}})
+            processed = 0
+            for pk in rows.values_list('pk', flat=True).iterator():
+                images.process(model, pk, field_name, sizes)
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(f'✅ {name}: checked {processed} images'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.counters import ROLL_UP_BATCH_SIZE, roll_up_team_changes
+
+class Command(BaseCommand):
+    help = 'Add queued signups and purchases to their upline\'s downline size and team volume (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ROLL_UP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        applied = roll_up_team_changes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {applied} team changes rolled up'))
@@ -0,0 +1,28 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from core.settlement import BATCH_SIZE, run_settlement
+
+class Command(BaseCommand):
+    help = 'Compute and credit matching income for all members'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Settlement date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--dry-run', action='store_true', help='Compute payouts without writing them')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        summary = run_settlement(
+            settlement_date=options['date'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+        
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {prefix}{summary['credited']} of {summary['members']} members credited "
+            f"₹{summary['amount']} in {elapsed:.1f}s (batch {summary['batch']})"
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.ledger import BATCH_SIZE, take_snapshots
+
+class Command(BaseCommand):
+    help = 'Checkpoint wallet balances for members with new ledger entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = take_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {written} wallet snapshots written'))
@@ -0,0 +1,232 @@
+"""
+Per-request performance metrics.
+
+``PerformanceMiddleware`` times every request and files the latency, number
+of SQL queries, time spent in the database and time spent rendering templates
+under the request's URL name. Values go into fixed-bucket histograms held in
+process memory (one lock-protected increment per observation), and the
+``metrics`` view exposes them in the Prometheus text format. Each worker
+process keeps its own histograms; Prometheus sums them across scrape targets.
+
+Queries are timed by an execute wrapper installed on every database
+connection as it opens, and templates by the ``InstrumentedTemplates``
+backend. Both add to the current request's ``RequestStats`` through a context
+variable, so they cost a single lookup when no request is being measured. The
+context is copied into the worker threads of async views, so queries they fan
+out are counted against the request too.
+
+Requests slower than ``SLOW_REQUEST_THRESHOLD`` are logged to the
+``core.performance`` logger with their slowest SQL statements, for a
+``SLOW_REQUEST_SAMPLE_RATE`` share of them.
+"""
+import bisect
+import contextvars
+import heapq
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger('core.performance')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+MAX_RECORDED_QUERIES = 500  # per request, for the slow-request log
+SLOW_LOG_STATEMENTS = 5
+
+_current = contextvars.ContextVar('core_request_stats', default=None)
+
+
+class RequestStats:
+    """Counters for one request, filled in by the query timer and template backend"""
+    __slots__ = ('queries', 'db_time', 'template_time', 'statements', '_lock')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = []
+        # Async views run a request's queries on several threads at once
+        self._lock = threading.Lock()
+
+    def add_query(self, elapsed, sql):
+        with self._lock:
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.statements) < MAX_RECORDED_QUERIES:
+                self.statements.append((elapsed, sql))
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_stats():
+    return _current.get()
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed upper bounds"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Registry:
+    """Histograms per (metric, view) and request counters per (view, status class)"""
+
+    METRICS = {
+        'mlm_request_duration_seconds': ('Request latency by URL name', LATENCY_BUCKETS),
+        'mlm_request_db_queries': ('SQL queries per request by URL name', QUERY_BUCKETS),
+        'mlm_request_db_duration_seconds': ('Time spent in SQL per request by URL name', LATENCY_BUCKETS),
+        'mlm_request_template_duration_seconds': ('Template render time per request by URL name', LATENCY_BUCKETS),
+    }
+
+    def __init__(self):
+        self.histograms = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, metric, view):
+        key = (metric, view)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram(self.METRICS[metric][1]))
+        return histogram
+
+    def observe_request(self, view, status, latency, stats):
+        self.histogram('mlm_request_duration_seconds', view).observe(latency)
+        self.histogram('mlm_request_db_queries', view).observe(stats.queries)
+        self.histogram('mlm_request_db_duration_seconds', view).observe(stats.db_time)
+        self.histogram('mlm_request_template_duration_seconds', view).observe(stats.template_time)
+        key = (view, f'{status // 100}xx')
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.requests = {}
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        histograms = sorted(self.histograms.items())
+        for metric, (description, buckets) in self.METRICS.items():
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (name, view), histogram in histograms:
+                if name != metric:
+                    continue
+                counts, total, count = histogram.snapshot()
+                label = f'view="{_escape(view)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f'{metric}_sum{{{label}}} {total}')
+                lines.append(f'{metric}_count{{{label}}} {count}')
+        lines.append('# HELP mlm_requests_total Requests by URL name and status class')
+        lines.append('# TYPE mlm_requests_total counter')
+        with self._lock:
+            requests = sorted(self.requests.items())
+        for (view, status), count in requests:
+            lines.append(f'mlm_requests_total{{view="{_escape(view)}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+# ---- Database ----
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper: adds the query to the current request's stats"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(time.perf_counter() - started, sql)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """``connection_created`` receiver: time every query run on this connection"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+# ---- Templates ----
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates backend that adds render time to the current request's stats"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+# ---- Slow requests ----
+
+def log_if_slow(request, view, status, latency, stats):
+    threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD', 1.0)
+    if latency < threshold or random.random() >= getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE', 1.0):
+        return
+    slowest = heapq.nlargest(SLOW_LOG_STATEMENTS, stats.statements, key=lambda statement: statement[0])
+    logger.warning(
+        'Slow request %s %s (%s) -> %s in %.0f ms: %d queries, %.0f ms SQL, %.0f ms templates%s',
+        request.method, request.path, view, status, latency * 1000,
+        stats.queries, stats.db_time * 1000, stats.template_time * 1000,
+        ''.join(f'\n  {elapsed * 1000:.1f} ms  {sql}' for elapsed, sql in slowest),
+    )
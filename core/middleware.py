@@ -0,0 +1,107 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics
+from .routers import set_replica_reads
+
+
+class PerformanceMiddleware:
+    """Record latency, SQL and template time per URL name (see core.metrics)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Under ASGI, stay async so async views aren't pushed onto a thread
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, latency, stats):
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        metrics.registry.observe_request(view, response.status_code, latency, stats)
+        metrics.log_if_slow(request, view, response.status_code, latency, stats)
+
+
+class SessionRefreshMiddleware(MiddlewareMixin):
+    """Extend a session's expiry only when it is close to running out.
+
+    Replaces SESSION_SAVE_EVERY_REQUEST: a session is saved (and its cookie
+    and server-side expiry reset) when it was changed, or when less than
+    SESSION_REFRESH_WINDOW of its lifetime is left, so browsing writes to the
+    session store about once per lifetime instead of on every request.
+    Must come after SessionMiddleware.
+    """
+    REFRESHED_KEY = '_session_refreshed'
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        # Don't load sessions the view never looked at, or create empty ones
+        if session is None or not session.accessed or session.is_empty():
+            return response
+        if isinstance(session.get('_session_expiry'), str):
+            return response  # expires at a fixed time (set_expiry(datetime)); saving won't move it
+        now = int(time.time())
+        refreshed = session.get(self.REFRESHED_KEY, 0)
+        lifetime = session.get_expiry_age()
+        if session.modified or now - refreshed > lifetime - settings.SESSION_REFRESH_WINDOW:
+            session[self.REFRESHED_KEY] = now
+        return response
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Serve the read-only pages in REPLICA_VIEWS from the read replicas.
+
+    A member's own POST pins their reads to the primary for
+    REPLICA_PIN_SECONDS (via a cookie), so the page they are redirected to
+    shows what they just changed.
+    """
+    PIN_COOKIE = 'read_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_replica_reads(
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.url_name in settings.REPLICA_VIEWS
+            and self.PIN_COOKIE not in request.COOKIES
+        )
+
+    def process_response(self, request, response):
+        set_replica_reads(False)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                self.PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:39
+
+from collections import defaultdict
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def iter_closure_rows(edges):
+    """Frozen copy of ``core.genealogy.iter_closure_rows`` as of this migration"""
+    children = defaultdict(list)
+    has_sponsor = set()
+    for sponsor_id, member_id in edges:
+        children[sponsor_id].append(member_id)
+        has_sponsor.add(member_id)
+
+    roots = [node for node in children if node not in has_sponsor]
+    stack = [(root, ()) for root in roots]
+    while stack:
+        node, upline = stack.pop()
+        child_upline = (node,) + upline
+        for child in children.get(node, ()):
+            for depth, ancestor_id in enumerate(child_upline, start=1):
+                yield ancestor_id, child, depth
+            stack.append((child, child_upline))
+
+
+def backfill_closure(apps, schema_editor):
+    Referral = apps.get_model('core', 'Referral')
+    ReferralClosure = apps.get_model('core', 'ReferralClosure')
+    edges = Referral.objects.values_list('sponsor_id', 'referred_user_id').iterator(chunk_size=BATCH_SIZE)
+    rows = iter_closure_rows(edges)
+    # One batch of instances at a time: the full closure can be far larger than the tree
+    while batch := [
+        ReferralClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+        for ancestor_id, descendant_id, depth in islice(rows, BATCH_SIZE)
+    ]:
+        ReferralClosure.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_productitem_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(verbose_name='Level')),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Referral Closure',
+                'verbose_name_plural': 'Referral Closure',
+                'indexes': [models.Index(fields=['ancestor', 'depth', 'descendant'], name='core_closure_downline_idx')],
+                'unique_together': {('descendant', 'depth')},
+            },
+        ),
+        migrations.RunPython(backfill_closure, migrations.RunPython.noop),
+    ]
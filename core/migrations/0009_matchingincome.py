@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_referralclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchingIncome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(db_index=True, max_length=32)),
+                ('settlement_date', models.DateField()),
+                ('left_volume', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('right_volume', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('matched_volume', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matching_incomes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Matching Income',
+                'verbose_name_plural': 'Matching Incomes',
+                'ordering': ['-settlement_date'],
+                'indexes': [models.Index(fields=['user', 'settlement_date'], name='core_matching_user_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:41
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Purchase = apps.get_model('core', 'Purchase')
+    Referral = apps.get_model('core', 'Referral')
+
+    def aggregate(model, field, expression):
+        return Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(value=expression)
+            .values('value')
+        )
+
+    zero = Value(Decimal('0.00'))
+    CustomUser.objects.update(
+        referral_count=Coalesce(aggregate(Referral, 'sponsor', Count('pk')), 0),
+        total_referral_earnings=Coalesce(aggregate(Referral, 'sponsor', Sum('commission_earned')), zero),
+        purchase_count=Coalesce(aggregate(Purchase, 'user', Count('pk')), 0),
+        total_spent=Coalesce(aggregate(Purchase, 'user', Sum('total_amount')), zero),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_matchingincome'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='purchase_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Purchase Count'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='referral_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Referral Count'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='total_referral_earnings',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Total Referral Earnings'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Total Spent'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
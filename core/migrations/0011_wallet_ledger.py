@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Record each member's existing balance as the ledger's first entry"""
+    CustomUser = apps.get_model('core', 'CustomUser')
+    WalletTransaction = apps.get_model('core', 'WalletTransaction')
+    balances = CustomUser.objects.exclude(account_balance=0).values_list('pk', 'account_balance')
+    WalletTransaction.objects.bulk_create(
+        [
+            WalletTransaction(user_id=pk, amount=balance, transaction_type='opening_balance')
+            for pk, balance in balances.iterator()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('last_transaction_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Wallet Snapshot',
+                'verbose_name_plural': 'Wallet Snapshots',
+                'indexes': [models.Index(fields=['user', 'last_transaction_id'], name='core_walletsnap_user_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('transaction_type', models.CharField(choices=[('opening_balance', 'Opening Balance'), ('referral_commission', 'Referral Commission'), ('matching_income', 'Matching Income'), ('withdrawal', 'Withdrawal'), ('withdrawal_refund', 'Withdrawal Refund'), ('adjustment', 'Adjustment')], max_length=30)),
+                ('batch', models.CharField(blank=True, db_index=True, default='', max_length=32)),
+                ('description', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Wallet Transaction',
+                'verbose_name_plural': 'Wallet Transactions',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='core_wallettx_user_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+def link_product_items(apps, schema_editor):
+    """Point home page cards without a catalog product at one (matched by name, else new)"""
+    Product = apps.get_model('core', 'Product')
+    ProductItem = apps.get_model('core', 'ProductItem')
+    for item in ProductItem.objects.filter(product__isnull=True):
+        product = Product.objects.filter(name=item.name).order_by('pk').first()
+        if product is None:
+            product = Product.objects.create(name=item.name, price=item.price, description=item.description)
+        ProductItem.objects.filter(pk=item.pk).update(product=product)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='core_product_name_idx'),
+        ),
+        migrations.RunPython(link_product_items, migrations.RunPython.noop),
+    ]
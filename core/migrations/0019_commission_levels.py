@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:32
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_customuser_email_normalized'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallettransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('opening_balance', 'Opening Balance'), ('referral_commission', 'Referral Commission'), ('upline_commission', 'Upline Commission'), ('matching_income', 'Matching Income'), ('withdrawal', 'Withdrawal'), ('withdrawal_refund', 'Withdrawal Refund'), ('adjustment', 'Adjustment')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='CommissionLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('signup', 'Signup'), ('purchase', 'Purchase')], max_length=10)),
+                ('level', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Amount (₹)')),
+                ('percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='Percentage (%)')),
+                ('settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='levels', to='core.referralsettings')),
+            ],
+            options={
+                'verbose_name': 'Commission Level',
+                'verbose_name_plural': 'Commission Levels',
+                'ordering': ['event', 'level'],
+                'constraints': [models.UniqueConstraint(fields=('settings', 'event', 'level'), name='core_commission_level_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:35
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_team_counters(apps, schema_editor):
+    """Downline size and purchase volume of every existing member, from the genealogy closure"""
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Purchase = apps.get_model('core', 'Purchase')
+    ReferralClosure = apps.get_model('core', 'ReferralClosure')
+    downline = ReferralClosure.objects.filter(ancestor_id=OuterRef('pk')).order_by().values('ancestor_id')
+    purchases = Purchase.objects.filter(
+        user_id__in=ReferralClosure.objects.filter(ancestor_id=OuterRef(OuterRef('pk'))).values('descendant_id')
+    )
+    CustomUser.objects.update(
+        downline_count=Coalesce(Subquery(downline.annotate(value=Count('pk')).values('value')), 0),
+        team_volume=Coalesce(
+            Subquery(purchases.order_by().values(value=Func('total_amount', function='SUM'))[:1]),
+            Value(Decimal('0.00')),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_commission_levels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='downline_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Downline Size'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='team_volume',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=15, verbose_name='Team Volume'),
+        ),
+        migrations.RunPython(fill_team_counters, migrations.RunPython.noop),
+    ]
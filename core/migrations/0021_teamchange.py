@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_customuser_team_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('members', models.PositiveSmallIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Team Change',
+                'verbose_name_plural': 'Team Changes',
+            },
+        ),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
-from django.core.validators import RegexValidator
+from django.core.validators import MinValueValidator, RegexValidator
+from django.db.models.functions import Lower
 from decimal import Decimal
 
+from .images import PRODUCT_SIZES, PROFILE_SIZES, thumbnail_urls
+
 class CustomUser(AbstractUser):
     """Custom User Model for MLM System"""
     
@@ -26,6 +29,7 @@ class CustomUser(AbstractUser):
         max_length=50,
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="Sponsor ID"
     )
     
@@ -53,12 +57,43 @@ class CustomUser(AbstractUser):
         verbose_name="Account Balance"
     )
     
+    # Denormalized stats, kept current by core.counters
+    referral_count = models.PositiveIntegerField(default=0, verbose_name="Referral Count")
+    purchase_count = models.PositiveIntegerField(default=0, verbose_name="Purchase Count")
+    total_spent = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0.00,
+        verbose_name="Total Spent"
+    )
+    total_referral_earnings = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0.00,
+        verbose_name="Total Referral Earnings"
+    )
+    # Whole downline (every level) and its purchases, excluding the member's own
+    downline_count = models.PositiveIntegerField(default=0, verbose_name="Downline Size")
+    team_volume = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0.00,
+        verbose_name="Team Volume"
+    )
+
     # Account Status
     is_active_member = models.BooleanField(
         default=False,
         verbose_name="Is Active Member"
     )
     
+    # Lower-cased email, computed by the database, for case-insensitive logins (core.backends)
+    email_normalized = models.GeneratedField(
+        expression=Lower('email'),
+        output_field=models.CharField(max_length=254),
+        db_persist=True,
+    )
+    
     # Profile Photo
     profile_photo = models.ImageField(
         upload_to='profile_photos/',
@@ -66,6 +101,8 @@ class CustomUser(AbstractUser):
         null=True,
         verbose_name="Profile Photo"
     )
+    # Resized copies written by core.images
+    profile_photo_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -90,6 +127,13 @@ class CustomUser(AbstractUser):
         verbose_name = "User"
         verbose_name_plural = "Users"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='core_user_created_idx'),
+            models.Index(fields=['email'], name='core_user_email_idx'),
+            models.Index(fields=['email_normalized'], name='core_user_email_norm_idx'),
+            models.Index(fields=['first_name'], name='core_user_first_name_idx'),
+            models.Index(fields=['last_name'], name='core_user_last_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
@@ -97,36 +141,46 @@ class CustomUser(AbstractUser):
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
     
+    def get_session_auth_hash(self):
+        # Session users from the core.backends cache carry the hash but not the password
+        if 'password' not in self.__dict__ and getattr(self, 'cached_session_auth_hash', None):
+            return self.cached_session_auth_hash
+        return super().get_session_auth_hash()
+    
+    @property
+    def photo_urls(self):
+        """Profile photo thumbnail URLs by size (see core.images.PROFILE_SIZES)"""
+        return thumbnail_urls(self.profile_photo, self.profile_photo_thumbnails, PROFILE_SIZES)
+
     def get_referral_count(self):
         """Get total referrals/downline count"""
-        return Referral.objects.filter(sponsor=self).count()
+        return self.referral_count
     
     def get_purchase_count(self):
         """Get total product purchases"""
-        return Purchase.objects.filter(user=self).count()
+        return self.purchase_count
     
     def get_total_purchase_amount(self):
         """Get total amount spent on products"""
-        purchases = Purchase.objects.filter(user=self)
-        total = sum(p.total_amount for p in purchases)
-        return Decimal(str(total))
+        return Decimal(str(self.total_spent))
     
     def generate_referral_id(self):
-        """Generate a unique referral ID in format: MLM + 6 random alphanumeric"""
-        import random
-        import string
-        
-        # Generate 6 random characters and numbers
-        characters = string.ascii_uppercase + string.digits
-        random_part = ''.join(random.choices(characters, k=6))
-        referral_id = f"MLM{random_part}"
-        
-        # Ensure it's unique
-        while CustomUser.objects.filter(referral_id=referral_id).exists():
-            random_part = ''.join(random.choices(characters, k=6))
-            referral_id = f"MLM{random_part}"
-        
-        return referral_id
+        """Allocate a unique referral ID in format: MLM + 6 alphanumeric (see core.referral_ids)"""
+        from .referral_ids import next_referral_id
+        return next_referral_id()
+
+
+class IdSequence(models.Model):
+    """Named counters for block-allocated identifiers"""
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "ID Sequence"
+        verbose_name_plural = "ID Sequences"
+    
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
 
 
 class Product(models.Model):
@@ -139,6 +193,9 @@ class Product(models.Model):
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            models.Index(fields=['name'], name='core_product_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -156,6 +213,17 @@ class Purchase(models.Model):
         verbose_name = "Purchase"
         verbose_name_plural = "Purchases"
         ordering = ['-purchase_date']
+        indexes = [
+            models.Index(fields=['user', '-purchase_date', '-id'], name='core_purchase_user_date_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        """Keep the buyer's purchase counters in step with new purchases"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .counters import record_purchases
+            record_purchases(self.user_id, 1, self.total_amount)
     
     def __str__(self):
         return f"{self.user.email} - {self.product.name}"
@@ -172,11 +240,79 @@ class Referral(models.Model):
         verbose_name = "Referral"
         verbose_name_plural = "Referrals"
         unique_together = ['sponsor', 'referred_user']
+        indexes = [
+            models.Index(fields=['sponsor', '-referral_date', '-id'], name='core_referral_sponsor_date_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        """Keep the sponsor's referral counters in step with new referrals"""
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .counters import record_referrals
+            record_referrals(self.sponsor_id, 1, self.commission_earned)
     
     def __str__(self):
         return f"{self.sponsor.email} referred {self.referred_user.email}"
 
 
+class ReferralClosure(models.Model):
+    """Genealogy index - one row per (ancestor, descendant) pair in the referral tree"""
+    ancestor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='descendant_links', db_index=False)
+    descendant = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ancestor_links', db_index=False)
+    depth = models.PositiveIntegerField(verbose_name="Level")  # 1 = direct referral
+    
+    class Meta:
+        verbose_name = "Referral Closure"
+        verbose_name_plural = "Referral Closure"
+        # A member has exactly one ancestor per level, so this also serves upline reads
+        unique_together = ['descendant', 'depth']
+        indexes = [
+            models.Index(fields=['ancestor', 'depth', 'descendant'], name='core_closure_downline_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} (level {self.depth})"
+
+
+class TeamChange(models.Model):
+    """A signup or purchase not yet rolled up into the upline's team counters (see core.counters)"""
+    member = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='team_changes')
+    members = models.PositiveSmallIntegerField(default=0)  # 1 when the member just joined
+    volume = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    
+    class Meta:
+        verbose_name = "Team Change"
+        verbose_name_plural = "Team Changes"
+    
+    def __str__(self):
+        return f"{self.member_id}: +{self.members} members, +Rs. {self.volume}"
+
+
+class MatchingIncome(models.Model):
+    """Matching income credited by a settlement run"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='matching_incomes')
+    batch = models.CharField(max_length=32, db_index=True)  # settlement run identifier
+    settlement_date = models.DateField()
+    # Left = member's strongest leg, right = all other legs combined
+    left_volume = models.DecimalField(max_digits=15, decimal_places=2)
+    right_volume = models.DecimalField(max_digits=15, decimal_places=2)
+    matched_volume = models.DecimalField(max_digits=15, decimal_places=2)  # newly matched in this run
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Matching Income"
+        verbose_name_plural = "Matching Incomes"
+        ordering = ['-settlement_date']
+        indexes = [
+            models.Index(fields=['user', 'settlement_date'], name='core_matching_user_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - Rs. {self.amount} ({self.settlement_date})"
+
+
 class Withdrawal(models.Model):
     """Withdrawal Request Model"""
     STATUS_CHOICES = [
@@ -199,6 +335,10 @@ class Withdrawal(models.Model):
         verbose_name = "Withdrawal"
         verbose_name_plural = "Withdrawals"
         ordering = ['-requested_date']
+        indexes = [
+            models.Index(fields=['user', '-requested_date', '-id'], name='core_withdrawal_user_date_idx'),
+            models.Index(fields=['status', '-requested_date', '-id'], name='core_withdrawal_status_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         """Calculate 10% admin charge and net amount"""
@@ -211,6 +351,63 @@ class Withdrawal(models.Model):
         return f"{self.user.email} - Rs. {self.amount} ({self.status})"
 
 
+class WalletTransaction(models.Model):
+    """Immutable wallet ledger entry - credits are positive, debits negative"""
+    TYPE_CHOICES = [
+        ('opening_balance', 'Opening Balance'),
+        ('referral_commission', 'Referral Commission'),
+        ('upline_commission', 'Upline Commission'),
+        ('matching_income', 'Matching Income'),
+        ('withdrawal', 'Withdrawal'),
+        ('withdrawal_refund', 'Withdrawal Refund'),
+        ('adjustment', 'Adjustment'),
+    ]
+    
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='wallet_transactions')
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    transaction_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    batch = models.CharField(max_length=32, blank=True, default='', db_index=True)  # set for bulk postings
+    description = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Wallet Transaction"
+        verbose_name_plural = "Wallet Transactions"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='core_wallettx_user_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Wallet transactions are immutable")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Wallet transactions are immutable")
+    
+    def __str__(self):
+        return f"{self.user_id} {self.get_transaction_type_display()}: Rs. {self.amount}"
+
+
+class WalletSnapshot(models.Model):
+    """Member balance as of a ledger position, so history reads skip older entries"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='wallet_snapshots')
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    last_transaction_id = models.BigIntegerField()  # ledger position the balance includes
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Wallet Snapshot"
+        verbose_name_plural = "Wallet Snapshots"
+        indexes = [
+            models.Index(fields=['user', 'last_transaction_id'], name='core_walletsnap_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - Rs. {self.balance} @ {self.last_transaction_id}"
+
+
 class ReferralSettings(models.Model):
     """Settings for Referral Commissions"""
     direct_referral_amount = models.DecimalField(
@@ -232,16 +429,48 @@ class ReferralSettings(models.Model):
         verbose_name = "Referral Settings"
         verbose_name_plural = "Referral Settings"
     
+    @transaction.atomic
     def save(self, *args, **kwargs):
-        # Ensure only one active settings instance
+        # Ensure only one active settings instance (core.rates caches it)
         if self.is_active:
-            ReferralSettings.objects.filter(is_active=True).update(is_active=False)
+            ReferralSettings.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Direct: ₹{self.direct_referral_amount}, Matching: {self.matching_income_percentage}%"
 
 
+class CommissionLevel(models.Model):
+    """Commission paid to the upline member ``level`` steps above a signup or purchase.
+
+    Each level earns ``amount`` plus ``percentage`` of the event's value: the
+    order total for purchases, the direct referral amount for signups. With no
+    signup levels configured, the direct sponsor (level 1) earns the direct
+    referral amount.
+    """
+    EVENT_CHOICES = [
+        ('signup', 'Signup'),
+        ('purchase', 'Purchase'),
+    ]
+    
+    settings = models.ForeignKey(ReferralSettings, on_delete=models.CASCADE, related_name='levels')
+    event = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    level = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="Amount (₹)")
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="Percentage (%)")
+    
+    class Meta:
+        verbose_name = "Commission Level"
+        verbose_name_plural = "Commission Levels"
+        ordering = ['event', 'level']
+        constraints = [
+            models.UniqueConstraint(fields=['settings', 'event', 'level'], name='core_commission_level_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_event_display()} level {self.level}: ₹{self.amount} + {self.percentage}%"
+
+
 class HomePageSection(models.Model):
     """Dynamic Home Page Sections"""
     SECTION_TYPES = [
@@ -295,6 +524,8 @@ class ProductItem(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    image = models.ImageField(upload_to='product_images/', blank=True, null=True)
+    image_thumbnails = models.JSONField(default=dict, blank=True, editable=False)  # see core.images
     image_url = models.URLField(blank=True, null=True)
     display_order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -307,3 +538,20 @@ class ProductItem(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Link the card to a catalog product, so it can be bought by id.
+
+        The home page shows the product's price, the one an order is charged,
+        rather than the card's own ``price``.
+        """
+        if self.product_id is None:
+            self.product = Product.objects.filter(name=self.name).order_by('pk').first() or Product.objects.create(
+                name=self.name, price=self.price, description=self.description,
+            )
+        super().save(*args, **kwargs)
+
+    @property
+    def image_urls(self):
+        """Image thumbnail URLs by size (see core.images.PRODUCT_SIZES)"""
+        return thumbnail_urls(self.image, self.image_thumbnails, PRODUCT_SIZES)
+
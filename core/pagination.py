@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of the last row already shown instead of
+an OFFSET, so fetching page N costs the same index range scan as page 1 and
+no ``COUNT(*)`` is needed. Cursors are opaque URL-safe strings.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were tampered with or don't match the ordering"""
+
+
+def encode_cursor(values):
+    raw = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def page_size(value, default=PAGE_SIZE):
+    """Parse a client-supplied page size, clamped to ``MAX_PAGE_SIZE``"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def _after(model, ordering, values):
+    """Q for rows strictly after ``values`` in ``ordering`` (a tuple of '-field'/'field')"""
+    condition = Q()
+    equal = Q()
+    for name, raw in zip(ordering, values):
+        field_name = name.lstrip('-')
+        field = model._meta.get_field('id' if field_name == 'pk' else field_name)
+        try:
+            value = field.to_python(raw)
+        except Exception as exc:
+            raise InvalidCursor(raw) from exc
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field_name}__{lookup}': value})
+        equal &= Q(**{field_name: value})
+    return condition
+
+
+def keyset_page(queryset, ordering=('-pk',), cursor=None, limit=PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for the page after ``cursor``.
+
+    ``ordering`` must end with a unique field (normally ``pk``) so the key is
+    total. ``next_cursor`` is ``None`` on the last page.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor(cursor)
+        queryset = queryset.filter(_after(queryset.model, ordering, values))
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, name.lstrip('-')) for name in ordering]
+        )
+    return rows, next_cursor
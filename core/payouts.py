@@ -0,0 +1,140 @@
+"""
+Withdrawal review queue and payout files.
+
+Finance works through withdrawals as filtered sets rather than one request at
+a time. The queue pages through a filter with keyset pagination, a bulk action
+changes a whole selection (ticked rows or everything matching the filter) with
+one UPDATE, and the members of rejected withdrawals are refunded with one
+ledger batch. The payout file for the approved set is streamed in chunks.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import ledger
+from .exports import day_start, iter_keyset
+from .models import CustomUser, Withdrawal
+from .search import search_members
+from .stats import invalidate_admin_stats
+
+# action: (statuses it applies to, new status)
+TRANSITIONS = {
+    'approve': (('pending',), 'approved'),
+    'reject': (('pending', 'approved'), 'rejected'),
+    'complete': (('approved',), 'completed'),  # paid out from the approved set
+}
+
+PAYOUT_HEADER = [
+    'Reference', 'Beneficiary Name', 'Email', 'Mobile', 'Member ID',
+    'Requested Amount', 'Admin Charge', 'Net Amount', 'Currency', 'Requested Date',
+]
+
+
+class SelectionChanged(Exception):
+    """Raised when withdrawals in a bulk selection change status while it is being processed"""
+
+
+def _amount(raw):
+    value = Decimal(raw)
+    if not value.is_finite():
+        raise ValueError(raw)
+    return value
+
+
+FILTERS = [
+    # (parameter, lookup, parser)
+    ('date_from', 'requested_date__gte', day_start),
+    ('date_to', 'requested_date__lt', lambda raw: day_start(raw) + timedelta(days=1)),
+    ('min_amount', 'amount__gte', _amount),
+    ('max_amount', 'amount__lte', _amount),
+    ('max_id', 'pk__lte', int),
+]
+
+
+def filter_withdrawals(params):
+    """Withdrawals matching the queue filters in ``params`` (a QueryDict or dict).
+
+    Returns ``(queryset, filters)``, where ``filters`` holds only the values
+    that were valid and applied, for building links back to the same set.
+    """
+    queryset = Withdrawal.objects.all()
+    filters = {}
+    status = params.get('status', '')
+    if status in dict(Withdrawal.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+        filters['status'] = status
+    q = params.get('q', '').strip()
+    if q:
+        queryset = queryset.filter(user__in=search_members(CustomUser.objects.all(), q))
+        filters['q'] = q
+    for name, lookup, parse in FILTERS:
+        raw = params.get(name, '').strip()
+        if not raw:
+            continue
+        try:
+            value = parse(raw)
+        except (ValueError, InvalidOperation, OverflowError):
+            continue
+        queryset = queryset.filter(**{lookup: value})
+        filters[name] = raw
+    return queryset, filters
+
+
+@transaction.atomic
+def process(queryset, action, notes=''):
+    """Apply ``action`` to every withdrawal in ``queryset`` it is valid for.
+
+    The status change is one UPDATE for the whole set and rejections are
+    refunded in one ledger batch. Returns the number of withdrawals changed.
+    """
+    sources, status = TRANSITIONS[action]
+    targets = queryset.filter(status__in=sources)
+    refunds = []
+    if status == 'rejected':
+        refunds = list(targets.select_for_update().values_list('user_id', 'amount'))
+
+    changes = {'status': status, 'processed_date': timezone.now()}
+    if notes:
+        changes['notes'] = notes
+    updated = targets.update(**changes)
+    if refunds:
+        if updated != len(refunds):
+            raise SelectionChanged(f"{len(refunds)} withdrawals selected but {updated} rejected")
+        ledger.post_many(refunds, 'withdrawal_refund', 'Withdrawal rejected')
+    transaction.on_commit(invalidate_admin_stats)
+    return updated
+
+
+def payout_file(queryset):
+    """``(filename, rows)`` for the approved withdrawals in ``queryset``, oldest first.
+
+    The set is cut off at the newest approved withdrawal when the file is
+    started; the filename carries that id so the same set can be marked
+    completed afterwards (filter ``max_id``).
+    """
+    approved = queryset.filter(status='approved')
+    last_id = approved.aggregate(last=Max('pk'))['last'] or 0
+    approved = approved.filter(pk__lte=last_id).select_related('user').only(
+        'amount', 'admin_charge', 'net_amount', 'requested_date',
+        'user__first_name', 'user__last_name', 'user__email', 'user__mobile', 'user__referral_id',
+    )
+    rows = (
+        [
+            f'WD{withdrawal.pk}',
+            withdrawal.user.get_full_name(),
+            withdrawal.user.email,
+            withdrawal.user.mobile or '',
+            withdrawal.user.referral_id or '',
+            withdrawal.amount,
+            withdrawal.admin_charge,
+            withdrawal.net_amount,
+            'INR',
+            timezone.localtime(withdrawal.requested_date).strftime('%Y-%m-%d'),
+        ]
+        for withdrawal in iter_keyset(approved, ('requested_date', 'id'))
+    )
+    filename = f"payouts-{timezone.localdate():%Y%m%d}-upto-{last_id}.csv"
+    return filename, rows
@@ -0,0 +1,90 @@
+"""
+Active commission rates.
+
+Each process holds the active ``ReferralSettings`` and its commission levels
+as one ``Rates`` snapshot stamped with a version number kept in the shared cache. Saving or deleting
+settings bumps that version once the change commits (see ``core.signals``);
+the next read in every worker sees the new number and reloads. Until then
+reads cost no queries.
+
+A snapshot is never changed in place, so code that takes ``current_rates()``
+once and uses it throughout (e.g. a signup) never mixes old and new rates.
+With the per-process LocMemCache other workers can't see the version, so
+snapshots are also reloaded after MAX_AGE seconds.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .models import ReferralSettings
+
+VERSION_KEY = 'core:rates:version'
+MAX_AGE = 60  # seconds
+DEFAULT_DIRECT_REFERRAL_AMOUNT = Decimal('200.00')
+DEFAULT_MATCHING_PERCENTAGE = Decimal('6.00')
+
+
+class Rates:
+    """The commission settings in force, as loaded at one point in time"""
+
+    __slots__ = (
+        'version', 'loaded_at', 'direct_referral_amount', 'matching_income_percentage',
+        'signup_levels', 'purchase_levels',
+    )
+
+    def __init__(self, version, settings=None):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # {level: (amount, percentage)} per event (see CommissionLevel)
+        levels = {'signup': {}, 'purchase': {}}
+        if settings is None:
+            self.direct_referral_amount = DEFAULT_DIRECT_REFERRAL_AMOUNT
+            self.matching_income_percentage = DEFAULT_MATCHING_PERCENTAGE
+        else:
+            self.direct_referral_amount = settings.direct_referral_amount
+            self.matching_income_percentage = settings.matching_income_percentage
+            for level in settings.levels.all():
+                levels[level.event][level.level] = (level.amount, level.percentage)
+        # Without signup levels the direct sponsor earns the direct referral amount
+        self.signup_levels = levels['signup'] or {1: (Decimal('0'), Decimal('100'))}
+        self.purchase_levels = levels['purchase']
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _is_current(snapshot, version):
+    return snapshot is not None and snapshot.version == version and time.monotonic() - snapshot.loaded_at < MAX_AGE
+
+
+def current_rates():
+    """The active rates; two queries when they changed (or aged out), none otherwise"""
+    global _snapshot
+    version = get_version()
+    if _is_current(_snapshot, version):
+        return _snapshot
+    with _lock:
+        if not _is_current(_snapshot, version):  # unless another thread just reloaded
+            # The version is read before the row, so a change committed in between
+            # leaves a stale version on the snapshot and is reloaded next time
+            active = ReferralSettings.objects.filter(is_active=True).order_by('-pk').prefetch_related('levels')
+            _snapshot = Rates(version, active.first())
+        return _snapshot
@@ -0,0 +1,159 @@
+"""
+Referral ID allocation.
+
+IDs keep the ``MLM`` + 6 character format, but instead of drawing random
+characters and probing the table until one is free, each ID is a sequence
+number pushed through a fixed permutation of the 36**6 code space and
+encoded in base 36. Distinct sequence numbers always give distinct IDs, and
+the permutation keeps consecutive signups from getting guessable,
+consecutive codes.
+
+Sequence numbers are handed out from blocks reserved with one atomic UPDATE
+of ``IdSequence`` (hi/lo allocation), so the ID is set on the member before
+the INSERT and a signup costs one write plus 1/``BLOCK_SIZE`` of a
+reservation.
+"""
+import string
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import IdSequence
+
+PREFIX = 'MLM'
+ALPHABET = string.ascii_uppercase + string.digits
+LENGTH = 6
+SPACE = len(ALPHABET) ** LENGTH
+SEQUENCE_NAME = 'referral_id'
+BLOCK_SIZE = 100
+
+# Round keys of the permutation. Changing them would re-map the sequence onto
+# IDs that are already issued - never edit once IDs exist.
+_ROUND_KEYS = (0x5A3C, 0x9E37, 0x2F1B, 0xC6A5)
+
+
+class ReferralIdsExhausted(Exception):
+    """Raised when every ID in the code space has been issued"""
+
+
+def _round(half, key):
+    half = (half * 0x9E3B + key) & 0xFFFF
+    return (half ^ (half >> 7) ^ (half << 3)) & 0xFFFF
+
+
+def _feistel(value, keys):
+    left, right = value >> 16, value & 0xFFFF
+    for key in keys:
+        left, right = right, left ^ _round(right, key)
+    return (left << 16) | right
+
+
+def _feistel_inverse(value, keys):
+    left, right = value >> 16, value & 0xFFFF
+    for key in reversed(keys):
+        left, right = right ^ _round(left, key), left
+    return (left << 16) | right
+
+
+def permute(number, space=SPACE):
+    """Bijection on ``range(space)`` (space <= 2**32), by cycle-walking a 32-bit Feistel network"""
+    value = _feistel(number, _ROUND_KEYS)
+    while value >= space:
+        value = _feistel(value, _ROUND_KEYS)
+    return value
+
+
+def unpermute(value, space=SPACE):
+    number = _feistel_inverse(value, _ROUND_KEYS)
+    while number >= space:
+        number = _feistel_inverse(number, _ROUND_KEYS)
+    return number
+
+
+def encode(number, length=LENGTH):
+    chars = []
+    for _ in range(length):
+        number, digit = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return PREFIX + ''.join(reversed(chars))
+
+
+def referral_id_for(sequence_number):
+    if sequence_number >= SPACE:
+        raise ReferralIdsExhausted(f"All {SPACE} referral IDs are in use")
+    return encode(permute(sequence_number))
+
+
+def reserve_sequence(count, name=SEQUENCE_NAME):
+    """Atomically reserve ``count`` sequence numbers; returns ``range`` of them"""
+    with transaction.atomic():
+        sequences = IdSequence.objects.filter(name=name)
+        if not sequences.update(next_value=F('next_value') + count):
+            IdSequence.objects.get_or_create(name=name, defaults={'next_value': 0})
+            sequences.update(next_value=F('next_value') + count)
+        end = sequences.values_list('next_value', flat=True).get()
+    return range(end - count, end)
+
+
+class BlockAllocator:
+    """Process-local allocator that reserves sequence numbers ``block_size`` at a time.
+
+    A block is only cached when it was reserved in autocommit mode. Inside a
+    transaction the reservation could still be rolled back and handed out
+    again, so a single number is reserved instead and rolls back together
+    with the row that used it.
+    """
+
+    def __init__(self, name=SEQUENCE_NAME, block_size=BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._block = iter(())
+
+    def next_number(self):
+        with self._lock:
+            number = next(self._block, None)
+            if number is not None:
+                return number
+            if connection.in_atomic_block:
+                return reserve_sequence(1, self.name)[0]
+            self._block = iter(reserve_sequence(self.block_size, self.name))
+            return next(self._block)
+
+    def reset(self):
+        """Drop the cached block (e.g. after the sequence table was flushed)"""
+        with self._lock:
+            self._block = iter(())
+
+
+_allocator = BlockAllocator()
+
+
+def reset_allocator():
+    _allocator.reset()
+
+
+def next_referral_id():
+    return referral_id_for(_allocator.next_number())
+
+
+def reserve_referral_ids(count):
+    """IDs for bulk inserts, reserved with a single sequence update"""
+    return [referral_id_for(number) for number in reserve_sequence(count)]
+
+
+def create_with_referral_id(create, attempts=3, **fields):
+    """Call ``create(referral_id=..., **fields)`` with a freshly allocated ID.
+
+    Allocated IDs never collide with each other, but random IDs issued before
+    the allocator existed can; such an insert is retried with the next ID.
+    """
+    for attempt in range(attempts):
+        referral_id = next_referral_id()
+        try:
+            with transaction.atomic():
+                return create(referral_id=referral_id, **fields)
+        except IntegrityError as exc:
+            if 'referral_id' not in str(exc) or attempt == attempts - 1:
+                raise
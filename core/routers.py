@@ -0,0 +1,46 @@
+"""
+Read replica routing.
+
+Writes, and reads by default, go to the primary (``default``). Code that can
+tolerate replication lag turns on ``set_replica_reads(True)``, after which its
+reads are spread over ``settings.DATABASE_REPLICAS``; ReplicaMiddleware does
+this for the read-only pages in ``settings.REPLICA_VIEWS``. The flag is a
+context variable, so it follows the request into the threads that
+``core.async_views`` fans queries out to, and nowhere else.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# Always read from the primary: a session or login read from a lagging
+# replica could log a member out right after they signed in
+PRIMARY_ONLY_APPS = {'sessions'}
+
+
+def set_replica_reads(enabled):
+    """Send the current context's reads to the replicas (True) or the primary (False)"""
+    _replica_reads.set(enabled)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and _replica_reads.get()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,114 @@
+"""
+Member directory search.
+
+On SQLite the ``core_member_search`` FTS5 index, kept in sync with
+``core_customuser`` by triggers, answers token-prefix queries across name,
+email, mobile, referral ID and sponsor ID. Other databases, or SQLite builds
+without FTS5, fall back to prefix matches that the B-tree indexes on those
+columns can serve.
+
+SQLite drops triggers when a migration rebuilds ``core_customuser``, so
+``install_fts_index`` is idempotent and also runs after every ``migrate``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'core_member_search'
+SEARCH_FIELDS = ['first_name', 'last_name', 'email', 'mobile', 'referral_id', 'sponsor_id']
+
+_fts_available = {}
+
+
+def install_fts_index(connection):
+    """Create the FTS5 table and sync triggers if missing (SQLite only)"""
+    if connection.vendor != 'sqlite':
+        return False
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    if 'core_customuser' not in connection.introspection.table_names():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        created = cursor.fetchone() is None
+        if created:
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    f"{columns}, content='core_customuser', content_rowid='id', prefix='2 3')"
+                )
+            except OperationalError:
+                # SQLite built without FTS5
+                return False
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON core_customuser BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON core_customuser BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        # Only fires when a searchable column is written, not on balance/counter updates
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON core_customuser BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+        )
+        if created:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    _fts_available.pop(connection.alias, None)
+    return True
+
+
+def drop_fts_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _fts_available.pop(connection.alias, None)
+
+
+def fts_available(using='default'):
+    """Whether the FTS5 member index exists on this database (checked once per process)"""
+    if using not in _fts_available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+                )
+                available = cursor.fetchone() is not None
+        _fts_available[using] = available
+    return _fts_available[using]
+
+
+def _fts_query(term):
+    """Turn free text into an FTS5 query: every token must match as a prefix"""
+    tokens = re.findall(r'\w+', term)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_members(queryset, term):
+    term = term.strip()
+    if not term:
+        return queryset
+
+    if fts_available(queryset.db):
+        match = _fts_query(term)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__istartswith': term})
+    return queryset.filter(condition)
@@ -0,0 +1,160 @@
+"""
+Matching income settlement.
+
+The whole referral forest is loaded once into flat, index-addressed arrays
+(parent pointers and per-member purchase volume in paise) and every member's
+leg volumes come out of a single bottom-up sweep, so a run costs a fixed
+handful of queries whatever the size of the network. Credits are written with
+``bulk_create`` and posted to the wallet ledger in one batch.
+
+Referrals are unilevel, so a member's "left" leg is their strongest downline
+leg and the "right" leg is all other legs combined. Matching income is the
+configured percentage of the volume newly matched (``min(left, right)``)
+since the member's previous settlements.
+"""
+import uuid
+from array import array
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import ledger
+from .models import CustomUser, MatchingIncome, Purchase, Referral
+from .rates import current_rates
+
+BATCH_SIZE = 5000
+
+
+def to_paise(amount):
+    return int((amount or 0) * 100)
+
+
+def from_paise(value):
+    return Decimal(value) / 100
+
+
+def load_tree(batch_size=BATCH_SIZE):
+    """Return ``(ids, index, parent, volume)`` for every member.
+
+    ``ids[i]`` is the member's pk, ``index`` maps pk -> i, ``parent[i]`` is the
+    sponsor's index (-1 for roots) and ``volume[i]`` their own purchases in paise.
+    """
+    ids = array('q', CustomUser.objects.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size))
+    index = {pk: i for i, pk in enumerate(ids)}
+
+    parent = array('q', [-1]) * len(ids)
+    edges = Referral.objects.values_list('sponsor_id', 'referred_user_id').iterator(chunk_size=batch_size)
+    for sponsor_id, member_id in edges:
+        parent[index[member_id]] = index[sponsor_id]
+
+    volume = array('q', [0]) * len(ids)
+    totals = Purchase.objects.order_by().values('user_id').annotate(total=Sum('total_amount'))
+    for user_id, total in totals.values_list('user_id', 'total').iterator(chunk_size=batch_size):
+        volume[index[user_id]] = to_paise(total)
+
+    return ids, index, parent, volume
+
+
+def topological_order(parent):
+    """Breadth-first order of all members reachable from a root (sponsors before members)"""
+    size = len(parent)
+    # Children in CSR form: children[offsets[i]:offsets[i + 1]] are i's direct referrals
+    offsets = array('q', [0]) * (size + 1)
+    for p in parent:
+        if p >= 0:
+            offsets[p + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    children = array('q', [0]) * offsets[size]
+    cursor = array('q', offsets[:size])
+    for i, p in enumerate(parent):
+        if p >= 0:
+            children[cursor[p]] = i
+            cursor[p] += 1
+
+    order = array('q', (i for i, p in enumerate(parent) if p < 0))
+    position = 0
+    while position < len(order):
+        node = order[position]
+        order.extend(children[offsets[node]:offsets[node + 1]])
+        position += 1
+    return order
+
+
+def leg_volumes(parent, volume, order):
+    """Return ``(left, right)`` leg volumes for every member in one bottom-up sweep"""
+    size = len(parent)
+    subtree = array('q', volume)
+    strongest = array('q', [0]) * size
+    legs_total = array('q', [0]) * size
+    for node in reversed(order):
+        p = parent[node]
+        if p >= 0:
+            leg = subtree[node]
+            subtree[p] += leg
+            legs_total[p] += leg
+            if leg > strongest[p]:
+                strongest[p] = leg
+    right = array('q', (total - strong for total, strong in zip(legs_total, strongest)))
+    return strongest, right
+
+
+def run_settlement(settlement_date=None, dry_run=False, batch_size=BATCH_SIZE):
+    """Compute and credit matching income for every member.
+
+    Returns a summary dict with the run's ``batch`` id, ``members`` scanned,
+    ``credited`` member count and total ``amount``.
+    """
+    settlement_date = settlement_date or timezone.localdate()
+    percentage = current_rates().matching_income_percentage
+    rate = int(percentage * 100)  # basis points
+
+    ids, index, parent, volume = load_tree(batch_size)
+    left, right = leg_volumes(parent, volume, topological_order(parent))
+
+    # Volume already matched by earlier runs is never paid twice
+    already_matched = array('q', [0]) * len(ids)
+    previous = MatchingIncome.objects.order_by().values('user_id').annotate(total=Sum('matched_volume'))
+    for user_id, total in previous.values_list('user_id', 'total').iterator(chunk_size=batch_size):
+        if user_id in index:
+            already_matched[index[user_id]] = to_paise(total)
+
+    batch = uuid.uuid4().hex
+    incomes = []
+    total_amount = 0
+    for i, pk in enumerate(ids):
+        matched = min(left[i], right[i]) - already_matched[i]
+        amount = matched * rate // 10000
+        if amount <= 0:
+            continue
+        total_amount += amount
+        incomes.append(MatchingIncome(
+            user_id=pk,
+            batch=batch,
+            settlement_date=settlement_date,
+            left_volume=from_paise(left[i]),
+            right_volume=from_paise(right[i]),
+            matched_volume=from_paise(matched),
+            amount=from_paise(amount),
+        ))
+
+    summary = {
+        'batch': batch,
+        'members': len(ids),
+        'credited': len(incomes),
+        'amount': from_paise(total_amount),
+    }
+    if dry_run or not incomes:
+        return summary
+
+    with transaction.atomic():
+        MatchingIncome.objects.bulk_create(incomes, batch_size=batch_size)
+        ledger.post_many(
+            ((income.user_id, income.amount) for income in incomes),
+            'matching_income',
+            f"Matching income {settlement_date}",
+            batch_size=batch_size,
+        )
+    return summary
@@ -0,0 +1,67 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import images
+from .backends import invalidate_users
+from .catalog import bump_catalog_version
+from .content_cache import bump_content_version
+from .models import (
+    CommissionLevel, CustomUser, HomePageSection, PlanItem, Product, ProductItem, ReferralSettings,
+)
+from .rates import bump_version as bump_rates_version
+
+
+@receiver([post_save, post_delete], sender=HomePageSection)
+@receiver([post_save, post_delete], sender=PlanItem)
+@receiver([post_save, post_delete], sender=ProductItem)
+def home_content_changed(sender, **kwargs):
+    # After commit, so no request can cache the old content under the new version
+    transaction.on_commit(bump_content_version)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def catalog_changed(sender, **kwargs):
+    # After commit, so no request can cache the old prices under the new version
+    transaction.on_commit(bump_catalog_version)
+    # Home page cards show the catalog price
+    transaction.on_commit(bump_content_version)
+
+
+@receiver([post_save, post_delete], sender=ReferralSettings)
+@receiver([post_save, post_delete], sender=CommissionLevel)
+def rates_changed(sender, **kwargs):
+    # After commit, so no worker can load the old rates under the new version
+    transaction.on_commit(bump_rates_version)
+
+
+def _image_changed(instance, field_name, update_fields):
+    if update_fields is not None and field_name not in update_fields:
+        return False
+    if field_name in instance.get_deferred_fields():
+        return False
+    return images.needs_thumbnails(getattr(instance, field_name), getattr(instance, f'{field_name}_thumbnails'))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def member_changed(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser)
+def profile_photo_saved(sender, instance, update_fields=None, **kwargs):
+    if _image_changed(instance, 'profile_photo', update_fields):
+        # The cached request user carries the thumbnail paths
+        images.schedule(
+            CustomUser, instance.pk, 'profile_photo', images.PROFILE_SIZES,
+            done=partial(invalidate_users, [instance.pk]),
+        )
+
+
+@receiver(post_save, sender=ProductItem)
+def product_image_saved(sender, instance, update_fields=None, **kwargs):
+    if _image_changed(instance, 'image', update_fields):
+        # Cached home page content holds the rows, so refresh it once the thumbnails are in
+        images.schedule(ProductItem, instance.pk, 'image', images.PRODUCT_SIZES, done=bump_content_version)
@@ -0,0 +1,131 @@
+"""
+Member signup.
+
+A signup is split into the slow part and the writes. Before anything is
+written, one query checks the email and mobile for duplicates and finds the
+sponsor, and the password is hashed, outside any transaction, on a small
+thread pool. The pool only caps how many hashes burn CPU at once (PBKDF2
+releases the GIL, so up to one per core run in parallel); the request
+thread still waits for its own hash, plus up to QUEUE_WAIT for a turn, and
+a burst beyond the queue is turned away with SignupBusy rather than left to
+time out. The member, their referral, genealogy rows and the upline's
+commissions are then written in one short transaction with a fixed number
+of statements, however deep the sponsor sits in the tree.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError
+from django.db.models import Q
+
+from . import commissions, genealogy, ledger
+from .counters import referral_changes
+from .models import CustomUser, Referral
+from .rates import current_rates
+from .referral_ids import create_with_referral_id
+
+DUPLICATE_ERRORS = [
+    ('email', "Email already registered! Please login instead."),
+    ('mobile', "Mobile number already registered!"),
+]
+# Signups allowed to wait for a hash, per worker, before new ones are turned away
+QUEUE_PER_WORKER = 8
+QUEUE_WAIT = 5  # seconds
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class SignupBusy(Exception):
+    """Raised when the hashing pool is saturated and the signup should be retried later"""
+
+
+class DuplicateMember(Exception):
+    """Raised when the email or mobile was registered by a concurrent signup"""
+
+
+def _get_pool():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers * (QUEUE_PER_WORKER + 1))
+        return _executor, _slots
+
+
+def hash_password(password):
+    """``make_password`` on the hashing pool; blocks until done, raises SignupBusy when its queue is full"""
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=QUEUE_WAIT):
+        raise SignupBusy("Too many signups in progress")
+    try:
+        return executor.submit(make_password, password).result()
+    finally:
+        slots.release()
+
+
+def check_new_member(email, mobile, sponsor_id):
+    """Duplicate checks and sponsor lookup in one query. Returns ``(errors, sponsor)``."""
+    email = CustomUser.objects.normalize_email(email)
+    condition = Q(username=email) | Q(email_normalized=email.lower()) | Q(mobile=mobile)
+    if sponsor_id:
+        condition |= Q(referral_id=sponsor_id)
+    taken, sponsor = set(), None
+    for member in CustomUser.objects.filter(condition).only('pk', 'username', 'email_normalized', 'mobile', 'referral_id'):
+        if member.username == email or member.email_normalized == email.lower():
+            taken.add('email')
+        if member.mobile == mobile:
+            taken.add('mobile')
+        if sponsor_id and member.referral_id == sponsor_id:
+            sponsor = member
+    errors = [message for field, message in DUPLICATE_ERRORS if field in taken]
+    return errors, sponsor
+
+
+def create_member(*, email, password, sponsor=None, **fields):
+    """Create a member and, with a sponsor, their referral and commissions.
+
+    Reads (sponsor upline, commission rates) and the password hash happen
+    first; the writes then run in one transaction: the member, the referral,
+    the genealogy rows, the sponsor's counters and balance in one UPDATE with
+    its ledger entry, and one ledger batch for the rest of the upline.
+    """
+    email = CustomUser.objects.normalize_email(email)
+    if sponsor is not None:
+        upline = genealogy.upline_of(sponsor.pk)
+        rates = current_rates()
+        credits = commissions.level_commissions(rates.signup_levels, upline, rates.direct_referral_amount)
+        commission = next((amount for _, depth, amount in credits if depth == 1), Decimal('0.00'))
+    hashed = hash_password(password)
+
+    def create(**values):
+        user = CustomUser(username=CustomUser.normalize_username(email), email=email, password=hashed, **values)
+        user.save(force_insert=True)
+        if sponsor is not None:
+            # bulk_create skips Referral.save(); its counters go into the ledger UPDATE below
+            Referral.objects.bulk_create([
+                Referral(sponsor=sponsor, referred_user=user, commission_earned=commission)
+            ])
+            genealogy.link_member(user, sponsor, upline)
+            ledger.credit(
+                sponsor.pk, commission, 'referral_commission',
+                f"Direct referral: {user.referral_id}", **referral_changes(1, commission),
+            )
+            commissions.post_credits(
+                [credit for credit in credits if credit[1] > 1], f"Upline referral: {user.referral_id}",
+            )
+        return user
+
+    try:
+        # Runs ``create`` in its own transaction, retrying on a referral ID clash
+        return create_with_referral_id(create, **fields)
+    except IntegrityError as exc:
+        if 'referral_id' in str(exc):
+            raise
+        # Lost a race with another signup for the same email or mobile
+        raise DuplicateMember("Email or mobile number already registered!") from exc
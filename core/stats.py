@@ -0,0 +1,84 @@
+"""
+Admin dashboard statistics.
+
+The headline counts come from one conditional-aggregate query per table and
+are cached for ``STATS_TTL`` seconds. When they go stale or are missing, a
+single worker (whoever wins the cache ``add`` lock) recomputes them. The
+others keep serving the previous values, or, with nothing cached yet, wait
+briefly for the winner's result, so neither an expired nor an evicted entry
+triggers a burst of identical COUNT queries.
+"""
+import time
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import CustomUser, Purchase, Referral, Withdrawal
+
+STATS_CACHE_KEY = 'core:admin_stats'
+STATS_LOCK_KEY = 'core:admin_stats:lock'
+STATS_TTL = 30  # seconds the numbers count as fresh
+STATS_STALE_TTL = 600  # how long stale numbers may still be served during a refresh
+STATS_LOCK_TTL = 30
+STATS_WAIT = 5  # seconds to wait for another worker's refresh when nothing is cached
+STATS_POLL = 0.05
+
+
+def compute_admin_stats():
+    stats = CustomUser.objects.aggregate(
+        total_users=Count('id'),
+        active_users=Count('id', filter=Q(is_active_member=True)),
+    )
+    stats.update(Withdrawal.objects.aggregate(
+        total_withdrawals=Count('id'),
+        pending_withdrawals=Count('id', filter=Q(status='pending')),
+    ))
+    stats.update(Purchase.objects.aggregate(total_purchases=Count('id')))
+    stats.update(Referral.objects.aggregate(total_referrals=Count('id')))
+    return stats
+
+
+def _wait_for_stats():
+    """Stats another worker is computing, or ``None`` if they don't arrive in time"""
+    deadline = time.monotonic() + STATS_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(STATS_POLL)
+        entry = cache.get(STATS_CACHE_KEY)
+        if entry:
+            return entry['stats']
+    return None
+
+
+def get_admin_stats():
+    entry = cache.get(STATS_CACHE_KEY)
+    now = time.time()
+    if entry and entry['fresh_until'] > now:
+        return entry['stats']
+
+    # Stale or missing: one worker refreshes; the rest serve what is cached or wait for it
+    if not cache.add(STATS_LOCK_KEY, True, STATS_LOCK_TTL):
+        if entry:
+            return entry['stats']
+        stats = _wait_for_stats()
+        if stats is not None:
+            return stats
+        # The refresh is taking too long (or its worker died); compute without the lock
+        return compute_admin_stats()
+    try:
+        stats = compute_admin_stats()
+        cache.set(
+            STATS_CACHE_KEY,
+            {'stats': stats, 'fresh_until': time.time() + STATS_TTL},
+            STATS_STALE_TTL,
+        )
+    finally:
+        cache.delete(STATS_LOCK_KEY)
+    return stats
+
+
+def invalidate_admin_stats():
+    """Mark cached stats stale so the next dashboard load refreshes them"""
+    entry = cache.get(STATS_CACHE_KEY)
+    if entry:
+        entry['fresh_until'] = 0
+        cache.set(STATS_CACHE_KEY, entry, STATS_STALE_TTL)
@@ -0,0 +1,18 @@
+"""Shared fixtures for the core tests"""
+from decimal import Decimal
+
+from core.models import CustomUser
+
+# Hashing is not under test; PBKDF2 would make every signup take ~0.3s
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def make_member(name, balance='0.00', **fields):
+    return CustomUser.objects.create(
+        username=f'{name}@example.com', email=f'{name}@example.com', password='!',
+        account_balance=Decimal(balance), **fields,
+    )
+
+
+def balance_of(user):
+    return CustomUser.objects.values_list('account_balance', flat=True).get(pk=user.pk)
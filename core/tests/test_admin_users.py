@@ -0,0 +1,68 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+
+from core import async_views, search
+from core.models import CustomUser
+
+from .factories import make_member
+
+
+class MemberSearchTests(TestCase):
+    def setUp(self):
+        self.asha = make_member('asha.rao', first_name='Asha', last_name='Rao', mobile='9876500001', referral_id='MLMASHA01')
+        self.arjun = make_member('arjun', first_name='Arjun', last_name='Mehta', mobile='9123400002', referral_id='MLMARJ002')
+
+    def found(self, term):
+        return set(search.search_members(CustomUser.objects.all(), term))
+
+    def check_searches(self):
+        self.assertEqual(self.found('asha'), {self.asha})
+        self.assertEqual(self.found('Mehta'), {self.arjun})
+        self.assertEqual(self.found('98765'), {self.asha})
+        self.assertEqual(self.found('mlmarj'), {self.arjun})
+        self.assertEqual(self.found('zzz'), set())
+        self.assertEqual(self.found('  '), {self.asha, self.arjun})
+
+    def test_fts_index(self):
+        self.assertTrue(search.fts_available())
+        self.check_searches()
+        self.assertEqual(self.found('asha rao'), {self.asha})
+
+    def test_index_follows_updates_and_deletes(self):
+        CustomUser.objects.filter(pk=self.asha.pk).update(first_name='Meera')
+        self.arjun.delete()
+
+        self.assertEqual(self.found('meera'), {self.asha})
+        self.assertEqual(self.found('arjun'), set())
+
+    def test_prefix_fallback_without_fts(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            self.check_searches()
+
+
+class AdminAccessTests(TestCase):
+    def setUp(self):
+        self.member = make_member('member')
+        self.staff = make_member('staff', is_staff=True)
+
+    def test_admin_pages_require_staff(self):
+        for name in ('admin_dashboard', 'admin_users', 'admin_withdrawals'):
+            with self.subTest(page=name):
+                self.client.logout()
+                self.assertRedirects(self.client.get(reverse(name)), f"{reverse('admin_login')}?next={reverse(name)}")
+                self.client.force_login(self.member)
+                self.assertEqual(self.client.get(reverse(name)).status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('admin_users'), {'q': 'member'}), 'member@example.com')
+
+    def test_async_admin_dashboard_requires_staff(self):
+        for user in (AnonymousUser(), self.member):
+            request = AsyncRequestFactory().get('/mlm-admin/dashboard/')
+            request.user = user
+            request.auser = sync_to_async(lambda user=user: user)
+            with self.subTest(user=str(user)):
+                self.assertEqual(async_to_sync(async_views.admin_dashboard)(request).status_code, 302)
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.backends import EmailBackend
+from core.models import CustomUser
+
+from .factories import FAST_HASHERS
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.member = CustomUser.objects.create_user(
+            username='priya@example.com', email='Priya@Example.com', password='secret',
+        )
+        self.backend = EmailBackend()
+
+    def authenticate(self, **credentials):
+        return self.backend.authenticate(None, **credentials)
+
+    def test_email_in_any_case(self):
+        for email in ('Priya@Example.com', 'priya@example.com', ' PRIYA@EXAMPLE.COM '):
+            with self.subTest(email=email):
+                self.assertEqual(self.authenticate(email=email, password='secret'), self.member)
+
+    def test_username(self):
+        self.assertEqual(self.authenticate(username='priya@example.com', password='secret'), self.member)
+
+    def test_wrong_password_unknown_email_and_inactive_account(self):
+        self.assertIsNone(self.authenticate(email='priya@example.com', password='wrong'))
+        self.assertIsNone(self.authenticate(email='nobody@example.com', password='secret'))
+        self.assertIsNone(self.authenticate(email='priya@example.com', password=None))
+        CustomUser.objects.filter(pk=self.member.pk).update(is_active=False)
+        self.assertIsNone(self.authenticate(email='priya@example.com', password='secret'))
+
+    def test_email_match_wins_over_a_lookalike_username(self):
+        CustomUser.objects.create_user(username='PRIYA@EXAMPLE.COM', email='other@example.com', password='other')
+        self.assertEqual(self.authenticate(email='PRIYA@EXAMPLE.COM', password='secret'), self.member)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, SESSION_USER_CACHE_TIMEOUT=300)
+class SessionUserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = CustomUser.objects.create_user(
+            username='ravi@example.com', email='ravi@example.com', password='secret', first_name='Ravi',
+        )
+        self.backend = EmailBackend()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cached_user_has_no_password_or_balance(self):
+        self.backend.get_user(self.member.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.member.pk)
+
+        self.assertNotIn('password', user.__dict__)
+        self.assertNotIn('account_balance', user.__dict__)
+        self.assertEqual(user.get_session_auth_hash(), self.member.get_session_auth_hash())
+
+    def test_saving_the_member_drops_the_cached_copy(self):
+        self.backend.get_user(self.member.pk)
+        CustomUser.objects.filter(pk=self.member.pk).update(first_name='Ravindra')
+        self.assertEqual(self.backend.get_user(self.member.pk).first_name, 'Ravi')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(pk=self.member.pk).save(update_fields=['updated_at'])
+
+        self.assertEqual(self.backend.get_user(self.member.pk).first_name, 'Ravindra')
+
+    def test_balance_is_read_fresh(self):
+        self.client.force_login(self.member)
+        self.client.get(reverse('dashboard'))
+        CustomUser.objects.filter(pk=self.member.pk).update(account_balance=Decimal('321.00'))
+
+        self.assertContains(self.client.get(reverse('dashboard')), '321')
+
+    def test_password_change_ends_other_sessions(self):
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            member = CustomUser.objects.get(pk=self.member.pk)
+            member.set_password('changed')
+            member.save()
+
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
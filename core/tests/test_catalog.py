@@ -0,0 +1,59 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from core import catalog
+from core.models import Product, Purchase
+
+from .factories import make_member
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = make_member('buyer')
+        self.product = Product.objects.create(name='Kit', price=Decimal('100.00'))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_orders_are_priced_from_the_catalog(self):
+        purchases, total = catalog.place_order(self.member, [(self.product.pk, 2), (str(self.product.pk), 1)])
+
+        self.assertEqual(total, Decimal('300.00'))
+        self.assertEqual([(purchase.quantity, purchase.total_amount) for purchase in purchases], [(3, Decimal('300.00'))])
+
+    def test_invalid_orders(self):
+        for items in ([], [(self.product.pk, 0)], [(self.product.pk, 101)], [('x', 1)], [(self.product.pk + 99, 1)]):
+            with self.subTest(items=items), self.assertRaises(catalog.OrderError):
+                catalog.place_order(self.member, items)
+        self.assertFalse(Purchase.objects.exists())
+
+    def test_product_added_elsewhere_is_found(self):
+        catalog.get_catalog()
+        # Saved by another worker: this process's cached version is not bumped
+        new = Product.objects.create(name='Refill', price=Decimal('40.00'))
+
+        _, total = catalog.place_order(self.member, [(new.pk, 1)])
+
+        self.assertEqual(total, Decimal('40.00'))
+
+    def test_cached_catalog_ages_out(self):
+        catalog.get_catalog()
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('120.00'))
+        self.assertEqual(catalog.get_catalog()[self.product.pk][1], Decimal('100.00'))
+
+        later = time.time() + catalog.MAX_AGE + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(catalog.get_catalog()[self.product.pk][1], Decimal('120.00'))
+
+    def test_saving_a_product_bumps_the_version(self):
+        catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('90.00')
+            self.product.save()
+
+        self.assertEqual(catalog.get_catalog()[self.product.pk][1], Decimal('90.00'))
@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import commissions, ledger, signup
+from core.catalog import place_order
+from core.models import CommissionLevel, Product, ReferralSettings
+
+from .factories import FAST_HASHERS, balance_of
+
+
+class CommissionTests(TestCase):
+    def test_level_commissions(self):
+        levels = {1: (Decimal('100.00'), Decimal('0')), 2: (Decimal('0'), Decimal('10')), 3: (Decimal('5.00'), Decimal('2.5'))}
+        upline = [(11, 1), (12, 2), (13, 3), (14, 4)]
+
+        self.assertEqual(
+            commissions.level_commissions(levels, upline, Decimal('333.33')),
+            [(11, 1, Decimal('100.00')), (12, 2, Decimal('33.33')), (13, 3, Decimal('13.33'))],
+        )
+
+    def test_zero_commissions_are_skipped(self):
+        levels = {1: (Decimal('0'), Decimal('0'))}
+        self.assertEqual(commissions.level_commissions(levels, [(11, 1)], Decimal('500.00')), [])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SignupCommissionTests(TestCase):
+    def setUp(self):
+        # Rates and the catalog are cached under versions the signals bump on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.configure_rates()
+        self.chain = [signup.create_member(email='root@example.com', password='secret')]
+        for name in ('a', 'b', 'c'):
+            self.chain.append(signup.create_member(email=f'{name}@example.com', password='secret', sponsor=self.chain[-1]))
+
+    def tearDown(self):
+        # The rolled-back rows must not outlive the test in the cache
+        cache.clear()
+
+    def configure_rates(self):
+        referral_settings = ReferralSettings.objects.create(direct_referral_amount=Decimal('200.00'))
+        CommissionLevel.objects.bulk_create([
+            CommissionLevel(settings=referral_settings, event='signup', level=1, percentage=Decimal('100')),
+            CommissionLevel(settings=referral_settings, event='signup', level=2, amount=Decimal('50.00')),
+            CommissionLevel(settings=referral_settings, event='signup', level=3, percentage=Decimal('10')),
+            CommissionLevel(settings=referral_settings, event='purchase', level=1, percentage=Decimal('10')),
+            CommissionLevel(settings=referral_settings, event='purchase', level=2, percentage=Decimal('5')),
+        ])
+
+    def add_product(self, price):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(name='Kit', price=Decimal(price))
+
+    def test_signup_pays_configured_levels(self):
+        root, a, b, c = self.chain
+        # root earns level 1 on a, level 2 on b and level 3 on c
+        self.assertEqual(balance_of(root), Decimal('200.00') + Decimal('50.00') + Decimal('20.00'))
+        self.assertEqual(balance_of(a), Decimal('250.00'))
+        self.assertEqual(balance_of(b), Decimal('200.00'))
+        self.assertEqual(balance_of(c), Decimal('0.00'))
+        for member in self.chain:
+            self.assertEqual(ledger.balance_as_of(member), balance_of(member))
+
+    def test_purchase_pays_configured_levels(self):
+        root, a, b, c = self.chain
+        product = self.add_product('999.00')
+        before = {member.pk: balance_of(member) for member in self.chain}
+
+        place_order(c, [(product.pk, 2)])
+
+        gained = {member.pk: balance_of(member) - before[member.pk] for member in self.chain}
+        self.assertEqual(
+            gained, {root.pk: Decimal('0.00'), a.pk: Decimal('99.90'), b.pk: Decimal('199.80'), c.pk: Decimal('0.00')},
+        )
+
+    def test_signup_cost_does_not_grow_with_depth(self):
+        for name in range(12):
+            self.chain.append(signup.create_member(email=f'deep{name}@example.com', password='secret', sponsor=self.chain[-1]))
+        counts = []
+        for sponsor in (self.chain[1], self.chain[-1]):
+            with CaptureQueriesContext(connection) as queries:
+                signup.create_member(email=f'under{sponsor.pk}@example.com', password='secret', sponsor=sponsor)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class DefaultCommissionTests(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_direct_sponsor_earns_direct_referral_amount_without_levels(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ReferralSettings.objects.create(direct_referral_amount=Decimal('150.00'))
+        root = signup.create_member(email='root@example.com', password='secret')
+        sponsor = signup.create_member(email='sponsor@example.com', password='secret', sponsor=root)
+
+        signup.create_member(email='member@example.com', password='secret', sponsor=sponsor)
+
+        self.assertEqual(balance_of(sponsor), Decimal('150.00'))
+        self.assertEqual(balance_of(root), Decimal('150.00'))
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import counters, signup
+from core.catalog import place_order
+from core.models import CustomUser, Product, Purchase
+
+from .factories import FAST_HASHERS
+
+COUNTER_FIELDS = ('pk', 'referral_count', 'total_referral_earnings', 'purchase_count', 'total_spent')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CounterTests(TestCase):
+    def setUp(self):
+        self.sponsor = signup.create_member(email='sponsor@example.com', password='secret')
+        self.members = [
+            signup.create_member(email=f'member{n}@example.com', password='secret', sponsor=self.sponsor)
+            for n in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name='Kit', price=Decimal('450.00'))
+
+    def tearDown(self):
+        cache.clear()
+
+    def counters(self, fields=COUNTER_FIELDS):
+        return list(CustomUser.objects.order_by('pk').values_list(*fields))
+
+    def test_counters_match_rebuild_after_signups_and_orders(self):
+        place_order(self.members[0], [(self.product.pk, 2)])
+        place_order(self.sponsor, [(self.product.pk, 1)])
+        # Single purchases saved through the model bump the same counters
+        Purchase.objects.create(user=self.members[1], product=self.product, quantity=1, total_amount=Decimal('99.00'))
+        recorded = self.counters()
+
+        counters.rebuild_counters()
+
+        self.assertEqual(self.counters(), recorded)
+        sponsor = CustomUser.objects.get(pk=self.sponsor.pk)
+        self.assertEqual(
+            (sponsor.referral_count, sponsor.total_referral_earnings, sponsor.purchase_count, sponsor.total_spent),
+            (3, Decimal('600.00'), 1, Decimal('450.00')),
+        )
+
+    def test_rebuild_repairs_drifted_counters(self):
+        place_order(self.members[2], [(self.product.pk, 1)])
+        recorded = self.counters()
+        CustomUser.objects.update(referral_count=7, purchase_count=0, total_spent=Decimal('1.00'))
+
+        counters.rebuild_counters(team=False)
+
+        self.assertEqual(self.counters(), recorded)
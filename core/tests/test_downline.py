@@ -0,0 +1,124 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import counters, signup
+from core.catalog import place_order
+from core.models import CustomUser, Product, TeamChange
+
+from .factories import FAST_HASHERS
+
+TEAM_FIELDS = ('pk', 'downline_count', 'team_volume')
+
+
+def team_counters():
+    return list(CustomUser.objects.order_by('pk').values_list(*TEAM_FIELDS))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TeamCounterTests(TestCase):
+    def setUp(self):
+        self.chain = [signup.create_member(email='root@example.com', password='secret')]
+        for name in ('a', 'b', 'c'):
+            self.chain.append(signup.create_member(email=f'{name}@example.com', password='secret', sponsor=self.chain[-1]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name='Kit', price=Decimal('450.00'))
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_events_leave_the_upline_rows_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            place_order(self.chain[3], [(self.product.pk, 1)])
+
+        self.assertFalse([query for query in queries if 'downline_count' in query['sql']])
+        self.assertEqual(CustomUser.objects.get(pk=self.chain[0].pk).team_volume, Decimal('0.00'))
+        self.assertEqual(TeamChange.objects.count(), 4)
+
+    def test_roll_up_matches_rebuild(self):
+        place_order(self.chain[2], [(self.product.pk, 1)])
+        place_order(self.chain[3], [(self.product.pk, 3)])
+
+        self.assertEqual(counters.roll_up_team_changes(batch_size=2), 5)
+        recorded = team_counters()
+        counters.rebuild_team_counters()
+
+        self.assertEqual(team_counters(), recorded)
+        self.assertEqual(recorded[0][1:], (3, Decimal('1800.00')))
+        self.assertFalse(TeamChange.objects.exists())
+
+    def test_rebuild_leaves_queued_changes_to_the_roll_up(self):
+        counters.roll_up_team_changes()
+        place_order(self.chain[3], [(self.product.pk, 2)])
+        signup.create_member(email='d@example.com', password='secret', sponsor=self.chain[3])
+
+        counters.rebuild_team_counters()
+        counters.roll_up_team_changes()
+        recorded = team_counters()
+        counters.rebuild_team_counters()
+
+        self.assertEqual(team_counters(), recorded)
+        self.assertEqual(recorded[0][1:], (4, Decimal('900.00')))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TeamTreeViewTests(TestCase):
+    def setUp(self):
+        self.root = signup.create_member(email='root@example.com', password='secret')
+        self.left = signup.create_member(email='left@example.com', password='secret', sponsor=self.root)
+        self.right = signup.create_member(email='right@example.com', password='secret', sponsor=self.root)
+        self.grandchild = signup.create_member(email='grandchild@example.com', password='secret', sponsor=self.left)
+        self.outsider = signup.create_member(email='outsider@example.com', password='secret')
+        counters.roll_up_team_changes()
+        self.url = reverse('team_tree')
+
+    def tree(self, viewer, **params):
+        self.client.force_login(viewer)
+        return self.client.get(self.url, params)
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_team_page_shows_stored_counters(self):
+        self.client.force_login(self.root)
+        response = self.client.get(reverse('team'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['direct_referrals'], response.context['team_size']), (2, 3))
+        self.assertContains(response, self.url)
+
+    def test_own_tree(self):
+        node = self.tree(self.root, depth=2).json()['node']
+
+        self.assertEqual((node['id'], node['level'], node['downline']), (self.root.referral_id, 0, 3))
+        self.assertEqual([child['id'] for child in node['children']], [self.right.referral_id, self.left.referral_id])
+        self.assertEqual(node['children'][1]['children'][0]['id'], self.grandchild.referral_id)
+
+    def test_downline_node(self):
+        node = self.tree(self.root, node=self.grandchild.referral_id).json()['node']
+        self.assertEqual((node['id'], node['level']), (self.grandchild.referral_id, 2))
+
+    def test_members_outside_the_downline_are_hidden(self):
+        for viewer, referral_id in (
+            (self.left, self.right.referral_id),  # sibling
+            (self.left, self.root.referral_id),  # upline
+            (self.grandchild, self.left.referral_id),  # sponsor
+            (self.outsider, self.grandchild.referral_id),
+            (self.root, self.outsider.referral_id),
+            (self.root, 'MLMXXXXXX'),
+        ):
+            with self.subTest(viewer=viewer.email, node=referral_id):
+                self.assertEqual(self.tree(viewer, node=referral_id).status_code, 404)
+
+    def test_paging_children(self):
+        first = self.tree(self.root, limit=1).json()['node']
+        second = self.tree(self.root, limit=1, cursor=first['next_cursor']).json()['node']
+
+        self.assertEqual([child['id'] for child in first['children'] + second['children']],
+                         [self.right.referral_id, self.left.referral_id])
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(self.tree(self.root, cursor='not-a-cursor').status_code, 400)
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core import exports
+from core.models import CustomUser, Withdrawal
+
+from .factories import make_member
+
+
+class CellEscapingTests(TestCase):
+    def test_formulas_are_escaped(self):
+        for value in ('=HYPERLINK("http://x")', '+SUM(A1:A2)', '-1+1', '@cmd', '\tx', '\r=1', '+91 call me'):
+            with self.subTest(value=value):
+                self.assertEqual(exports._cell(value), "'" + value)
+
+    def test_numbers_and_phone_numbers_are_left_alone(self):
+        for value in ('+91 98765 43210', '+91-98765-43210', '+1 (555) 010-9999', '-250.00', '-5', 'Asha', ''):
+            with self.subTest(value=value):
+                self.assertEqual(exports._cell(value), value)
+        self.assertEqual(exports._cell(Decimal('-3.50')), Decimal('-3.50'))
+
+    def test_csv_escapes_and_jsonl_keeps_raw_values(self):
+        rows = [(1, '=1+1', '+91 98765 43210')]
+
+        lines = ''.join(exports.iter_lines(['id', 'name', 'mobile'], rows, 'csv'))
+        self.assertEqual(list(csv.reader(io.StringIO(lines))), [['id', 'name', 'mobile'], ['1', "'=1+1", '+91 98765 43210']])
+        record = json.loads(''.join(exports.iter_lines(['id', 'name', 'mobile'], rows, 'jsonl')))
+        self.assertEqual(record, {'id': 1, 'name': '=1+1', 'mobile': '+91 98765 43210'})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.members = [make_member(f'member{n}', mobile=f'+91 90000 0000{n}') for n in range(5)]
+        for member, status in zip(self.members, ('pending', 'approved', 'pending')):
+            Withdrawal.objects.create(user=member, amount=Decimal('100.00'), status=status)
+
+    def test_values_are_read_in_chunks(self):
+        _, queryset = exports.export_queryset('members')
+        with self.assertNumQueries(3):
+            rows = list(exports.iter_values(queryset, ['id', 'email'], chunk_size=2))
+        self.assertEqual([row[0] for row in rows], list(CustomUser.objects.order_by('pk').values_list('pk', flat=True)))
+
+    def test_filters(self):
+        _, pending = exports.export_queryset('withdrawals', status='pending')
+        self.assertEqual(pending.count(), 2)
+        with self.assertRaises(ValueError):
+            exports.export_queryset('withdrawals', status='lost')
+        with self.assertRaises(ValueError):
+            exports.export_queryset('members', date_from='yesterday')
+        with self.assertRaises(ValueError):
+            exports.export_queryset('referrals', status='pending')
+
+    def test_export_view(self):
+        url = reverse('admin_export', args=['members'])
+        self.client.force_login(self.members[0])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(make_member('staff', is_staff=True))
+        response = self.client.get(url)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+        self.assertEqual(rows[0], exports.DATASETS['members'].header)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1][4], '+91 90000 00000')
+        self.assertEqual(self.client.get(url, {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('admin_export', args=['secrets'])).status_code, 404)
@@ -0,0 +1,50 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import content_cache
+from core.models import HomePageSection
+
+
+class HomeContentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plans = HomePageSection.objects.create(section_type='plans', title='Welcome aboard')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_edit_shows_on_the_next_request(self):
+        self.assertContains(self.client.get(reverse('home')), 'Welcome aboard')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plans.title = 'Grow with us'
+            self.plans.save()
+
+        self.assertContains(self.client.get(reverse('home')), 'Grow with us')
+
+    def test_version_is_bumped_only_on_commit(self):
+        version = content_cache.get_content_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.plans.save()
+            self.assertEqual(content_cache.get_content_version(), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(content_cache.get_content_version(), version)
+
+    def test_cached_page_ages_out(self):
+        self.client.get(reverse('home'))
+        # Saved by another worker: this process's cached version is not bumped
+        HomePageSection.objects.filter(pk=self.plans.pk).update(title='Grow with us')
+        self.assertContains(self.client.get(reverse('home')), 'Welcome aboard')
+
+        later = time.time() + content_cache.MAX_AGE + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertContains(self.client.get(reverse('home')), 'Grow with us')
+
+    def test_home_is_read_from_the_primary(self):
+        self.assertNotIn('home', settings.REPLICA_VIEWS)
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.management.commands import import_members
+from core.models import CustomUser, Referral
+
+from .factories import FAST_HASHERS, make_member
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ImportMembersTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'members.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_rows(self, *rows):
+        with open(self.path, 'w') as handle:
+            handle.writelines(json.dumps(row) + '\n' for row in rows)
+
+    def run_import(self, **options):
+        call_command('import_members', self.path, workers=0, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_emails_are_deduplicated_regardless_of_case(self):
+        make_member('taken')
+        self.write_rows(
+            {'email': 'Taken@Example.com', 'full_name': 'Again'},
+            {'email': 'new@example.com', 'full_name': 'New'},
+            {'email': 'NEW@example.com', 'full_name': 'Duplicate'},
+        )
+
+        self.run_import()
+
+        self.assertEqual(
+            sorted(CustomUser.objects.values_list('email_normalized', flat=True)),
+            ['new@example.com', 'taken@example.com'],
+        )
+
+    def test_checkpoint_stores_only_the_row_offset(self):
+        self.write_rows(
+            {'email': 'child@example.com', 'sponsor_id': 'SPONSOR1'},
+            {'email': 'other@example.com'},
+            {'email': 'sponsor@example.com', 'referral_id': 'SPONSOR1'},
+        )
+        checkpoints = []
+        save_checkpoint = import_members.Command.save_checkpoint
+
+        def record(command):
+            save_checkpoint(command)
+            with open(command.checkpoint) as handle:
+                checkpoints.append(json.load(handle))
+
+        with mock.patch.object(import_members.Command, 'save_checkpoint', record):
+            self.run_import(chunk_size=1)
+
+        self.assertEqual(checkpoints, [{'rows': 1}, {'rows': 2}, {'rows': 3}])
+        self.assertEqual(os.listdir(self.directory), ['members.jsonl'])
+        referral = Referral.objects.get()
+        self.assertEqual((referral.sponsor.email, referral.referred_user.email), ('sponsor@example.com', 'child@example.com'))
+
+    def test_resume_links_members_pending_from_an_earlier_run(self):
+        self.write_rows({'email': 'child@example.com', 'sponsor_id': 'SPONSOR1'})
+        with mock.patch.object(import_members.Command, 'link_pending', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.write_rows(
+            {'email': 'child@example.com', 'sponsor_id': 'SPONSOR1'},
+            {'email': 'sponsor@example.com', 'referral_id': 'SPONSOR1'},
+        )
+
+        self.run_import()
+
+        self.assertEqual(Referral.objects.get().referred_user.email, 'child@example.com')
+        self.assertEqual(os.listdir(self.directory), ['members.jsonl'])
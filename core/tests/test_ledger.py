@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from core import ledger
+from core.models import CustomUser, WalletSnapshot, WalletTransaction
+
+from .factories import balance_of, make_member
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.member = make_member('ledger')
+
+    def test_credit_and_debit_update_balance_and_ledger(self):
+        ledger.credit(self.member.pk, Decimal('150.00'), 'adjustment', 'Top up')
+        ledger.debit(self.member.pk, Decimal('40.50'), 'withdrawal', 'Payout')
+
+        self.assertEqual(balance_of(self.member), Decimal('109.50'))
+        self.assertEqual(
+            list(WalletTransaction.objects.filter(user=self.member).order_by('id').values_list('transaction_type', 'amount')),
+            [('adjustment', Decimal('150.00')), ('withdrawal', Decimal('-40.50'))],
+        )
+        self.assertEqual(ledger.balance_as_of(self.member), Decimal('109.50'))
+
+    def test_overdraft_is_refused(self):
+        ledger.credit(self.member.pk, Decimal('100.00'), 'adjustment')
+
+        with self.assertRaises(ledger.InsufficientBalance):
+            ledger.debit(self.member.pk, Decimal('100.01'), 'withdrawal')
+
+        self.assertEqual(balance_of(self.member), Decimal('100.00'))
+        self.assertEqual(WalletTransaction.objects.filter(user=self.member).count(), 1)
+
+    def test_post_many_sums_repeated_members(self):
+        other = make_member('other')
+        ledger.post_many(
+            [(self.member.pk, Decimal('10.00')), (other.pk, Decimal('5.00')), (self.member.pk, Decimal('2.50'))],
+            'matching_income',
+        )
+
+        self.assertEqual(balance_of(self.member), Decimal('12.50'))
+        self.assertEqual(balance_of(other), Decimal('5.00'))
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.member = make_member('saver')
+        self.other = make_member('spender')
+
+    def test_snapshots_only_members_with_new_entries(self):
+        ledger.credit(self.member.pk, Decimal('100.00'), 'adjustment')
+        ledger.credit(self.other.pk, Decimal('40.00'), 'adjustment')
+        self.assertEqual(ledger.take_snapshots(), 2)
+
+        entry = ledger.debit(self.member.pk, Decimal('30.00'), 'withdrawal')
+        self.assertEqual(ledger.take_snapshots(batch_size=1), 1)
+        self.assertEqual(ledger.take_snapshots(), 0)
+
+        ledger.credit(self.member.pk, Decimal('5.00'), 'adjustment')
+        self.assertEqual(ledger.balance_as_of(self.member), Decimal('75.00'))
+        self.assertEqual(ledger.balance_as_of(self.member, entry.pk), Decimal('70.00'))
+        self.assertEqual(ledger.balance_as_of(self.member, entry.pk - 1), Decimal('100.00'))
+
+    def test_entries_committed_below_a_later_snapshot_are_counted(self):
+        ledger.credit(self.member.pk, Decimal('100.00'), 'adjustment')
+        ledger.take_snapshots()
+        # An entry of a long transaction: its id is taken now but it commits later
+        late = ledger.credit(self.member.pk, Decimal('25.00'), 'adjustment')
+        WalletTransaction.objects.filter(pk=late.pk).delete()
+        CustomUser.objects.filter(pk=self.member.pk).update(account_balance=Decimal('100.00'))
+        ledger.credit(self.other.pk, Decimal('40.00'), 'adjustment')
+        ledger.take_snapshots()
+
+        WalletTransaction.objects.bulk_create([late])
+        CustomUser.objects.filter(pk=self.member.pk).update(account_balance=Decimal('125.00'))
+        ledger.credit(self.member.pk, Decimal('10.00'), 'adjustment')
+        ledger.take_snapshots()
+
+        self.assertEqual(ledger.balance_as_of(self.member), Decimal('135.00'))
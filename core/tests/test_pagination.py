@@ -0,0 +1,75 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Withdrawal
+from core.pagination import InvalidCursor, encode_cursor, keyset_page, page_size
+
+from .factories import make_member
+
+ORDERING = ('-requested_date', '-id')
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        self.member = make_member('pager')
+        now = timezone.now()
+        # Pairs of withdrawals share a timestamp, so pages must break ties on id
+        for n in range(7):
+            withdrawal = Withdrawal.objects.create(user=self.member, amount=Decimal(n + 1))
+            # requested_date is auto_now_add
+            Withdrawal.objects.filter(pk=withdrawal.pk).update(requested_date=now - timedelta(minutes=n // 2))
+        self.queryset = Withdrawal.objects.filter(user=self.member)
+        self.expected = list(self.queryset.order_by(*ORDERING).values_list('pk', flat=True))
+
+    def pages(self, limit):
+        cursor, seen = None, []
+        while True:
+            rows, cursor = keyset_page(self.queryset, ORDERING, cursor, limit)
+            seen.append([row.pk for row in rows])
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for limit in (1, 2, 3, 7, 20):
+            with self.subTest(limit=limit):
+                pages = self.pages(limit)
+                self.assertEqual([pk for page in pages for pk in page], self.expected)
+                self.assertTrue(all(len(page) == limit for page in pages[:-1]))
+
+    def test_a_page_is_one_query(self):
+        _, cursor = keyset_page(self.queryset, ORDERING, None, 3)
+        with self.assertNumQueries(1):
+            keyset_page(self.queryset, ORDERING, cursor, 3)
+
+    def test_invalid_cursors(self):
+        for cursor in ('not base64!', encode_cursor(['x']), encode_cursor(['not a date', '1']), 'bnVsbA'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                keyset_page(self.queryset, ORDERING, cursor, 3)
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual([page_size(value) for value in ('5', '0', '1000', 'x', None)], [5, 1, 100, 20, 20])
+
+
+class DashboardSectionTests(TestCase):
+    def setUp(self):
+        self.member = make_member('pager')
+        for amount in ('10.00', '20.00', '30.00'):
+            Withdrawal.objects.create(user=self.member, amount=Decimal(amount))
+        self.client.force_login(self.member)
+        self.url = reverse('dashboard_section', args=['withdrawals'])
+
+    def test_next_pages_and_bad_input(self):
+        first = self.client.get(self.url, {'limit': 2}).json()
+        second = self.client.get(self.url, {'limit': 2, 'cursor': first['next_cursor']}).json()
+
+        self.assertEqual((first['count'], second['count'], second['next_cursor']), (2, 1, None))
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard_section', args=['wallets'])).status_code, 404)
+
+    def test_other_members_rows_are_not_listed(self):
+        self.client.force_login(make_member('other'))
+        self.assertEqual(self.client.get(self.url).json()['count'], 0)
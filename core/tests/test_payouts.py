@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from core import payouts
+from core.models import WalletTransaction, Withdrawal
+
+from .factories import balance_of, make_member
+
+
+class PayoutTests(TestCase):
+    def setUp(self):
+        self.member = make_member('payee')
+        self.withdrawals = [
+            Withdrawal.objects.create(user=self.member, amount=Decimal(amount))
+            for amount in ('100.00', '250.00')
+        ]
+        self.selection = Withdrawal.objects.filter(pk__in=[withdrawal.pk for withdrawal in self.withdrawals])
+
+    def refunds(self):
+        return WalletTransaction.objects.filter(user=self.member, transaction_type='withdrawal_refund')
+
+    def test_bulk_reject_refunds_exactly_once(self):
+        self.assertEqual(payouts.process(self.selection, 'reject', 'Bank details invalid'), 2)
+        self.assertEqual(payouts.process(self.selection, 'reject'), 0)
+
+        self.assertEqual(balance_of(self.member), Decimal('350.00'))
+        self.assertEqual(self.refunds().count(), 2)
+        self.assertEqual(set(self.selection.values_list('status', flat=True)), {'rejected'})
+
+    def test_transitions_skip_withdrawals_in_other_states(self):
+        payouts.process(self.selection.filter(pk=self.withdrawals[0].pk), 'approve')
+        payouts.process(self.selection, 'complete')
+
+        self.assertEqual(
+            dict(self.selection.values_list('pk', 'status')),
+            {self.withdrawals[0].pk: 'completed', self.withdrawals[1].pk: 'pending'},
+        )
+        self.assertEqual(payouts.process(self.selection.filter(status='completed'), 'reject'), 0)
+        self.assertFalse(self.refunds().exists())
+
+    def test_payout_file_lists_approved_withdrawals_up_to_its_cutoff(self):
+        payouts.process(self.selection, 'approve')
+        filename, rows = payouts.payout_file(self.selection)
+        # Approved after the file was started; rows are read lazily but stop at the cutoff
+        Withdrawal.objects.create(user=self.member, amount=Decimal('75.00'), status='approved')
+
+        self.assertTrue(filename.endswith(f'-upto-{self.withdrawals[1].pk}.csv'))
+        self.assertEqual([row[0] for row in rows], [f'WD{withdrawal.pk}' for withdrawal in self.withdrawals])
+
+
+class WithdrawalActionViewTests(TestCase):
+    def setUp(self):
+        self.member = make_member('payee')
+        self.withdrawal = Withdrawal.objects.create(user=self.member, amount=Decimal('100.00'))
+        self.url = reverse('admin_withdrawal_action', args=[self.withdrawal.pk])
+
+    def status(self):
+        return Withdrawal.objects.values_list('status', flat=True).get(pk=self.withdrawal.pk)
+
+    def test_requires_staff(self):
+        self.client.force_login(self.member)
+
+        response = self.client.post(self.url, {'action': 'reject'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.status(), 'pending')
+        self.assertEqual(balance_of(self.member), Decimal('0.00'))
+
+    def test_unknown_action_is_rejected(self):
+        self.client.force_login(make_member('finance', is_staff=True))
+
+        self.assertEqual(self.client.post(self.url, {'action': 'delete'}).status_code, 400)
+        self.assertEqual(self.status(), 'pending')
+
+    def test_actions_follow_the_state_machine(self):
+        self.client.force_login(make_member('finance', is_staff=True))
+
+        self.client.post(self.url, {'action': 'complete'})
+        self.assertEqual(self.status(), 'pending')
+        self.client.post(self.url, {'action': 'reject'})
+        self.client.post(self.url, {'action': 'reject'})
+
+        self.assertEqual(self.status(), 'rejected')
+        self.assertEqual(balance_of(self.member), Decimal('100.00'))
+        self.assertEqual(WalletTransaction.objects.filter(user=self.member).count(), 1)
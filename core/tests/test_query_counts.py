@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import counters, signup
+from core.catalog import place_order
+from core.models import Product, Withdrawal
+
+from .factories import FAST_HASHERS, make_member
+
+# (view, who) for the pages that list members, history or statistics
+PAGES = [
+    ('home', 'anonymous'),
+    ('dashboard', 'member'),
+    ('team', 'member'),
+    ('team_tree', 'member'),
+    ('admin_dashboard', 'staff'),
+    ('admin_users', 'staff'),
+    ('admin_withdrawals', 'staff'),
+]
+SECTIONS = ('purchases', 'referrals', 'withdrawals')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class QueryCountTests(TestCase):
+    """A page's query count must not grow with the data behind it (no N+1 queries)"""
+
+    def setUp(self):
+        self.users = {
+            'member': signup.create_member(email='member@example.com', password='secret'),
+            'staff': make_member('staff', is_staff=True),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name='Kit', price=Decimal('100.00'))
+        self.joined = 0
+
+    def tearDown(self):
+        cache.clear()
+
+    def grow(self, count):
+        """``count`` more referrals, purchases and withdrawals around the member"""
+        member = self.users['member']
+        for _ in range(count):
+            self.joined += 1
+            recruit = signup.create_member(email=f'recruit{self.joined}@example.com', password='secret', sponsor=member)
+            signup.create_member(email=f'second{self.joined}@example.com', password='secret', sponsor=recruit)
+            place_order(recruit, [(self.product.pk, 1)])
+            place_order(member, [(self.product.pk, 1)])
+            Withdrawal.objects.create(user=member, amount=Decimal('10.00'))
+            Withdrawal.objects.create(user=recruit, amount=Decimal('10.00'))
+        counters.roll_up_team_changes()
+
+    def query_counts(self):
+        urls = [(name, reverse(name), who) for name, who in PAGES] + [
+            (f'dashboard_section ({section})', reverse('dashboard_section', args=[section]), 'member')
+            for section in SECTIONS
+        ]
+        counts = {}
+        for label, url, who in urls:
+            cache.clear()
+            self.client.logout()
+            if who != 'anonymous':
+                self.client.force_login(self.users[who])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, label)
+            counts[label] = len(queries)
+        return counts
+
+    def test_query_counts_do_not_grow_with_data(self):
+        self.grow(2)
+        small = self.query_counts()
+        self.grow(25)
+
+        self.assertEqual(self.query_counts(), small)
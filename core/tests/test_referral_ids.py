@@ -0,0 +1,83 @@
+import random
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from core import referral_ids
+from core.models import CustomUser, IdSequence
+
+from .factories import make_member
+
+
+class PermutationTests(TestCase):
+    def test_consecutive_numbers_never_collide(self):
+        values = {referral_ids.permute(number) for number in range(50000)}
+        self.assertEqual(len(values), 50000)
+
+    def test_unpermute_inverts_permute_on_the_id_space(self):
+        rng = random.Random(9)
+        numbers = [0, 1, referral_ids.SPACE - 1] + [rng.randrange(referral_ids.SPACE) for _ in range(2000)]
+        for number in numbers:
+            value = referral_ids.permute(number)
+            self.assertLess(value, referral_ids.SPACE)
+            self.assertEqual(referral_ids.unpermute(value), number)
+
+    def test_ids_keep_the_legacy_format_and_are_not_consecutive(self):
+        ids = [referral_ids.referral_id_for(number) for number in range(50)]
+
+        self.assertTrue(all(len(referral_id) == 9 and referral_id.startswith('MLM') for referral_id in ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertNotEqual(ids, sorted(ids))
+
+    def test_exhausted_space(self):
+        with self.assertRaises(referral_ids.ReferralIdsExhausted):
+            referral_ids.referral_id_for(referral_ids.SPACE)
+
+
+class AllocatorTests(TestCase):
+    def setUp(self):
+        referral_ids.reset_allocator()
+
+    def tearDown(self):
+        # Blocks reserved in the test transaction are rolled back with it
+        referral_ids.reset_allocator()
+
+    def next_sequence_number(self):
+        return IdSequence.objects.filter(name=referral_ids.SEQUENCE_NAME).values_list('next_value', flat=True).first() or 0
+
+    def create(self, name):
+        def create(**values):
+            return make_member(name, **values)
+        return create
+
+    def test_reservations_hand_out_distinct_numbers(self):
+        first = referral_ids.reserve_sequence(5)
+        second = referral_ids.reserve_sequence(3)
+
+        self.assertEqual(len(set(first) | set(second)), 8)
+        self.assertEqual(len(set(referral_ids.reserve_referral_ids(10))), 10)
+
+    def test_clash_with_a_legacy_id_is_retried(self):
+        taken = referral_ids.referral_id_for(self.next_sequence_number())
+        make_member('legacy', referral_id=taken)
+
+        member = referral_ids.create_with_referral_id(self.create('new'))
+
+        self.assertNotEqual(member.referral_id, taken)
+        self.assertTrue(CustomUser.objects.filter(pk=member.pk, referral_id=member.referral_id).exists())
+
+    def test_retries_are_bounded(self):
+        start = self.next_sequence_number()
+        for n in range(2):
+            make_member(f'legacy{n}', referral_id=referral_ids.referral_id_for(start + n))
+
+        with self.assertRaises(IntegrityError):
+            referral_ids.create_with_referral_id(self.create('new'), attempts=2)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        make_member('taken')
+        start = self.next_sequence_number()
+
+        with self.assertRaises(IntegrityError):
+            referral_ids.create_with_referral_id(self.create('taken'))
+        self.assertEqual(self.next_sequence_number(), start + 1)
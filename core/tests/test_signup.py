@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core import signup
+from core.models import CustomUser, Referral
+
+from .factories import FAST_HASHERS
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class SignupTests(TestCase):
+    def setUp(self):
+        self.sponsor = signup.create_member(email='sponsor@example.com', password='secret', mobile='9876543210')
+
+    def test_member_is_created_with_a_usable_password_and_referral(self):
+        member = signup.create_member(email='New@Example.com', password='secret', sponsor=self.sponsor)
+
+        member = CustomUser.objects.get(pk=member.pk)
+        self.assertTrue(member.check_password('secret'))
+        self.assertRegex(member.referral_id, r'^MLM[A-Z0-9]{6}$')
+        self.assertTrue(Referral.objects.filter(sponsor=self.sponsor, referred_user=member).exists())
+
+    def test_check_new_member_finds_duplicates_and_the_sponsor_in_one_query(self):
+        with self.assertNumQueries(1):
+            errors, sponsor = signup.check_new_member('SPONSOR@example.com', '9876543210', self.sponsor.referral_id)
+
+        self.assertEqual(errors, [message for _, message in signup.DUPLICATE_ERRORS])
+        self.assertEqual(sponsor, self.sponsor)
+        self.assertEqual(signup.check_new_member('other@example.com', '9000000000', None), ([], None))
+
+    def test_racing_duplicate_is_reported(self):
+        with self.assertRaises(signup.DuplicateMember):
+            signup.create_member(email='sponsor@example.com', password='secret')
+
+    def test_saturated_hashing_pool_turns_signups_away(self):
+        _, slots = signup._get_pool()
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        try:
+            with mock.patch.object(signup, 'QUEUE_WAIT', 0.01), self.assertRaises(signup.SignupBusy):
+                signup.hash_password('secret')
+        finally:
+            for _ in range(taken):
+                slots.release()
+        self.assertTrue(signup.hash_password('secret'))
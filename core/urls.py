@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Pages whose independent queries run concurrently under ASGI
+fan_out_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # Public
@@ -15,17 +19,24 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
 
     # User
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', fan_out_views.dashboard, name='dashboard'),
+    path('dashboard/<str:section>/', views.dashboard_section, name='dashboard_section'),
     path('team/', views.team, name='team'),
+    path('team/tree/', views.team_tree, name='team_tree'),
     path('wallet/', views.wallet, name='wallet'),
     path('profile/update/', views.update_profile, name='update_profile'),
     path('withdrawal/request/', views.request_withdrawal, name='request_withdrawal'),
     path('purchase/', views.purchase_product, name='purchase_product'),
+    path('cart/checkout/', views.checkout, name='checkout'),
 
     # Custom MLM Admin
     path('mlm-admin/login/', views.admin_login, name='admin_login'),
-    path('mlm-admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('mlm-admin/dashboard/', fan_out_views.admin_dashboard, name='admin_dashboard'),
     path('mlm-admin/users/', views.admin_users, name='admin_users'),
+    path('mlm-admin/withdrawals/', views.admin_withdrawals, name='admin_withdrawals'),
+    path('mlm-admin/withdrawals/bulk/', views.admin_withdrawals_bulk, name='admin_withdrawals_bulk'),
+    path('mlm-admin/withdrawals/payouts.csv', views.admin_withdrawals_export, name='admin_withdrawals_export'),
+    path('mlm-admin/export/<str:dataset>/', views.admin_export, name='admin_export'),
    
 
     # path('mlm-admin/products/', views.admin_products, name='admin_products'),
@@ -43,4 +54,7 @@ urlpatterns = [
         views.admin_withdrawal_action,
         name='admin_withdrawal_action'
     ),
+
+    # Monitoring
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
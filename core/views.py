@@ -1,30 +1,48 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_protect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.conf import settings
 from django.utils import timezone
+from django.utils.http import urlencode
 from decimal import Decimal
+import hmac
+import json
 import os
 from .models import (
     CustomUser, Purchase, Referral, Withdrawal, Product, 
-    ReferralSettings, HomePageSection, PlanItem, ProductItem
+    HomePageSection, PlanItem, ProductItem
 )
+from . import catalog, content_cache, downline, exports, ledger, metrics, payouts, signup
+from .pagination import InvalidCursor, keyset_page, page_size
+from .search import search_members
+from .stats import get_admin_stats
 
 def home(request):
-    # Get dynamic sections
-    sections = HomePageSection.objects.filter(is_active=True)
-    plan_items = PlanItem.objects.filter(is_active=True)
-    product_items = ProductItem.objects.filter(is_active=True)
+    # Content only changes when an admin edits it, so it is cached per version
+    version = content_cache.get_content_version()
+    anonymous = not request.user.is_authenticated
     
-    context = {
-        'sections': {s.section_type: s for s in sections},
-        'plan_items': plan_items,
-        'product_items': product_items,
-    }
-    return render(request, 'home.html', context)
+    # Anonymous visitors all get the same page; serve it without touching the DB
+    if anonymous:
+        page = cache.get(content_cache.page_key('home', version))
+        if page is not None:
+            return HttpResponse(page)
+    
+    # Get dynamic sections
+    context = content_cache.get_home_content(version)
+    response = render(request, 'home.html', context)
+    if anonymous:
+        cache.set(content_cache.page_key('home', version), response.content, content_cache.MAX_AGE)
+    return response
 
 def products(request):
     products = Product.objects.all()
@@ -51,14 +69,8 @@ def join(request):
         confirm_password = request.POST.get('confirm_password', '')
         
         # Validation
-        errors = []
-        
-        # Check if user already exists
-        if CustomUser.objects.filter(email=email).exists():
-            errors.append("Email already registered! Please login instead.")
-        
-        if CustomUser.objects.filter(mobile=mobile).exists():
-            errors.append("Mobile number already registered!")
+        # Check if user already exists (and find the sponsor) in one query
+        errors, sponsor = signup.check_new_member(email, mobile, sponsor_id)
         
         # Password validation
         if password != confirm_password:
@@ -82,48 +94,30 @@ def join(request):
                 messages.error(request, error)
             return render(request, 'loginSignup.html')
         
-        # Create user
+        # Create user, with their referral and the sponsor's commission, in one transaction
         try:
-            user = CustomUser.objects.create_user(
-                username=email,  # Use email as username
+            signup.create_member(
                 email=email,
                 password=password,
+                sponsor=sponsor,
                 first_name=first_name,
                 mobile=mobile,
                 sponsor_id=sponsor_id,
                 sponsor_name=sponsor_name,
                 is_active_member=True
             )
-            # Generate unique referral ID
-            user.referral_id = user.generate_referral_id()
-            user.save()
-            
-            # Create referral record if sponsor exists
-            if sponsor_id:
-                try:
-                    sponsor = CustomUser.objects.get(referral_id=sponsor_id)
-                    referral_settings = ReferralSettings.objects.filter(is_active=True).first()
-                    if referral_settings:
-                        commission = referral_settings.direct_referral_amount
-                    else:
-                        commission = Decimal('200.00')
-                    
-                    Referral.objects.create(
-                        sponsor=sponsor,
-                        referred_user=user,
-                        commission_earned=commission
-                    )
-                    # Add commission to sponsor's account
-                    sponsor.account_balance += commission
-                    sponsor.save()
-                except CustomUser.DoesNotExist:
-                    pass
-            
-            messages.success(request, "Account created successfully! Please login.")
-            return redirect('login')
+        except signup.DuplicateMember as e:
+            messages.error(request, str(e))
+            return render(request, 'loginSignup.html')
+        except signup.SignupBusy:
+            messages.error(request, "We're registering a lot of members right now. Please try again in a moment.")
+            return render(request, 'loginSignup.html', status=503)
         except Exception as e:
             messages.error(request, f"Error creating account: {str(e)}")
             return render(request, 'loginSignup.html')
+        
+        messages.success(request, "Account created successfully! Please login.")
+        return redirect('login')
     
     return render(request, 'loginSignup.html')
 
@@ -142,7 +136,7 @@ def login_view(request):
             return render(request, 'loginSignup.html')
         
         # Authenticate user
-        user = authenticate(request, username=email, password=password)
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
             login(request, user)
@@ -170,34 +164,87 @@ def logout_view(request):
 def dashboard(request):
     """User Dashboard"""
     user = request.user
-    
-    # Get statistics
-    referral_count = user.get_referral_count()
-    purchase_count = user.get_purchase_count()
-    total_spent = user.get_total_purchase_amount()
-    
-    # Get total referral earnings
-    total_referral_earnings = Decimal('0.00')
-    referrals = Referral.objects.filter(sponsor=user)
-    for ref in referrals:
-        total_referral_earnings += ref.commission_earned
-    
-    # Get related data
-    purchases = Purchase.objects.filter(user=user).order_by('-purchase_date')
-    referrals = Referral.objects.filter(sponsor=user).select_related('referred_user')
-    withdrawals = Withdrawal.objects.filter(user=user).order_by('-requested_date')
-    
+
+    # Get the first page of each history table; the rest load on demand
+    sections = {section: _dashboard_section(user, section) for section in DASHBOARD_SECTIONS}
+    _load_member_stats(user)
+    return render(request, 'user/dashboard.html', _dashboard_context(user, sections))
+
+DASHBOARD_SECTIONS = ('purchases', 'referrals', 'withdrawals')
+
+# Balance and counters aren't part of the cached session user (core.backends)
+MEMBER_STAT_FIELDS = ('account_balance', 'referral_count', 'purchase_count', 'total_spent', 'total_referral_earnings')
+
+def _load_member_stats(user):
+    """Read the member's balance and counters fresh from the database (one query)"""
+    user.refresh_from_db(fields=MEMBER_STAT_FIELDS)
+
+def _dashboard_context(user, sections):
+    """Dashboard template context; ``sections`` maps each section to ``(rows, next_cursor)``.
+
+    Call ``_load_member_stats(user)`` first.
+    """
+    # Get statistics (stored counters, see core.counters)
     context = {
         'user': user,
-        'referral_count': referral_count,
-        'purchase_count': purchase_count,
-        'total_spent': total_spent,
-        'total_referral_earnings': total_referral_earnings,
-        'purchases': purchases,
-        'referrals': referrals,
-        'withdrawals': withdrawals,
+        'referral_count': user.get_referral_count(),
+        'purchase_count': user.get_purchase_count(),
+        'total_spent': user.get_total_purchase_amount(),
+        'total_referral_earnings': user.total_referral_earnings,
     }
-    return render(request, 'user/dashboard.html', context)
+    for section, (rows, next_cursor) in sections.items():
+        context[section] = rows
+        context[f'{section}_cursor'] = next_cursor
+    return context
+
+def _dashboard_section(user, section, cursor=None, limit=None):
+    """One keyset page of a member's purchases, referrals or withdrawals"""
+    if section == 'purchases':
+        queryset = Purchase.objects.filter(user=user).select_related('product').only(
+            'quantity', 'total_amount', 'purchase_date',
+            'product__name', 'product__description', 'product__price',
+        )
+        ordering = ('-purchase_date', '-id')
+    elif section == 'referrals':
+        queryset = Referral.objects.filter(sponsor=user).select_related('referred_user').only(
+            'referral_date', 'commission_earned',
+            'referred_user__first_name', 'referred_user__last_name', 'referred_user__email',
+            'referred_user__mobile', 'referred_user__referral_id',
+        )
+        ordering = ('-referral_date', '-id')
+    elif section == 'withdrawals':
+        queryset = Withdrawal.objects.filter(user=user).only(
+            'amount', 'admin_charge', 'net_amount', 'status', 'requested_date',
+        )
+        ordering = ('-requested_date', '-id')
+    else:
+        raise Http404("Unknown dashboard section")
+    return keyset_page(queryset, ordering, cursor, limit or page_size(None))
+
+@login_required(login_url='login')
+def dashboard_section(request, section):
+    """Dashboard - next page of a history table (JSON, rendered rows + cursor)"""
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+        rows, next_cursor = _dashboard_section(
+            request.user, section,
+            cursor=request.GET.get('cursor'),
+            limit=page_size(request.GET.get('limit')),
+        )
+    except (InvalidCursor, ValueError):
+        return JsonResponse({'success': False, 'message': 'Invalid cursor'}, status=400)
+    
+    html = render_to_string(
+        f'user/partials/{section}_rows.html',
+        {section: rows, 'offset': offset},
+        request=request,
+    )
+    return JsonResponse({
+        'success': True,
+        'html': html,
+        'count': len(rows),
+        'next_cursor': next_cursor,
+    })
 
 @login_required(login_url='login')
 @require_http_methods(["POST"])
@@ -224,19 +271,21 @@ def request_withdrawal(request):
     
     # Create withdrawal request
     try:
-        withdrawal = Withdrawal.objects.create(
-            user=user,
-            amount=amount
-        )
-        
-        # Deduct from account balance
-        user.account_balance -= amount
-        user.save()
+        with transaction.atomic():
+            withdrawal = Withdrawal.objects.create(
+                user=user,
+                amount=amount
+            )
+            
+            # Deduct from account balance
+            ledger.debit(user.pk, amount, 'withdrawal', f"Withdrawal #{withdrawal.pk}")
         
         messages.success(
             request, 
             f"Withdrawal request submitted! Amount: ₹{amount}, Admin Charge (10%): ₹{withdrawal.admin_charge}, Net Amount: ₹{withdrawal.net_amount}"
         )
+    except ledger.InsufficientBalance:
+        messages.error(request, "Insufficient balance!")
     except Exception as e:
         messages.error(request, f"Error processing withdrawal: {str(e)}")
     
@@ -245,7 +294,35 @@ def request_withdrawal(request):
 @login_required(login_url='login')
 def team(request):
     """Team Management"""
-    return render(request, 'team.html')
+    user = request.user
+    # Stored counters (core.counters), not a count over the whole downline;
+    # the tree itself loads on demand from team_tree
+    user.refresh_from_db(fields=('referral_count', 'downline_count', 'team_volume'))
+    
+    context = {
+        'team_size': user.downline_count,
+        'team_volume': user.team_volume,
+        'direct_referrals': user.referral_count,
+    }
+    return render(request, 'user/team.html', context)
+
+@login_required(login_url='login')
+@require_http_methods(["GET"])
+def team_tree(request):
+    """Team - one subtree of the member's genealogy (JSON, nodes expanded on demand)"""
+    node = downline.find_node(request.user, request.GET.get('node'))
+    if node is None:
+        return JsonResponse({'success': False, 'message': 'Member not found in your team'}, status=404)
+    try:
+        tree = downline.subtree(
+            node,
+            depth=downline.bounded(request.GET.get('depth'), downline.DEFAULT_DEPTH, downline.MAX_DEPTH),
+            limit=downline.bounded(request.GET.get('limit'), downline.DEFAULT_LIMIT, downline.MAX_LIMIT),
+            cursor=request.GET.get('cursor'),
+        )
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'message': 'Invalid cursor'}, status=400)
+    return JsonResponse({'success': True, 'node': tree})
 
 @login_required(login_url='login')
 def wallet(request):
@@ -260,6 +337,7 @@ def update_profile(request):
     user = request.user
     
     if request.method == 'POST':
+        changed = ['first_name', 'last_name', 'mobile', 'updated_at']
         # Update profile photo if provided
         if 'profile_photo' in request.FILES:
             # Delete old photo if exists
@@ -269,6 +347,7 @@ def update_profile(request):
                     os.remove(old_photo_path)
             
             user.profile_photo = request.FILES['profile_photo']
+            changed.append('profile_photo')
             messages.success(request, "Profile photo updated successfully!")
         
         # Update user information
@@ -277,13 +356,14 @@ def update_profile(request):
         mobile = request.POST.get('mobile', '').strip()
         email = request.POST.get('email', '').strip()
         
-        # Validate email uniqueness (if changed)
+        # Validate email uniqueness (if changed), ignoring case like logins do
         if email and email != user.email:
-            if CustomUser.objects.filter(email=email).exclude(id=user.id).exists():
+            if CustomUser.objects.filter(email_normalized=email.lower()).exclude(id=user.id).exists():
                 messages.error(request, "Email already exists! Please use a different email.")
                 return redirect('dashboard')
             user.email = email
             user.username = email  # Update username to match email
+            changed += ['email', 'username']
         
         # Update other fields
         if first_name:
@@ -298,7 +378,8 @@ def update_profile(request):
                     return redirect('dashboard')
             user.mobile = mobile
         
-        user.save()
+        # Only the edited columns: the request user may be a cached copy (core.backends)
+        user.save(update_fields=changed)
         messages.success(request, "Profile updated successfully!")
         return redirect('dashboard')
     
@@ -309,52 +390,66 @@ def update_profile(request):
 @require_http_methods(["POST"])
 @csrf_protect
 def purchase_product(request):
-    """Handle Product Purchase"""
+    """Handle Product Purchase (one product, priced from the catalog)"""
     user = request.user
     
-    product_name = request.POST.get('product_name', '').strip()
-    product_price = request.POST.get('product_price', '0').strip()
-    quantity = int(request.POST.get('quantity', 1))
+    try:
+        product_id = request.POST.get('product_id')
+        if not product_id:
+            # Pages rendered before purchases were keyed by id post the name instead
+            product_id = catalog.find_product(catalog.get_catalog(), request.POST.get('product_name', '').strip())
+        purchases, total_amount = catalog.place_order(user, [(product_id, request.POST.get('quantity', 1))])
+    except catalog.OrderError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except IntegrityError:
+        return JsonResponse({'success': False, 'message': 'Product is no longer available'}, status=409)
     
+    purchase = purchases[0]
+    # place_order may have reloaded the catalog; this reads the copy it cached
+    name = catalog.get_catalog()[purchase.product_id][0]
+    messages.success(
+        request,
+        f"Purchase successful! Product: {name}, "
+        f"Quantity: {purchase.quantity}, Total: ₹{total_amount}"
+    )
+    return JsonResponse({
+        'success': True,
+        'message': 'Purchase completed successfully!'
+    })
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+@csrf_protect
+def checkout(request):
+    """Cart checkout - many products in one order (JSON body {"items": [{"product_id", "quantity"}]})"""
     try:
-        price = Decimal(product_price.replace('₹', '').replace(',', ''))
-        total_amount = price * quantity
-        
-        # Get or create product
-        product, created = Product.objects.get_or_create(
-            name=product_name,
-            defaults={
-                'price': price,
-                'description': f'Purchase of {product_name}'
-            }
-        )
-        
-        # Create purchase record
-        purchase = Purchase.objects.create(
-            user=user,
-            product=product,
-            quantity=quantity,
-            total_amount=total_amount
-        )
-        
-        messages.success(
-            request,
-            f"Purchase successful! Product: {product_name}, Quantity: {quantity}, Total: ₹{total_amount}"
-        )
-        return JsonResponse({
-            'success': True,
-            'message': 'Purchase completed successfully!'
-        })
-        
-    except Exception as e:
-        messages.error(request, f"Error processing purchase: {str(e)}")
-        return JsonResponse({
-            'success': False,
-            'message': str(e)
-        }, status=400)
+        payload = json.loads(request.body or b'{}')
+        items = [(item.get('product_id'), item.get('quantity', 1)) for item in payload.get('items', [])]
+    except (ValueError, AttributeError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Invalid cart'}, status=400)
+    
+    try:
+        purchases, total_amount = catalog.place_order(request.user, items)
+    except catalog.OrderError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except IntegrityError:
+        return JsonResponse({'success': False, 'message': 'A product in the cart is no longer available'}, status=409)
+    
+    messages.success(request, f"Order placed! {len(purchases)} product(s), Total: ₹{total_amount}")
+    return JsonResponse({
+        'success': True,
+        'message': 'Order placed successfully!',
+        'items': len(purchases),
+        'total': str(total_amount),
+    })
 
 # ========== ADMIN DASHBOARD VIEWS ==========
 
+ADMIN_USERS_PAGE_SIZE = 50
+ADMIN_WITHDRAWALS_PAGE_SIZE = 50
+
+staff_required = user_passes_test(lambda user: user.is_staff, login_url='admin_login')
+
 def admin_login(request):
     """Admin Login View - Custom MLM Admin Login"""
     if request.method == 'POST':
@@ -366,7 +461,7 @@ def admin_login(request):
             return render(request, 'admin/login.html')
         
         # Authenticate user
-        user = authenticate(request, username=email, password=password)
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
             login(request, user)
@@ -379,69 +474,185 @@ def admin_login(request):
     # GET request - show custom login page
     return render(request, 'admin/login.html')
 
-# @login_required(login_url='admin_login')
+@staff_required
 def admin_dashboard(request):
     """Admin Dashboard"""
     
-    # Get statistics
-    total_users = CustomUser.objects.count()
-    active_users = CustomUser.objects.filter(is_active_member=True).count()
-    total_withdrawals = Withdrawal.objects.count()
-    pending_withdrawals = Withdrawal.objects.filter(status='pending').count()
-    total_purchases = Purchase.objects.count()
-    total_referrals = Referral.objects.count()
+    # Get statistics (cached, see core.stats)
+    stats = get_admin_stats()
     
     # Recent activity
-    recent_users = CustomUser.objects.order_by('-created_at')[:10]
-    pending_withdrawal_requests = Withdrawal.objects.filter(status='pending').order_by('-requested_date')[:10]
-    recent_purchases = Purchase.objects.select_related('user', 'product').order_by('-purchase_date')[:10]
-    
-    context = {
-        'total_users': total_users,
-        'active_users': active_users,
-        'total_withdrawals': total_withdrawals,
-        'pending_withdrawals': pending_withdrawals,
-        'total_purchases': total_purchases,
-        'total_referrals': total_referrals,
-        'recent_users': recent_users,
-        'pending_withdrawal_requests': pending_withdrawal_requests,
-        'recent_purchases': recent_purchases,
-    }
+    context = {**stats, **{name: _admin_recent(name) for name in ADMIN_RECENT_LISTS}}
     return render(request, 'admin/admin_dashboard.html', context)
 
+ADMIN_RECENT_LISTS = ('recent_users', 'pending_withdrawal_requests', 'recent_purchases')
+
+def _admin_recent(name):
+    """One of the admin dashboard's recent activity lists (10 rows)"""
+    if name == 'recent_users':
+        queryset = CustomUser.objects.order_by('-created_at', '-id')
+    elif name == 'pending_withdrawal_requests':
+        queryset = (
+            Withdrawal.objects.filter(status='pending')
+            .select_related('user')
+            .only(
+                'amount', 'admin_charge', 'net_amount', 'requested_date',
+                'user__first_name', 'user__last_name', 'user__email',
+            )
+            .order_by('-requested_date', '-id')
+        )
+    elif name == 'recent_purchases':
+        queryset = Purchase.objects.select_related('user', 'product').only(
+            'quantity', 'total_amount', 'purchase_date',
+            'user__first_name', 'user__last_name', 'product__name',
+        ).order_by('-purchase_date', '-id')
+    else:
+        raise ValueError(f"Unknown recent activity list {name!r}")
+    return list(queryset[:10])
+
 
+@staff_required
 def admin_users(request):
     """Admin - User Management"""
+    q = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
     
-    users = CustomUser.objects.all().order_by('-created_at')
-    return render(request, 'admin/admin_users.html', {'users': users})
+    users = search_members(CustomUser.objects.all(), q)
+    try:
+        users, next_cursor = keyset_page(users, ('-created_at', '-id'), cursor, ADMIN_USERS_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect('admin_users')
+    
+    context = {
+        'users': users,
+        'q': q,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+        'export_datasets': exports.DATASETS,
+    }
+    return render(request, 'admin/admin_users.html', context)
 
-@login_required(login_url='admin_login')
+@staff_required
 @require_http_methods(["POST"])
 @csrf_protect
 def admin_withdrawal_action(request, withdrawal_id):
-    """Admin - Approve/Reject Withdrawal"""
-    
-    withdrawal = get_object_or_404(Withdrawal, id=withdrawal_id)
+    """Admin - Approve/Reject/Complete one withdrawal (same transitions as the bulk actions)"""
+    withdrawal = get_object_or_404(Withdrawal.objects.only('amount'), id=withdrawal_id)
     action = request.POST.get('action')
-    notes = request.POST.get('notes', '')
-    
-    if action == 'approve':
-        withdrawal.status = 'approved'
-        messages.success(request, f"Withdrawal request approved for ₹{withdrawal.amount}")
+    if action not in payouts.TRANSITIONS:
+        return HttpResponse("Unknown action.", status=400)
+
+    try:
+        updated = payouts.process(
+            Withdrawal.objects.filter(pk=withdrawal.pk), action, request.POST.get('notes', '').strip(),
+        )
+    except payouts.SelectionChanged:
+        updated = 0
+    if not updated:
+        messages.error(request, f"This withdrawal can't be {payouts.TRANSITIONS[action][1]} from its current status.")
     elif action == 'reject':
-        withdrawal.status = 'rejected'
-        # Refund amount back to user
-        withdrawal.user.account_balance += withdrawal.amount
-        withdrawal.user.save()
-        messages.success(request, f"Withdrawal request rejected. Amount refunded.")
-    elif action == 'complete':
-        withdrawal.status = 'completed'
-        withdrawal.processed_date = timezone.now()
-        messages.success(request, f"Withdrawal marked as completed.")
-    
-    if notes:
-        withdrawal.notes = notes
-    withdrawal.save()
-    
+        messages.success(request, f"Withdrawal request rejected. ₹{withdrawal.amount} refunded.")
+    else:
+        messages.success(request, f"Withdrawal request of ₹{withdrawal.amount} {payouts.TRANSITIONS[action][1]}.")
     return redirect('admin_dashboard')
+
+@staff_required
+def admin_withdrawals(request):
+    """Admin - Withdrawal review queue (filters + keyset paging)"""
+    queryset, filters = payouts.filter_withdrawals(request.GET)
+    cursor = request.GET.get('cursor')
+    matching = queryset.aggregate(count=Count('id'), total=Sum('amount'))
+
+    page = queryset.select_related('user').only(
+        'amount', 'admin_charge', 'net_amount', 'status', 'requested_date', 'processed_date', 'notes',
+        'user__first_name', 'user__last_name', 'user__email', 'user__referral_id',
+    )
+    try:
+        withdrawals, next_cursor = keyset_page(
+            page, ('-requested_date', '-id'), cursor, ADMIN_WITHDRAWALS_PAGE_SIZE
+        )
+    except InvalidCursor:
+        return redirect(f"{request.path}?{urlencode(filters)}")
+
+    context = {
+        'withdrawals': withdrawals,
+        'filters': filters,
+        'query_string': urlencode(filters),
+        'matching_count': matching['count'],
+        'matching_total': matching['total'] or 0,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+        'status_choices': Withdrawal.STATUS_CHOICES,
+        'actions': payouts.TRANSITIONS,
+    }
+    return render(request, 'admin/admin_withdrawals.html', context)
+
+@staff_required
+@require_http_methods(["POST"])
+@csrf_protect
+def admin_withdrawals_bulk(request):
+    """Admin - Approve/Reject/Complete the ticked withdrawals or the whole filter"""
+    action = request.POST.get('action')
+    queryset, filters = payouts.filter_withdrawals(request.POST)
+    back = redirect(f"{reverse('admin_withdrawals')}?{urlencode(filters)}")
+    if action not in payouts.TRANSITIONS:
+        messages.error(request, "Unknown action.")
+        return back
+    if request.POST.get('scope') != 'filter':
+        ids = [value for value in request.POST.getlist('ids') if value.isdigit()]
+        if not ids:
+            messages.error(request, "No withdrawals selected.")
+            return back
+        queryset = Withdrawal.objects.filter(pk__in=ids)
+
+    try:
+        updated = payouts.process(queryset, action, request.POST.get('notes', '').strip())
+    except payouts.SelectionChanged:
+        messages.error(request, "Some withdrawals changed while processing. Nothing was changed, please try again.")
+        return back
+    messages.success(request, f"{updated} withdrawal(s) {payouts.TRANSITIONS[action][1]}.")
+    return back
+
+@staff_required
+def admin_withdrawals_export(request):
+    """Admin - Payout file (CSV) for the approved withdrawals in the filter, streamed"""
+    queryset, _ = payouts.filter_withdrawals(request.GET)
+    filename, rows = payouts.payout_file(queryset)
+    return exports.csv_response(filename, payouts.PAYOUT_HEADER, rows)
+
+@staff_required
+def admin_export(request, dataset):
+    """Admin - Stream members/purchases/referrals/withdrawals as CSV or JSONL"""
+    if dataset not in exports.DATASETS:
+        raise Http404("Unknown export")
+    format = request.GET.get('format', 'csv')
+    if format not in exports.FORMATS:
+        return HttpResponse("Format must be csv or jsonl", status=400, content_type='text/plain')
+    try:
+        spec, queryset = exports.export_queryset(
+            dataset,
+            date_from=request.GET.get('date_from'),
+            date_to=request.GET.get('date_to'),
+            status=request.GET.get('status'),
+        )
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain')
+    return exports.stream_response(
+        exports.export_filename(dataset, format),
+        spec.header,
+        exports.iter_values(queryset, spec.lookups),
+        format,
+    )
+
+# ========== MONITORING ==========
+
+def metrics_view(request):
+    """Prometheus metrics for this worker process (staff or METRICS_TOKEN only)"""
+    token = settings.METRICS_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (token and hmac.compare_digest(supplied, token)) and not request.user.is_staff:
+        return HttpResponse("Forbidden", status=403, content_type='text/plain')
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
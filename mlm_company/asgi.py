@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mlm_company.settings')
+# Serve the data-heavy pages with core.async_views on database servers (set
+# ASYNC_VIEWS to choose). SQLite serializes the concurrent reads, so they're
+# no faster there and the sync views stay the default.
+if os.environ.get('DB_ENGINE', 'sqlite') != 'sqlite':
+    os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -20,7 +21,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-%to!)kw3u_6_ub86sl49lf@r=%zf+(f9bak*ot894#!p75r-jh'
+# Sessions stored in signed cookies (SESSION_STORE below) are only as safe as this key.
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY', 'django-insecure-%to!)kw3u_6_ub86sl49lf@r=%zf+(f9bak*ot894#!p75r-jh'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -41,8 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.SessionRefreshMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -54,7 +61,8 @@ ROOT_URLCONF = 'mlm_company.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render time to core.metrics
+        'BACKEND': 'core.metrics.InstrumentedTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,14 +81,99 @@ WSGI_APPLICATION = 'mlm_company.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE picks a profile:
+#   sqlite - db.sqlite3 (or DB_NAME) in WAL mode, so reads don't wait for the writer
+#   mysql  - DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT, with persistent connections
+#            (DB_CONN_MAX_AGE seconds) that are health-checked before reuse
+# DB_REPLICA_HOSTS (mysql, comma-separated) adds read replicas; core.routers sends
+# the read-only pages in REPLICA_VIEWS to them (see core.middleware.ReplicaMiddleware).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'mysql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'mlm_company'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DB_PORT', '3306'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '300')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+                'isolation_level': 'read committed',
+            },
+        }
+    }
+    for number, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Wait this many seconds for the write lock instead of failing with "database is locked"
+                'timeout': float(os.environ.get('DB_TIMEOUT', '20')),
+                # Take the write lock when a transaction starts, so it can't deadlock upgrading later
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'  # safe with WAL; fsync at checkpoints only
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'  # 20 MB page cache per connection
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# URL names of GET pages that only read, and may be served from a replica.
+# Not 'home': it caches what it reads, so a lagging replica would be cached for everyone.
+REPLICA_VIEWS = {
+    'products', 'plan', 'contact',
+    'dashboard', 'dashboard_section', 'team', 'team_tree', 'wallet',
+    'admin_dashboard', 'admin_users', 'admin_withdrawals',
+}
+# After a member's own POST their pages read from the primary for this long,
+# so they see what they just changed even if the replicas lag behind
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '10'))
+
+
+# Cache
+# Use a shared backend (Redis/Memcached) in production so cached pages, stats
+# and content versions are shared by every worker process.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
 
+# Performance metrics (see core.metrics)
+# /metrics/ is served to staff, or to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', '1.0'))  # seconds
+SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get('SLOW_REQUEST_SAMPLE_RATE', '0.1'))
+
+
+# Async views (see core.async_views)
+# mlm_company/asgi.py turns these on for MySQL; WSGI servers keep the sync views.
+
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,6 +215,13 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Threads per process resizing uploaded images (see core.images)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+
+# Threads per process hashing signup passwords (see core.signup); PBKDF2 releases
+# the GIL, so one per core keeps every core busy without oversubscribing them
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -130,11 +230,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'core.CustomUser'
 
+# Members log in by email (see core.backends)
+AUTHENTICATION_BACKENDS = ['core.backends.EmailBackend']
+# Seconds the request user is cached for. Off with the per-process LocMemCache,
+# where a change made in one worker could not drop the others' copies.
+SESSION_USER_CACHE_TIMEOUT = int(os.environ.get(
+    'SESSION_USER_CACHE_TIMEOUT', '0' if CACHES['default']['BACKEND'].endswith('LocMemCache') else '300'
+))
+
 # Login Settings
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
 # Session Settings
+# SESSION_STORE picks where sessions live:
+#   cached_db      - shared cache in front of the database (default with a shared CACHE_BACKEND)
+#   db             - database only (default with the per-process LocMemCache)
+#   cache          - shared cache only; sessions go when the cache evicts them
+#   signed_cookies - in the browser, nothing stored server-side; needs a secret SECRET_KEY
+# Sessions are saved when they change, or by core.middleware.SessionRefreshMiddleware
+# once less than SESSION_REFRESH_WINDOW of their lifetime is left - not on every request.
+# Run "manage.py purge_sessions" from cron to delete expired database sessions.
+SESSION_STORE = os.environ.get(
+    'SESSION_STORE', 'db' if CACHES['default']['BACKEND'].endswith('LocMemCache') else 'cached_db'
+)
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_STORE}'
 SESSION_COOKIE_AGE = 86400 * 7  # 7 days
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_REFRESH_WINDOW = int(os.environ.get('SESSION_REFRESH_WINDOW', 86400))  # 1 day